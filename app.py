@@ -1,16 +1,35 @@
 import streamlit as st
 import pandas as pd
-import io
+import math
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # 1. Load Environment Variables
 load_dotenv()
 
 # 2. Imports
-from src.data_processor import process_csv
-from src.agent_engine import get_ai_insight
+from src.data_processor import (
+    cached_csv_stats, content_hash, process_csv_cached, process_csv_sample, process_excel_cached,
+)
+from src.agent_engine import AgentEngineError, QuotaExceededError, iter_ai_insight, rate_limit_stats, warm_up
+from src import telemetry
+from src.uploads import open_upload, remove_stale_spills
+
+# Uploads above this size are profiled in bounded-memory streaming mode
+STREAMING_THRESHOLD_BYTES = int(os.getenv("STREAMING_THRESHOLD_MB", "50")) * 1024 * 1024
+STREAMING_CHUNK_ROWS = 100_000
+# Optional CSV parser for in-memory uploads: "pyarrow", "polars" or "pandas" (unset = pandas default)
+CSV_BACKEND = os.getenv("CSV_BACKEND") or None
+# Streamed uploads that extend a previously profiled file only profile the appended rows
+INCREMENTAL_PROFILING = os.getenv("INCREMENTAL_PROFILING", "1") not in ("", "0")
+# CSVs above this size (with no cached stats) first get estimates from a sample; the exact
+# stats are computed in the background and swapped in when ready
+PROGRESSIVE_PROFILING = os.getenv("PROGRESSIVE_PROFILING", "1") not in ("", "0")
+PROGRESSIVE_THRESHOLD_BYTES = int(os.getenv("PROGRESSIVE_THRESHOLD_MB", "20")) * 1024 * 1024
+PROGRESSIVE_WORKERS = int(os.getenv("PROGRESSIVE_WORKERS", "2"))
+PROGRESSIVE_POLL_SECONDS = 1.0
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -20,10 +39,99 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- TURBO MODE CACHING ---
-@st.cache_data(show_spinner=False)
-def get_cached_insight(stats, insight_type):
-    return get_ai_insight(stats, insight_type)
+# Spill files left behind by a crashed server process, swept once per process
+@st.cache_resource
+def sweep_stale_uploads():
+    return remove_stale_spills()
+
+sweep_stale_uploads()
+
+# Exact profiles of progressively profiled uploads, shared by every session in the process
+@st.cache_resource
+def background_profiler():
+    return ThreadPoolExecutor(max_workers=PROGRESSIVE_WORKERS, thread_name_prefix="full-profile")
+
+def profile_upload(uploaded_file, file_id):
+    """
+    Stats for a new upload, plus the background job computing its exact stats when the
+    returned ones are estimates from a sample (None otherwise).
+    """
+    is_excel = uploaded_file.name.lower().endswith(".xlsx")
+    chunksize = STREAMING_CHUNK_ROWS if uploaded_file.size > STREAMING_THRESHOLD_BYTES else None
+    # Large uploads are parsed from a memory-mapped temp file, removed once profiled
+    upload = open_upload(uploaded_file)
+    try:
+        # Takes the upload as an argument: the job runs after `upload` below is cleared
+        exact = lambda owned: process_csv_cached(
+            owned.buffer, chunksize=chunksize, digest=file_id,
+            backend=CSV_BACKEND, incremental=INCREMENTAL_PROFILING,
+        )
+        if (not is_excel and PROGRESSIVE_PROFILING and upload.size > PROGRESSIVE_THRESHOLD_BYTES
+                and cached_csv_stats(file_id, chunksize) is None):
+            estimate = process_csv_sample(upload.buffer)
+            if estimate is not None:
+                def refine(owned):
+                    with owned:
+                        return exact(owned)
+                job = background_profiler().submit(refine, upload)
+                upload = None  # now owned (and closed) by the job
+                return estimate, job
+        if is_excel:
+            return process_excel_cached(upload.buffer, digest=file_id), None
+        return exact(upload), None
+    finally:
+        if upload is not None:
+            upload.close()
+
+def reset_results():
+    st.session_state['trend_result'] = None
+    st.session_state['anomaly_result'] = None
+    st.session_state['action_result'] = None
+
+@st.fragment(run_every=PROGRESSIVE_POLL_SECONDS)
+def swap_in_exact_stats():
+    if not st.session_state.get('refine_job'):
+        return
+    file_id, job = st.session_state['refine_job']
+    if not job.done():
+        st.caption("⏳ Computing exact stats in the background...")
+        return
+    st.session_state['refine_job'] = None
+    if file_id == st.session_state.get('uploaded_file_id'):
+        try:
+            st.session_state['stats_dict'] = job.result()
+            # Insights on the estimates are regenerated from the exact stats
+            reset_results()
+        except Exception as e:
+            st.session_state['refine_error'] = f"Exact stats failed, showing estimates: {e}"
+    st.rerun()
+
+# --- TURBO MODE: CACHING + STREAMING ---
+# Insights are cached on disk by agent_engine (content-addressed, shared across
+# sessions, processes and restarts), so re-uploading the same data is instant.
+# Fresh insights stream token-by-token into the insight box as they are generated.
+# Returns None (after showing why) if the insight failed.
+def stream_insight(stats, insight_type, box_class):
+    placeholder = st.empty()
+    result = ""
+    try:
+        # Model round trip plus drawing every delta (see the "llm_stream" span for the model alone)
+        with telemetry.span("render_insight", insight_type=insight_type) as stage:
+            for delta in iter_ai_insight(stats, insight_type):
+                result += delta
+                placeholder.markdown(f'<div class="{box_class} insight-streaming">{result}</div>', unsafe_allow_html=True)
+            stage.set(chars=len(result))
+    except QuotaExceededError as e:
+        # Handle 429 Error Gracefully
+        placeholder.empty()
+        wait = f"{math.ceil(e.retry_after)} seconds" if e.retry_after else "60 seconds"
+        st.warning(f"⚠️ **Demo Quota Exceeded:** Please wait {wait} and try again.")
+        return None
+    except AgentEngineError as e:
+        placeholder.empty()
+        st.error(str(e))
+        return None
+    return result
 
 # --- CSS STYLING (FIXED PADDING & LAYOUT) ---
 st.markdown("""
@@ -62,6 +170,9 @@ st.markdown("""
         line-height: 1.6;
         animation: fadeIn 0.5s ease-in-out;
     }
+    .insight-streaming {
+        animation: none;
+    }
     .insight-anomalies {
         border-left: 5px solid #ef4444 !important;
     }
@@ -139,22 +250,47 @@ if 'action_result' not in st.session_state:
 # --- SIDEBAR: DATA INSPECTOR ---
 with st.sidebar:
     st.title("🎛️ Data Control")
-    uploaded_file = st.file_uploader("Upload CSV", type=["csv"], label_visibility="collapsed")
+    uploaded_file = st.file_uploader("Upload CSV or Excel", type=["csv", "xlsx"], label_visibility="collapsed")
     
     st.divider()
     
     if st.session_state['stats_dict']:
         stats = st.session_state['stats_dict']
-        st.caption("DATA DNA")
+        overall = stats['overall_summary']
         c1, c2 = st.columns(2)
-        c1.metric("Rows", stats['overall_summary']['row_count'])
-        c2.metric("Cols", stats['overall_summary']['column_count'])
-        
-        missing = sum(stats['overall_summary']['missing_values_summary'].values())
-        st.metric("Missing Values", missing, delta="Clean" if missing==0 else "Issues", delta_color="inverse")
+        missing = sum(overall['missing_values_summary'].values())
+        if overall.get('estimated'):
+            sample = overall['sample']
+            st.caption(f"DATA DNA · ESTIMATED from a {sample['sampled_fraction']:.1%} sample")
+            low, high = sample['row_count_ci95']
+            c1.metric("Rows", f"≈{overall['row_count']:,}", help=f"95% confidence interval: {low:,} to {high:,}")
+            c2.metric("Cols", overall['column_count'])
+            st.metric("Missing Values", f"≈{missing:,}", delta="Clean" if missing==0 else "Issues", delta_color="inverse")
+        else:
+            st.caption("DATA DNA")
+            c1.metric("Rows", overall['row_count'])
+            c2.metric("Cols", overall['column_count'])
+            st.metric("Missing Values", missing, delta="Clean" if missing==0 else "Issues", delta_color="inverse")
+        if st.session_state.get('refine_job'):
+            swap_in_exact_stats()
+        if st.session_state.get('refine_error'):
+            st.warning(st.session_state['refine_error'])
             
         with st.expander("🔍 Raw JSON"):
             st.json(stats)
+
+        with st.expander("⏱️ AI Quota"):
+            # Process-wide limiter counters: requests, throttled waits, 429s, retries
+            st.json(rate_limit_stats())
+
+        if telemetry.enabled():
+            with st.expander("⏱️ Stage Timings"):
+                # Process-wide, per stage: upload hash, parse, stats, context, model, rendering
+                stages = telemetry.recorder.stages()
+                if stages:
+                    st.dataframe(pd.DataFrame.from_dict(stages, orient="index")[
+                        ["count", "seconds_mean", "seconds_max", "peak_rss_delta_max_bytes"]
+                    ])
             
         if st.button("🗑️ Reset", use_container_width=True):
             st.session_state.clear()
@@ -165,27 +301,33 @@ with st.sidebar:
 # --- MAIN LOGIC ---
 # --- MAIN LOGIC ---
 if uploaded_file is not None:
-    file_id = f"{uploaded_file.name}_{uploaded_file.size}"
+    # Identify uploads by content (not name+size); hash once per upload, not per rerun
+    if st.session_state.get('uploaded_file_ref') != uploaded_file.file_id:
+        st.session_state['uploaded_file_ref'] = uploaded_file.file_id
+        st.session_state['uploaded_file_hash'] = content_hash(uploaded_file)
+    file_id = st.session_state['uploaded_file_hash']
     if st.session_state['stats_dict'] is None or file_id != st.session_state.get('uploaded_file_id'):
         with st.spinner("⚡ processing..."):
             try:
-                st.session_state['stats_dict'] = process_csv(io.BytesIO(uploaded_file.getvalue()))
+                stats, job = profile_upload(uploaded_file, file_id)
+                st.session_state['stats_dict'] = stats
                 st.session_state['uploaded_file_id'] = file_id 
+                st.session_state['refine_job'] = (file_id, job) if job is not None else None
+                st.session_state['refine_error'] = None
                 # Reset results
-                st.session_state['trend_result'] = None
-                st.session_state['anomaly_result'] = None
-                st.session_state['action_result'] = None
-                get_cached_insight.clear()
+                reset_results()
             except Exception as e:
                 st.error(f"Error: {e}")
+        if st.session_state.get('refine_job'):
+            # Draw the estimates in the sidebar (rendered before this) right away
+            st.rerun()
 
 # --- FIX: CLEAR STATE IF FILE REMOVED ---
 else:
     # If the user removes the file, clear the internal memory
     st.session_state['stats_dict'] = None
-    st.session_state['trend_result'] = None
-    st.session_state['anomaly_result'] = None
-    st.session_state['action_result'] = None
+    st.session_state['refine_job'] = None
+    reset_results()
 # --- DASHBOARD LAYOUT ---
 
 # 1. HEADER
@@ -194,7 +336,10 @@ st.markdown('<div class="sub-header">Strategic Intelligence in <b>< 2 Seconds</b
 
 if st.session_state['stats_dict']:
     # File Badge
-    st.caption(f"✅ Active File: **{uploaded_file.name}**")
+    if st.session_state['stats_dict']['overall_summary'].get('estimated'):
+        st.caption(f"✅ Active File: **{uploaded_file.name}** · stats ESTIMATED from a sample until the full scan finishes")
+    else:
+        st.caption(f"✅ Active File: **{uploaded_file.name}**")
 
     # 2. MIDDLE SECTION: AGENT SELECTOR
     selected_tab = st.radio(
@@ -225,11 +370,8 @@ if st.session_state['stats_dict']:
     elif selected_tab == "📈 Trends Analyst":
         if not st.session_state['trend_result']:
              with st.spinner("📈 Analyst is identifying growth patterns..."):
-                result = get_cached_insight(st.session_state['stats_dict'], "Trends")
-                # Handle 429 Error Gracefully
-                if "429" in result or "quota" in result.lower():
-                    st.warning("⚠️ **Demo Quota Exceeded:** Please wait 60 seconds or restart the app.")
-                else:
+                result = stream_insight(st.session_state['stats_dict'], "Trends", "insight-box")
+                if result is not None:
                     st.session_state['trend_result'] = result
                     st.rerun()
         
@@ -239,11 +381,9 @@ if st.session_state['stats_dict']:
     # State 3: Anomalies Selected
     elif selected_tab == "🛡️ Anomaly Hunter":
         if not st.session_state['anomaly_result']:
-             with st.spinner("🛡️ Hunter is scanning for z-score outliers..."):
-                result = get_cached_insight(st.session_state['stats_dict'], "Anomalies")
-                if "429" in result or "quota" in result.lower():
-                    st.warning("⚠️ **Demo Quota Exceeded:** Please wait 60 seconds or restart the app.")
-                else:
+             with st.spinner("🛡️ Hunter is scanning for outliers..."):
+                result = stream_insight(st.session_state['stats_dict'], "Anomalies", "insight-box insight-anomalies")
+                if result is not None:
                     st.session_state['anomaly_result'] = result
                     st.rerun()
         
@@ -254,10 +394,8 @@ if st.session_state['stats_dict']:
     elif selected_tab == "♟️ The Strategist":
         if not st.session_state['action_result']:
              with st.spinner("♟️ CEO is formulating strategy..."):
-                result = get_cached_insight(st.session_state['stats_dict'], "Actions")
-                if "429" in result or "quota" in result.lower():
-                    st.warning("⚠️ **Demo Quota Exceeded:** Please wait 60 seconds or restart the app.")
-                else:
+                result = stream_insight(st.session_state['stats_dict'], "Actions", "insight-box insight-actions")
+                if result is not None:
                     st.session_state['action_result'] = result
                     st.rerun()
         
@@ -266,4 +404,8 @@ if st.session_state['stats_dict']:
 
 else:
     # Empty State
-    st.info("👈 Upload CSV to start.")
\ No newline at end of file
+    st.info("👈 Upload a CSV or Excel file to start.")
+
+# The model SDK is imported lazily; load it in the background now that the page is drawn,
+# so the first insight request does not wait for it
+warm_up()
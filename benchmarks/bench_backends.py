@@ -0,0 +1,75 @@
+"""
+CSV backend benchmark: parse time and frame memory per ``process_csv`` backend.
+
+Generates a synthetic sales CSV (dates, low-cardinality branches, IDs, ints, floats)
+and reports, per backend, the parse/compaction time from ``attrs["ingest"]``, the frame
+memory before and after dtype compaction, and the end-to-end ``process_csv`` time.
+
+Usage:
+    python -m benchmarks.bench_backends [--rows N] [--repeat N]
+"""
+import argparse
+import importlib.util
+import io
+import json
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data_processor import process_csv
+from src.ingest import BACKENDS, read_csv_frame
+
+
+def make_csv(rows: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    revenue = rng.normal(500, 50, size=rows).round(2)
+    revenue[rng.random(rows) < 0.02] = np.nan
+    return pd.DataFrame({
+        "Date": pd.date_range("2020-01-01", periods=rows, freq="min").strftime("%Y-%m-%d"),
+        "Branch": rng.choice(["New York", "Chicago", "Austin", "Denver", "Miami"], size=rows),
+        "Product": rng.choice([f"SKU-{i:04d}" for i in range(500)], size=rows),
+        "Order_ID": [f"ORD-{i:08d}" for i in range(rows)],
+        "Revenue": revenue,
+        "Units_Sold": rng.integers(0, 120, size=rows),
+    }).to_csv(index=False).encode("utf-8")
+
+
+def _median_seconds(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples), 4)
+
+
+def run(rows: int, repeat: int) -> dict:
+    data = make_csv(rows)
+    results = {
+        "rows": rows,
+        "size_mb": round(len(data) / 1e6, 2),
+        "default_process_csv_s": _median_seconds(lambda: process_csv(io.BytesIO(data)), repeat),
+        "backends": {},
+    }
+    for backend in BACKENDS:
+        if backend == "polars" and importlib.util.find_spec("polars") is None:
+            continue
+        report = read_csv_frame(io.BytesIO(data), backend=backend).attrs["ingest"]
+        results["backends"][backend] = {
+            "parse_s": report["parse_seconds"],
+            "compact_s": report["compact_seconds"],
+            "memory_mb_parsed": round(report["memory_bytes_parsed"] / 1e6, 2),
+            "memory_mb": round(report["memory_bytes"] / 1e6, 2),
+            "process_csv_s": _median_seconds(lambda: process_csv(io.BytesIO(data), backend=backend), repeat),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
@@ -0,0 +1,63 @@
+"""
+Excel ingestion benchmark against the shipped workbook.
+
+Compares pandas' default ``read_excel`` + stats with ``process_excel`` on a cold
+frame cache (openpyxl read-only parse) and a warm one (Parquet reload).
+
+Usage:
+    python -m benchmarks.bench_excel [path/to/workbook.xlsx] [--repeat N]
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from src import frame_cache
+from src.data_processor import generate_summary_statistics, process_excel
+
+DEFAULT_WORKBOOK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Retail and wherehouse Sale.xlsx")
+
+
+def _time(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"median_s": round(statistics.median(samples), 4), "min_s": round(min(samples), 4)}
+
+
+def run(path: str, repeat: int) -> dict:
+    with open(path, "rb") as f:
+        data = f.read()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        frame_cache.FRAME_CACHE_DIR = cache_dir
+
+        def cold():
+            for name in os.listdir(cache_dir):
+                os.remove(os.path.join(cache_dir, name))
+            process_excel(io.BytesIO(data))
+
+        results = {
+            "workbook": os.path.basename(path),
+            "size_mb": round(len(data) / 1e6, 2),
+            "pandas_read_excel": _time(lambda: generate_summary_statistics(pd.read_excel(io.BytesIO(data))), repeat),
+            "process_excel_cold": _time(cold, repeat),
+        }
+        process_excel(io.BytesIO(data))
+        results["process_excel_warm"] = _time(lambda: process_excel(io.BytesIO(data)), repeat)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=DEFAULT_WORKBOOK)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.path, args.repeat), indent=2))
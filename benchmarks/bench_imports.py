@@ -0,0 +1,102 @@
+"""
+Cold-start benchmark: import cost of the app's modules and time to first paint.
+
+Every sample runs in a fresh interpreter, so nothing is already imported:
+
+- ``imports``: per module, the cumulative import time reported by ``python -X importtime``
+  (median over runs) and the slowest modules it pulled in.
+- ``first_paint_s``: time for Streamlit's AppTest to run ``app.py`` once with no upload
+  (its imports plus drawing the empty page), i.e. what a user waits for on a cold start.
+  ``streamlit_import_s`` (Streamlit's own import) is reported separately and not included.
+- ``sdk_loaded_at_first_paint``: whether drawing the page imported the Agents SDK. The
+  app loads it in a background thread once the page is drawn (``agent_engine.warm_up``);
+  that warm-up is switched off here (stub model) so it cannot race the measurement.
+
+Usage:
+    python -m benchmarks.bench_imports [--repeat N] [--top N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["src.data_processor", "src.agent_engine", "src.api"]
+
+_FIRST_PAINT = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+AppTest.from_file(sys.argv[1], default_timeout=120).run()
+painted = time.perf_counter()
+print(json.dumps({
+    "streamlit_import_s": imported - start,
+    "first_paint_s": painted - imported,
+    "sdk_loaded_at_first_paint": "agents" in sys.modules,
+}))
+"""
+
+
+def _env(**overrides) -> dict:
+    # The model is never called; the engine only needs some key once its client is built
+    return {**os.environ, "GEMINI_API_KEY": os.environ.get("GEMINI_API_KEY", "benchmark"), **overrides}
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, self_us, cumulative_us) per line of ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_profile(module: str, repeat: int, top: int) -> dict:
+    samples, slowest = [], []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT, env=_env(), capture_output=True, text=True, check=True,
+        )
+        rows = parse_importtime(result.stderr)
+        samples.append(next(cumulative for name, _, cumulative in reversed(rows) if name == module))
+        slowest = sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+    return {
+        "import_s": round(statistics.median(samples) / 1e6, 4),
+        "slowest_self_ms": {name: round(self_us / 1e3, 1) for name, self_us, _ in slowest},
+    }
+
+
+def first_paint(repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _FIRST_PAINT, os.path.join(ROOT, "app.py")],
+            cwd=ROOT, env=_env(AGENT_STUB_MODEL="1"), capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {
+        "streamlit_import_s": round(statistics.median(s["streamlit_import_s"] for s in samples), 4),
+        "first_paint_s": round(statistics.median(s["first_paint_s"] for s in samples), 4),
+        "sdk_loaded_at_first_paint": any(s["sdk_loaded_at_first_paint"] for s in samples),
+    }
+
+
+def run(repeat: int, top: int) -> dict:
+    return {
+        "imports": {module: import_profile(module, repeat, top) for module in MODULES},
+        **first_paint(repeat),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="Slowest imported modules listed per module")
+    args = parser.parse_args()
+    print(json.dumps(run(args.repeat, args.top), indent=2))
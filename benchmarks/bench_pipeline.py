@@ -0,0 +1,233 @@
+"""
+Stats pipeline and agent engine benchmark, with JSON baselines and a regression gate.
+
+Builds synthetic datasets over a grid of row counts, widths and dtype mixes and reports,
+per dataset, the median time and the peak traced memory of ``generate_summary_statistics``
+and ``process_csv``. It also times ``get_ai_insight`` against a mocked model with a fixed
+latency, to measure the engine's own overhead (context building, caching, event loop hops).
+
+Timings are machine-specific, so baselines are meant to be recorded and compared on the
+same machine:
+
+    python -m benchmarks.bench_pipeline --save-baseline        # record
+    python -m benchmarks.bench_pipeline                        # compare, exit 1 on regression
+
+Usage:
+    python -m benchmarks.bench_pipeline [--suite quick|full] [--repeat N]
+        [--model-latency SECONDS] [--baseline PATH] [--save-baseline] [--threshold 0.25]
+"""
+import argparse
+import asyncio
+import gc
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# The model is mocked; agent_engine reads some key at import for the client it builds when
+# the SDK is first loaded
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from src import agent_engine
+from src.data_processor import generate_summary_statistics, process_csv
+from src.disk_cache import DiskCache
+from src.single_flight import SingleFlight
+
+SUITES = {
+    "quick": {"rows": [1_000, 100_000], "widths": [5, 50], "mixes": ["numeric", "mixed"]},
+    "full": {
+        "rows": [1_000, 100_000, 1_000_000, 10_000_000],
+        "widths": [5, 50, 200, 1000],
+        "mixes": ["numeric", "mixed", "text"],
+    },
+}
+
+# Column kinds cycled through per dtype mix
+DTYPE_MIXES = {
+    "numeric": ["float", "int"],
+    "mixed": ["float", "int", "category", "float", "date"],
+    "text": ["category", "id", "float", "category"],
+}
+
+# Grid points above these sizes are skipped (frame / CSV round trip would not fit comfortably)
+MAX_CELLS = 100_000_000
+MAX_CSV_CELLS = 20_000_000
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "pipeline.json")
+DEFAULT_THRESHOLD = 0.25
+# Differences below these are noise, whatever the ratio
+NOISE_FLOOR = {"_s": 0.005, "_ms": 0.5, "_mb": 1.0}
+
+
+def make_frame(rows: int, width: int, mix: str, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    kinds = DTYPE_MIXES[mix]
+    columns = {}
+    for i in range(width):
+        kind = kinds[i % len(kinds)]
+        if kind == "float":
+            values = rng.normal(500, 50 + i, size=rows)
+            values[rng.random(rows) < 0.02] = np.nan
+        elif kind == "int":
+            values = rng.integers(0, 1_000, size=rows)
+        elif kind == "category":
+            values = pd.Categorical.from_codes(rng.integers(0, 20, size=rows), [f"cat_{j}" for j in range(20)])
+            values = np.asarray(values, dtype=object)
+        elif kind == "id":
+            values = np.char.add("ID-", np.arange(rows).astype(str)).astype(object)
+        else:
+            values = (pd.Timestamp("2020-01-01") + pd.to_timedelta(np.arange(rows) % 3650, unit="D")).strftime("%Y-%m-%d")
+        columns[f"{kind}_{i}"] = values
+    return pd.DataFrame(columns)
+
+
+def _median_seconds(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples), 4)
+
+
+def _peak_mb(fn) -> float:
+    # A separate, untimed run: tracing slows allocations down
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def bench_stats(rows: int, width: int, mix: str, repeat: int) -> dict:
+    df = make_frame(rows, width, mix)
+    result = {
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 1e6, 2),
+        "stats_s": _median_seconds(lambda: generate_summary_statistics(df), repeat),
+        "stats_peak_mb": _peak_mb(lambda: generate_summary_statistics(df)),
+    }
+    if rows * width <= MAX_CSV_CELLS:
+        data = df.to_csv(index=False).encode("utf-8")
+        del df
+        result["csv_mb"] = round(len(data) / 1e6, 2)
+        result["process_csv_s"] = _median_seconds(lambda: process_csv(io.BytesIO(data)), repeat)
+        result["process_csv_peak_mb"] = _peak_mb(lambda: process_csv(io.BytesIO(data)))
+    return result
+
+
+def bench_agent_engine(latency: float, requests: int = 20) -> dict:
+    """
+    Times get_ai_insight with the model replaced by a fixed-latency coroutine.
+    """
+    async def mocked_model(agent, context_data):
+        await asyncio.sleep(latency)
+        return f"{agent.name}: {len(context_data['stats'])} chars of context"
+
+    stats = [generate_summary_statistics(make_frame(1_000, 20, "mixed", seed=seed)) for seed in range(requests)]
+    original = agent_engine.run_agent_process, agent_engine.insight_cache, agent_engine.insight_flights
+    with tempfile.TemporaryDirectory() as cache_dir:
+        agent_engine.run_agent_process = mocked_model
+        agent_engine.insight_cache = DiskCache(cache_dir, "insights")
+        agent_engine.insight_flights = SingleFlight()
+        try:
+            start = time.perf_counter()
+            for stats_dict in stats:
+                agent_engine.get_ai_insight(stats_dict, "Trends")
+            cold = (time.perf_counter() - start) / requests
+
+            start = time.perf_counter()
+            for stats_dict in stats:
+                agent_engine.get_ai_insight(stats_dict, "Trends")
+            warm = (time.perf_counter() - start) / requests
+
+            async def fan_out():
+                return await asyncio.gather(*(
+                    agent_engine.get_ai_insights(stats_dict, list(agent_engine.AGENTS), use_cache=False)
+                    for stats_dict in stats
+                ))
+
+            start = time.perf_counter()
+            agent_engine.run_sync(fan_out())
+            fan_out_s = time.perf_counter() - start
+        finally:
+            agent_engine.run_agent_process, agent_engine.insight_cache, agent_engine.insight_flights = original
+
+    return {
+        "model_latency_ms": round(latency * 1000, 2),
+        # Engine time per call on top of the model's latency
+        "cold_overhead_ms": round((cold - latency) * 1000, 3),
+        "cache_hit_ms": round(warm * 1000, 3),
+        "fan_out_s": round(fan_out_s, 4),
+    }
+
+
+def run(suite: str, repeat: int, latency: float) -> dict:
+    grid = SUITES[suite]
+    results = {}
+    for mix in grid["mixes"]:
+        for width in grid["widths"]:
+            for rows in grid["rows"]:
+                if rows * width > MAX_CELLS:
+                    continue
+                key = f"stats/{mix}/{width}cols/{rows}rows"
+                print(f"running {key}", file=sys.stderr)
+                results[key] = bench_stats(rows, width, mix, repeat)
+    results["agent_engine/mocked_model"] = bench_agent_engine(latency)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Metrics (``*_s``, ``*_ms``, ``*_mb``) that got worse than the baseline by more than
+    ``threshold`` (relative) and the noise floor (absolute).
+    """
+    regressions = []
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            suffix = next((suffix for suffix in NOISE_FLOOR if metric.endswith(suffix)), None)
+            old = baseline.get(case, {}).get(metric)
+            if suffix is None or old is None or metric in ("model_latency_ms", "frame_mb", "csv_mb"):
+                continue
+            if value > old * (1 + threshold) and value - old > NOISE_FLOOR[suffix]:
+                regressions.append({"case": case, "metric": metric, "baseline": old, "current": value})
+    return regressions
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Mocked model latency in seconds")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Record these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    results = run(args.suite, args.repeat, args.model_latency)
+    report = {"suite": args.suite, "results": results}
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(json.dumps(report, indent=2))
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(results, json.load(f)["results"], args.threshold)
+    print(json.dumps(report, indent=2))
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
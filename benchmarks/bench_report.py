@@ -0,0 +1,145 @@
+"""
+Combined report vs. three-call benchmark: tokens and latency of getting all three insights.
+
+For each of ``--reports`` different datasets, gets Trends, Anomalies and Actions through
+``get_ai_insights`` (no insight cache) twice:
+
+- ``three_call``: one agent run per insight, concurrently, each with its own stats block.
+- ``combined``: one Report Writer run (structured output) over a single shared stats block.
+
+Per mode it reports model calls, the tokens the provider measured (prompt, prefix-cached
+prompt and completion tokens, from the "llm" spans), the prompt characters sent and the
+per-report wall time (p50/p95), then the combined mode's savings against three calls.
+
+The model is the bundled stub server (src.stub_server, started in-process, with its
+simulated prefix cache) unless ``--base-url`` points at a real OpenAI-compatible endpoint.
+The stub's latency is per call plus per completion token, so it shows the round trips saved,
+not the provider's prefill time. ``--client-rpm 15`` (the default quota) adds the effect of
+needing a third of the requests.
+
+Usage:
+    python -m benchmarks.bench_report [--reports 10] [--rows 20000]
+        [--latency lognormal:0.8,0.3] [--token-latency 0.01] [--client-rpm 6000] [--base-url URL]
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Any key will do for the stub; agent_engine reads it at import, for the client it builds
+# when the SDK is first loaded
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from benchmarks.bench_pipeline import make_frame
+from src import agent_engine, telemetry
+from src.data_processor import process_csv
+from src.disk_cache import DiskCache
+from src.rate_limit import RateLimiter
+from src.stub_server import BackgroundServer, StubModel
+
+MODES = {"three_call": False, "combined": True}
+USAGE_ATTRS = ("input_tokens", "cached_tokens", "output_tokens", "prompt_chars")
+
+
+def run_mode(stats_list: list, combined: bool) -> dict:
+    telemetry.recorder.reset()
+    seconds, failed = [], 0
+    for stats in stats_list:
+        started = time.perf_counter()
+        results = agent_engine.run_sync(
+            agent_engine.get_ai_insights(stats, list(agent_engine.AGENTS), use_cache=False, combined=combined)
+        )
+        seconds.append(time.perf_counter() - started)
+        failed += any(isinstance(result, agent_engine.AgentEngineError) for result in results.values())
+    llm = telemetry.recorder.stages().get("llm", {})
+    return {
+        "calls": llm.get("count", 0),
+        **{attr: llm.get(f"{attr}_total", 0) for attr in USAGE_ATTRS},
+        "failed_reports": failed,
+        "report_seconds_p50": round(float(np.percentile(seconds, 50)), 4),
+        "report_seconds_p95": round(float(np.percentile(seconds, 95)), 4),
+        "elapsed_seconds": round(sum(seconds), 4),
+    }
+
+
+def _saved(before: float, after: float) -> float | None:
+    return round(1 - after / before, 4) if before else None
+
+
+def run(reports: int, rows: int, base_url: str, client_rpm: float, stub: StubModel | None = None) -> dict:
+    stats_list = [
+        process_csv(io.BytesIO(make_frame(rows, 8, "mixed", seed=seed).to_csv(index=False).encode("utf-8")))
+        for seed in range(reports)
+    ]
+    original = agent_engine.BASE_URL, agent_engine.rate_limiter, agent_engine.insight_cache, telemetry.ENABLED
+    modes = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Set before the SDK (and its client) is first loaded
+        agent_engine.BASE_URL = base_url
+        agent_engine.insight_cache = DiskCache(cache_dir, "insights")
+        telemetry.enable()
+        try:
+            thread = agent_engine.warm_up()
+            if thread is not None:
+                thread.join()
+            for mode, combined in MODES.items():
+                # Each mode starts with a full quota and (on the stub) an empty prefix cache
+                agent_engine.rate_limiter = RateLimiter(client_rpm, agent_engine.TOKENS_PER_MINUTE * client_rpm)
+                if stub is not None:
+                    stub.reset()
+                modes[mode] = run_mode(stats_list, combined)
+        finally:
+            agent_engine.BASE_URL, agent_engine.rate_limiter, agent_engine.insight_cache, telemetry.ENABLED = original
+
+    three_call, combined = modes["three_call"], modes["combined"]
+    return {
+        "reports": reports,
+        "rows_per_report": rows,
+        **modes,
+        "savings": {
+            "calls": _saved(three_call["calls"], combined["calls"]),
+            "input_tokens": _saved(three_call["input_tokens"], combined["input_tokens"]),
+            "uncached_input_tokens": _saved(
+                three_call["input_tokens"] - three_call["cached_tokens"],
+                combined["input_tokens"] - combined["cached_tokens"],
+            ),
+            "output_tokens": _saved(three_call["output_tokens"], combined["output_tokens"]),
+            "report_seconds_p50": _saved(three_call["report_seconds_p50"], combined["report_seconds_p50"]),
+            "elapsed_seconds": _saved(three_call["elapsed_seconds"], combined["elapsed_seconds"]),
+        },
+    }
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=20_000, help="Rows per dataset")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint (default: in-process stub)")
+    parser.add_argument("--client-rpm", type=float, default=6000, help="Client-side requests per minute")
+    stub_options = parser.add_argument_group("stub server")
+    stub_options.add_argument("--latency", default="lognormal:0.8,0.3", help="Time to first token distribution")
+    stub_options.add_argument("--token-latency", type=float, default=0.01, help="Seconds per completion token")
+    stub_options.add_argument("--completion-tokens", type=int, default=60, help="Completion tokens per insight")
+    stub_options.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.base_url:
+        report = run(args.reports, args.rows, args.base_url, args.client_rpm)
+    else:
+        stub = StubModel(
+            latency=args.latency, token_latency=args.token_latency, completion_tokens=args.completion_tokens,
+            seed=args.seed,
+        )
+        with BackgroundServer(stub) as server:
+            report = run(args.reports, args.rows, server.base_url, args.client_rpm, stub)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
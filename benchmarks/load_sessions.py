@@ -0,0 +1,158 @@
+"""
+Concurrent report-session load harness.
+
+Simulates N users, at most ``--concurrency`` at a time, each going through what the
+Streamlit app does for one report: upload a CSV, profile it with ``process_csv`` and stream
+the three insights (Trends, Anomalies, Actions) with ``agent_engine.iter_ai_insight``.
+Sessions run on threads, as Streamlit runs each session's script on its own thread, and
+share the engine's loop, client, rate limiter and caches.
+
+The model is the bundled stub server (src.stub_server, started in-process) unless
+``--base-url`` points at another OpenAI-compatible endpoint. Every session uploads
+different data, so neither stats nor insights come from a cache.
+
+Reports p50/p95/p99 latency per stage (stats, time to first insight token, whole insight,
+whole session), session throughput, errors by type, the client rate limiter's counters and
+the stub's request, 429 and token counters.
+
+Usage:
+    python -m benchmarks.load_sessions [--sessions 50] [--concurrency 10] [--rows 20000]
+        [--latency lognormal:0.5,0.4] [--token-latency 0.01] [--error-rate 0.02]
+        [--client-rpm 6000] [--base-url URL]
+"""
+import argparse
+import collections
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Any key will do for the stub; agent_engine reads it at import, for the client it builds
+# when the SDK is first loaded
+os.environ.setdefault("GEMINI_API_KEY", "load-test")
+
+from benchmarks.bench_pipeline import make_frame
+from src import agent_engine
+from src.data_processor import process_csv
+from src.disk_cache import DiskCache
+from src.rate_limit import RateLimiter
+from src.stub_server import BackgroundServer, StubModel
+
+INSIGHT_TYPES = ("Trends", "Anomalies", "Actions")
+PERCENTILES = (50, 95, 99)
+
+
+def latency_summary(samples: list) -> dict:
+    if not samples:
+        return {"count": 0}
+    values = np.percentile(samples, PERCENTILES)
+    return {
+        "count": len(samples),
+        **{f"p{q}": round(float(value), 4) for q, value in zip(PERCENTILES, values)},
+        "max": round(max(samples), 4),
+    }
+
+
+def run_session(data: bytes) -> dict:
+    """One report: profile the upload, then stream each insight in turn (like the tabs)."""
+    timings = {"insights": [], "first_token": [], "errors": []}
+    started = time.perf_counter()
+    stats = process_csv(io.BytesIO(data))
+    timings["stats"] = time.perf_counter() - started
+    for insight_type in INSIGHT_TYPES:
+        requested = time.perf_counter()
+        first = None
+        try:
+            for _ in agent_engine.iter_ai_insight(stats, insight_type):
+                if first is None:
+                    first = time.perf_counter() - requested
+        except agent_engine.AgentEngineError as e:
+            timings["errors"].append(type(e).__name__)
+            continue
+        timings["insights"].append(time.perf_counter() - requested)
+        if first is not None:
+            timings["first_token"].append(first)
+    timings["session"] = time.perf_counter() - started
+    return timings
+
+
+def run(sessions: int, concurrency: int, rows: int, base_url: str, client_rpm: float) -> dict:
+    uploads = [
+        make_frame(rows, 8, "mixed", seed=seed).to_csv(index=False).encode("utf-8") for seed in range(sessions)
+    ]
+    original = agent_engine.BASE_URL, agent_engine.rate_limiter, agent_engine.insight_cache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Set before the SDK (and its client) is first loaded
+        agent_engine.BASE_URL = base_url
+        agent_engine.rate_limiter = RateLimiter(client_rpm, agent_engine.TOKENS_PER_MINUTE * client_rpm)
+        agent_engine.insight_cache = DiskCache(cache_dir, "insights")
+        try:
+            # SDK import time is a cold-start cost, not a per-session one
+            thread = agent_engine.warm_up()
+            if thread is not None:
+                thread.join()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="session") as pool:
+                results = list(pool.map(run_session, uploads))
+            elapsed = time.perf_counter() - started
+            limiter = agent_engine.rate_limit_stats()
+        finally:
+            agent_engine.BASE_URL, agent_engine.rate_limiter, agent_engine.insight_cache = original
+
+    errors = collections.Counter(error for result in results for error in result["errors"])
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "rows_per_upload": rows,
+        "elapsed_seconds": round(elapsed, 4),
+        "sessions_per_second": round(sessions / elapsed, 3),
+        "insights_per_second": round(sum(len(result["insights"]) for result in results) / elapsed, 3),
+        "failed_sessions": sum(1 for result in results if result["errors"]),
+        "errors": dict(errors),
+        "latency_seconds": {
+            "stats": latency_summary([result["stats"] for result in results]),
+            "first_token": latency_summary([value for result in results for value in result["first_token"]]),
+            "insight": latency_summary([value for result in results for value in result["insights"]]),
+            "session": latency_summary([result["session"] for result in results]),
+        },
+        "rate_limit": limiter,
+    }
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10, help="Sessions in flight at once")
+    parser.add_argument("--rows", type=int, default=20_000, help="Rows per uploaded CSV")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible endpoint (default: in-process stub)")
+    parser.add_argument("--client-rpm", type=float, default=6000, help="Client-side requests per minute")
+    stub_options = parser.add_argument_group("stub server")
+    stub_options.add_argument("--latency", default="lognormal:0.5,0.4", help="Time to first token distribution")
+    stub_options.add_argument("--token-latency", type=float, default=0.01, help="Seconds between streamed tokens")
+    stub_options.add_argument("--completion-tokens", type=int, default=40)
+    stub_options.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    stub_options.add_argument("--retry-after", type=float, default=1.0)
+    stub_options.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.base_url:
+        report = run(args.sessions, args.concurrency, args.rows, args.base_url, args.client_rpm)
+    else:
+        stub = StubModel(
+            latency=args.latency, token_latency=args.token_latency, completion_tokens=args.completion_tokens,
+            error_rate=args.error_rate, retry_after=args.retry_after, seed=args.seed,
+        )
+        with BackgroundServer(stub) as server:
+            report = run(args.sessions, args.concurrency, args.rows, server.base_url, args.client_rpm)
+        report["stub"] = stub.stats()
+    print(json.dumps(report, indent=2))
+    return 1 if report["failed_sessions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
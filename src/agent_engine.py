@@ -1,49 +1,126 @@
 import os
 import asyncio
-import json
-from openai import AsyncOpenAI  # <--- Correct import source
-from agents import Agent, Runner, RunConfig, OpenAIChatCompletionsModel
+import queue
+import sys
+import threading
+import time
+from typing_extensions import TypedDict
 from dotenv import load_dotenv
 
+from src import telemetry
+from src.context_builder import build_context
+from src.disk_cache import CACHE_DIR, DiskCache, stable_hash
+from src.rate_limit import RateLimiter, backoff_delay
+from src.single_flight import SingleFlight
+
 # 1. SETUP
+# The openai and Agents SDK imports take seconds, so they (and the client, model and agents
+# built from them) are deferred until the first model call; see _load_sdk and warm_up.
 load_dotenv()
 gemini_api_key = os.getenv("GEMINI_API_KEY")
 
-# Configure the Gemini-compatible Client
-external_client = AsyncOpenAI(
-    api_key=gemini_api_key,
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
+# Any OpenAI-compatible chat completions endpoint; Gemini by default. For offline load tests
+# point it at the bundled stub server (python -m src.stub_server, base URL .../v1/)
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+BASE_URL = os.getenv("AGENT_BASE_URL") or DEFAULT_BASE_URL
+MODEL_ID = os.getenv("AGENT_MODEL_ID") or "gemini-2.5-flash-lite"
 
-# Configure the Model Adapter
-model = OpenAIChatCompletionsModel(
-    model="gemini-2.5-flash-lite",
-    openai_client=external_client,
-)
+# Bump whenever the agent instructions change so cached insights are not reused
+PROMPT_VERSION = "6"
 
-run_config = RunConfig(
-    model=model,
-    tracing_disabled=True,
-    
-)
+# get_ai_insights asks for several insights in one model call (a structured report over one
+# shared stats block) instead of one call each
+COMBINED_REPORT = os.getenv("AGENT_COMBINED_REPORT", "") not in ("", "0")
+
+# Offline mode for local runs and API tests: canned answers instead of model calls
+STUB_MODEL = os.getenv("AGENT_STUB_MODEL", "") not in ("", "0")
+STUB_LATENCY_SECONDS = float(os.getenv("AGENT_STUB_LATENCY_SECONDS", "0.05"))
+
+# Client-side quota, shared by every model call in the process
+REQUESTS_PER_MINUTE = float(os.getenv("AGENT_REQUESTS_PER_MINUTE", "15"))
+TOKENS_PER_MINUTE = float(os.getenv("AGENT_TOKENS_PER_MINUTE", "250000"))
+# Instructions and answer on top of the stats context, for the tokens/min estimate
+PROMPT_OVERHEAD_TOKENS = 600
+MAX_RETRIES = int(os.getenv("AGENT_MAX_RETRIES", "4"))
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+rate_limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+
+# --- ERRORS ---
+class AgentEngineError(Exception):
+    """
+    An insight could not be produced. The message is safe to show to users.
+    """
+    retry_after = None
+
+class UnknownInsightTypeError(AgentEngineError, ValueError):
+    pass
+
+class QuotaExceededError(AgentEngineError):
+    """
+    The model provider rejected the call for rate or quota reasons (HTTP 429).
+    """
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class UpstreamUnavailableError(AgentEngineError):
+    """
+    The model provider could not be reached or failed (timeouts, 5xx).
+    """
+
+_RETRYABLE = (QuotaExceededError, UpstreamUnavailableError)
+
+def _retry_after_seconds(error) -> float | None:
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def typed_error(error: Exception) -> AgentEngineError:
+    """
+    Maps provider/SDK exceptions onto the AgentEngineError hierarchy.
+    """
+    if isinstance(error, AgentEngineError):
+        return error
+    # Only a loaded openai package can have raised one of its errors
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(error, openai.RateLimitError):
+        return QuotaExceededError("The AI quota is exhausted for now.", _retry_after_seconds(error))
+    if openai is not None and isinstance(error, (openai.APIConnectionError, openai.InternalServerError)):
+        return UpstreamUnavailableError(f"The AI service is unavailable: {error}")
+    return AgentEngineError(f"Agent Engine Error: {error}")
+
+def describe_error(error: AgentEngineError) -> dict:
+    """
+    JSON-friendly form of an insight error (for reports and API responses).
+    """
+    return {"error": type(error).__name__, "message": str(error), "retry_after": error.retry_after}
+
+def rate_limit_stats() -> dict:
+    return rate_limiter.stats()
 
 # 2. DEFINE DYNAMIC INSTRUCTIONS
-# FIX: The 'context' argument is a RunContextWrapper. 
-# We must access 'context.context' to get the dictionary we passed in Runner.run().
+# The 'context' argument is a RunContextWrapper: 'context.context' is the dictionary we
+# passed in Runner.run().
+# Every prompt opens with the stats block, worded identically, and the agent's brief follows
+# it: prompts over the same stats then share a prefix the provider can cache (the combined
+# report sends one stats block for all three briefs).
 
-def trends_instructions(context, trend_agent):
-    # <--- ACCESS THE INNER DICTIONARY HERE
+def stats_prefix(context) -> str:
     stats = context.context.get("stats", "No data provided")
-    
-    return f"""
+    return f"""Statistical Summary of the dataset (abbreviated keys are explained in its "legend"):
+{stats}
+"""
+
+TRENDS_BRIEF = """
     You are a Data Trend Analyst.
     
-    Here is the Statistical Summary of the dataset:
-    {stats}
-    
     YOUR MISSION:
     1. Identify the overall direction (Growth/Decline/Stable).
-    2. Note the velocity of change (based on Min/Max delta).
+    2. Note the velocity of change. When a time series ("ts") is present, use its per-period
+       slope, growth and rolling figures (a high r2 means a steady trend); otherwise use the Min/Max delta.
     3. IGNORE individual outliers (focus on the aggregate).
     
     CONSTRAINTS:
@@ -52,18 +129,13 @@ def trends_instructions(context, trend_agent):
     - Do not use markdown headers (##), just plain text.
     """
 
-def anomalies_instructions(context, anomaly_agent):
-    # <--- ACCESS THE INNER DICTIONARY HERE
-    stats = context.context.get("stats", "No data provided")
-    
-    return f"""
+ANOMALIES_BRIEF = """
     You are a Forensic Security Auditor.
     
-    Here is the Statistical Summary of the dataset:
-    {stats}
-    
     YOUR MISSION:
-    1. Focus ONLY on the 'anomaly_detection' fields (Z-scores, Outliers).
+    1. Focus ONLY on the 'anomaly_detection' fields: per-column Z-score, robust MAD and IQR
+       outliers (with example values and their rows) and any row-level "mahalanobis" outliers
+       (rows whose combination of values is unusual). Outliers flagged by several detectors matter most.
     2. Explain WHY these specific points are unusual.
     3. IGNORE the general trend.
     
@@ -72,94 +144,483 @@ def anomalies_instructions(context, anomaly_agent):
     - Use an urgent, warning tone.
     """
 
-def actions_instructions(context, action_agent):
-    # <--- ACCESS THE INNER DICTIONARY HERE
-    stats = context.context.get("stats", "No data provided")
-    
-    return f"""
+ACTIONS_BRIEF = """
     You are a C-Level Strategy Consultant.
     
-    Here is the Statistical Summary of the dataset:
-    {stats}
-    
     YOUR MISSION:
     1. Suggest 3 concrete, realistic business actions based on these stats.
-    2. Prioritize actions that address the lowest performing areas or highest risks.
+    2. Prioritize actions that address the lowest performing areas or highest risks. When segment
+       breakdowns ("seg") are present, name the specific top/bottom segments (e.g. a Branch or Product).
     
     CONSTRAINTS:
     - Use a concise bullet-point format.
     - Be direct and authoritative.
     """
 
-# 3. INSTANTIATE AGENTS
-trend_agent = Agent(
-    name="Trend Analyst",
-    instructions=trends_instructions
-)
+def trends_instructions(context, trend_agent):
+    return stats_prefix(context) + TRENDS_BRIEF
 
-anomaly_agent = Agent(
-    name="Anomaly Hunter",
-    instructions=anomalies_instructions
-)
+def anomalies_instructions(context, anomaly_agent):
+    return stats_prefix(context) + ANOMALIES_BRIEF
+
+def actions_instructions(context, action_agent):
+    return stats_prefix(context) + ACTIONS_BRIEF
+
+def report_instructions(context, report_agent):
+    return stats_prefix(context) + f"""
+    Write one report on this summary, in three fields. Each field is written by the analyst
+    briefed for it below, following that brief alone.
+    
+    FIELD "trends":
+    {TRENDS_BRIEF}
+    FIELD "anomalies":
+    {ANOMALIES_BRIEF}
+    FIELD "actions":
+    {ACTIONS_BRIEF}"""
+
+# 3. AGENT REGISTRY
+# Plain descriptions: the SDK Agent objects are built with the client on first use
+class AgentSpec:
+    __slots__ = ("name", "instructions", "output_type")
+
+    def __init__(self, name: str, instructions, output_type=None):
+        self.name = name
+        self.instructions = instructions
+        self.output_type = output_type
+
+    def __repr__(self):
+        return f"AgentSpec({self.name!r})"
+
+AGENTS = {
+    "Trends": AgentSpec("Trend Analyst", trends_instructions),
+    "Anomalies": AgentSpec("Anomaly Hunter", anomalies_instructions),
+    "Actions": AgentSpec("Strategist", actions_instructions),
+}
+
+# The combined report: all three insights from one call, as structured output (pydantic
+# needs typing_extensions.TypedDict before Python 3.12)
+class InsightReport(TypedDict):
+    trends: str
+    anomalies: str
+    actions: str
+
+# Insight type -> InsightReport field
+REPORT_FIELDS = {"Trends": "trends", "Anomalies": "anomalies", "Actions": "actions"}
+# build_context's insight type for the report's shared stats block
+REPORT_CONTEXT = "Report"
+REPORT_AGENT = AgentSpec("Report Writer", report_instructions, output_type=InsightReport)
+
+_sdk = None
+_sdk_lock = threading.Lock()
+_warm_up_thread = None
+
+class _SDK:
+    """
+    The openai / Agents SDK objects the engine runs with, built once per process.
+    """
+    def __init__(self):
+        from agents import Agent, OpenAIChatCompletionsModel, RunConfig, Runner
+        from openai import AsyncOpenAI
+        from openai.types.responses import ResponseTextDeltaEvent
+
+        self.Runner = Runner
+        self.ResponseTextDeltaEvent = ResponseTextDeltaEvent
+        # Retries are scheduled by run_agent_process, not the client
+        self.client = AsyncOpenAI(api_key=gemini_api_key, base_url=BASE_URL, max_retries=0)
+        self.model = OpenAIChatCompletionsModel(model=MODEL_ID, openai_client=self.client)
+        self.run_config = RunConfig(model=self.model, tracing_disabled=True)
+        self.agents = {
+            spec.name: Agent(name=spec.name, instructions=spec.instructions, output_type=spec.output_type)
+            for spec in (*AGENTS.values(), REPORT_AGENT)
+        }
+
+    def agent(self, agent):
+        # Registry entries map onto their SDK agents; SDK agents are used as they are
+        return self.agents[agent.name] if isinstance(agent, AgentSpec) else agent
+
+def _load_sdk() -> _SDK:
+    global _sdk
+    if _sdk is None:
+        with _sdk_lock:
+            if _sdk is None:
+                with telemetry.span("load_sdk"):
+                    _sdk = _SDK()
+    return _sdk
+
+def warm_up() -> threading.Thread | None:
+    """
+    Loads the SDK and builds the client in a background thread, so the first insight
+    does not pay for the imports. A no-op (None) once loaded or with the stub model.
+    """
+    global _warm_up_thread
+    if _sdk is not None or STUB_MODEL:
+        return None
+    with _sdk_lock:
+        if _warm_up_thread is None:
+            _warm_up_thread = threading.Thread(target=_load_sdk, name="agent-engine-warm-up", daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+_LAZY_ATTRS = {
+    "external_client": lambda sdk: sdk.client,
+    "model": lambda sdk: sdk.model,
+    "run_config": lambda sdk: sdk.run_config,
+    "trend_agent": lambda sdk: sdk.agents["Trend Analyst"],
+    "anomaly_agent": lambda sdk: sdk.agents["Anomaly Hunter"],
+    "action_agent": lambda sdk: sdk.agents["Strategist"],
+    "report_agent": lambda sdk: sdk.agents["Report Writer"],
+}
 
-action_agent = Agent(
-    name="Strategist",
-    instructions=actions_instructions
+def __getattr__(name):
+    # The SDK objects this module used to build at import, built on first access instead
+    if name in _LAZY_ATTRS:
+        return _LAZY_ATTRS[name](_load_sdk())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Max agent runs in flight per get_ai_insights() call
+MAX_CONCURRENT_AGENT_RUNS = int(os.getenv("AGENT_MAX_CONCURRENCY", "3"))
+
+# Disk-backed insight cache shared by every process/replica using the same CACHE_DIR
+insight_cache = DiskCache(
+    os.getenv("INSIGHT_CACHE_DIR", CACHE_DIR),
+    "insights",
+    max_entries=int(os.getenv("INSIGHT_CACHE_MAX_ENTRIES", "5000")),
+    ttl_seconds=float(os.getenv("INSIGHT_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
 )
 
-# 4. ASYNC EXECUTION WRAPPER
+# Identical insight requests in flight at the same time (e.g. several sessions opening the
+# same file) share one model call, across threads and event loops
+insight_flights = SingleFlight()
+
+def insight_cache_key(agent, context_data: dict) -> str:
+    """
+    Content address of one insight: pruned stats JSON + agent + model (and endpoint, when not
+    the default) + prompt version.
+    """
+    if STUB_MODEL:
+        model = "stub"
+    else:
+        # Answers from another endpoint (e.g. the stub server) never stand in for Gemini's
+        model = MODEL_ID if BASE_URL == DEFAULT_BASE_URL else f"{MODEL_ID}@{BASE_URL}"
+    return stable_hash(context_data["stats"], agent.name, model, PROMPT_VERSION)
+
+# 4. PERSISTENT EVENT LOOP
+# asyncio.run() creates and closes a loop per call, which also throws away the
+# AsyncOpenAI connection pool (it is bound to the loop it first ran on).
+# Instead, every agent run is scheduled onto one long-lived background loop.
+_engine_loop = None
+_engine_loop_lock = threading.Lock()
+
+def _get_engine_loop() -> asyncio.AbstractEventLoop:
+    global _engine_loop
+    with _engine_loop_lock:
+        if _engine_loop is None or _engine_loop.is_closed():
+            _engine_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_engine_loop.run_forever,
+                name="agent-engine-loop",
+                daemon=True,
+            ).start()
+    return _engine_loop
+
+def run_sync(coro):
+    """
+    Runs a coroutine on the shared engine loop and blocks until it finishes.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_engine_loop()).result()
+
+# 5. ASYNC EXECUTION WRAPPER
 async def run_agent_process(agent, context_data):
     """
     Handles the async nature of the Agents SDK Runner.
     """
-    # We pass 'context_data' here. 
-    # It becomes 'context.context' inside the instruction functions.
-    result = await Runner.run(
-        starting_agent=agent,
-        input="Analyze the provided statistics and generate the report.",
-        context=context_data,
-        run_config=run_config
+    tokens = _estimated_tokens(context_data)
+    with telemetry.span("llm", agent=agent.name, prompt_chars=len(context_data["stats"]), tokens=tokens) as stage:
+        if STUB_MODEL:
+            return await stub_agent_process(agent, context_data)
+        sdk = await asyncio.to_thread(_load_sdk)
+        for attempt in range(MAX_RETRIES + 1):
+            stage.set(attempts=attempt + 1)
+            await rate_limiter.acquire(tokens)
+            try:
+                # We pass 'context_data' here.
+                # It becomes 'context.context' inside the instruction functions.
+                result = await sdk.Runner.run(
+                    starting_agent=sdk.agent(agent),
+                    input="Analyze the provided statistics and generate the report.",
+                    context=context_data,
+                    run_config=sdk.run_config
+                )
+                stage.set(**_measured_usage(result))
+                return result.final_output
+            except Exception as e:
+                await _backoff_or_raise(typed_error(e), attempt)
+
+def _estimated_tokens(context_data: dict) -> int:
+    return context_data["context_report"]["tokens_after"] + PROMPT_OVERHEAD_TOKENS
+
+def _measured_usage(result) -> dict:
+    """
+    Tokens the provider reports for a finished run (cached_tokens: prompt tokens served from
+    its prefix cache), for the "llm" / "llm_stream" spans.
+    """
+    usage = result.context_wrapper.usage
+    return {
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "cached_tokens": usage.input_tokens_details.cached_tokens or 0,
+    }
+
+async def _backoff_or_raise(error: AgentEngineError, attempt: int) -> None:
+    """
+    Sleeps before the next attempt of a retryable error; raises anything else, and gives
+    up once the retries are spent or the provider asks for a longer wait than we allow.
+    """
+    retry_after = error.retry_after
+    if isinstance(error, QuotaExceededError):
+        rate_limiter.record("rate_limited")
+    if not isinstance(error, _RETRYABLE) or attempt >= MAX_RETRIES or (retry_after or 0) > RETRY_MAX_SECONDS:
+        rate_limiter.record("failed")
+        raise error
+    delay = backoff_delay(attempt, RETRY_BASE_SECONDS, RETRY_MAX_SECONDS, retry_after)
+    if isinstance(error, QuotaExceededError):
+        # Everyone waits, not just this caller
+        rate_limiter.pause(delay)
+    rate_limiter.record("retries")
+    await asyncio.sleep(delay)
+
+async def stub_agent_process(agent, context_data):
+    """
+    Stand-in for the model (AGENT_STUB_MODEL=1): a deterministic answer after a fixed delay.
+    """
+    await asyncio.sleep(STUB_LATENCY_SECONDS)
+    report = context_data["context_report"]
+    answer = (
+        f"[stub] {agent.name} reviewed {report['columns_kept']} columns "
+        f"(~{report['tokens_after']} context tokens)."
     )
-    
-    return result.final_output
+    if agent.output_type is InsightReport:
+        return {field: answer for field in REPORT_FIELDS.values()}
+    return answer
 
-# 5. MAIN ENTRY POINT (Called by App.py)
-# Replace your existing get_ai_insight function with this Optimized Version
+async def stream_agent_process(agent, context_data):
+    """
+    Streamed counterpart of run_agent_process: yields text deltas as the model emits them.
+    """
+    tokens = _estimated_tokens(context_data)
+    with telemetry.span("llm_stream", agent=agent.name, prompt_chars=len(context_data["stats"]), tokens=tokens) as stage:
+        started = time.perf_counter()
+        if STUB_MODEL:
+            yield await stub_agent_process(agent, context_data)
+            return
+        sdk = await asyncio.to_thread(_load_sdk)
+        for attempt in range(MAX_RETRIES + 1):
+            stage.set(attempts=attempt + 1)
+            await rate_limiter.acquire(tokens)
+            emitted = False
+            try:
+                result = sdk.Runner.run_streamed(
+                    starting_agent=sdk.agent(agent),
+                    input="Analyze the provided statistics and generate the report.",
+                    context=context_data,
+                    run_config=sdk.run_config
+                )
+                async for event in result.stream_events():
+                    if event.type == "raw_response_event" and isinstance(event.data, sdk.ResponseTextDeltaEvent):
+                        if not emitted:
+                            stage.set(first_delta_seconds=round(time.perf_counter() - started, 4))
+                        emitted = True
+                        yield event.data.delta
+                stage.set(**_measured_usage(result))
+                return
+            except Exception as e:
+                error = typed_error(e)
+                # Text already shown cannot be taken back, so only retry before the first delta
+                if emitted:
+                    raise error from (None if error is e else e)
+                await _backoff_or_raise(error, attempt)
 
-def get_ai_insight(stats_dict: dict, insight_type: str) -> str:
+def _prepare_context(stats_dict: dict, insight_type: str) -> dict:
     """
-    Synchronous wrapper that routes the request and runs the async agent.
+    Builds the compact, token-budgeted stats context for one agent.
     """
-    
     # --- OPTIMIZATION: PRUNE DATA (The Diet) ---
-    # We create a lightweight copy to send to the LLM.
-    # We remove 'data_types_distribution' which is useless text that costs tokens.
-    clean_stats = stats_dict.copy()
-    if "overall_summary" in clean_stats:
-        # Remove verbose metadata that the AI doesn't strictly need
-        clean_stats["overall_summary"].pop("data_types_distribution", None)
-    
-    # For 'Trends', we don't need the detailed outlier examples (save tokens)
-    if insight_type == "Trends" and "numeric_columns" in clean_stats:
-        for col in clean_stats["numeric_columns"]:
-            clean_stats["numeric_columns"][col].pop("anomaly_detection_zscore_outliers_examples", None)
-
-    # 1. Route to the correct Agent
-    if insight_type == "Trends":
-        selected_agent = trend_agent
-    elif insight_type == "Anomalies":
-        selected_agent = anomaly_agent
-    elif insight_type == "Actions":
-        selected_agent = action_agent
-    else:
-        return "Error: Invalid Insight Type Requested"
+    # build_context never mutates stats_dict (several agents share it concurrently).
+    with telemetry.span("build_context", insight_type=insight_type) as stage:
+        stats_text, context_report = build_context(stats_dict, insight_type)
+        stage.set(prompt_chars=len(stats_text), tokens=context_report["tokens_after"])
+    return {"stats": stats_text, "context_report": context_report}
+
+# 6. MAIN ENTRY POINTS
+async def get_ai_report(stats_dict: dict, use_cache: bool = True,
+                        semaphore: asyncio.Semaphore | None = None) -> dict:
+    """
+    All three insights from one model call: the Report Writer answers with an InsightReport
+    (structured output) over a single stats block shared by the three briefs, instead of
+    one call and one stats block per agent.
+
+    Args:
+        stats_dict: Summary statistics produced by the data processor.
+        use_cache: Serve and store the report through the disk-backed insight cache.
+        semaphore: Limiter shared with other calls (e.g. one per batch run).
+
+    Returns:
+        A dictionary mapping "Trends", "Anomalies" and "Actions" to their text.
+
+    Raises:
+        AgentEngineError: If the report fails (including a malformed structured answer).
+    """
+    context_data = _prepare_context(stats_dict, REPORT_CONTEXT)
+    cache_key = insight_cache_key(REPORT_AGENT, context_data)
+    if use_cache:
+        cached = await asyncio.to_thread(insight_cache.get, cache_key)
+        if cached is not None:
+            return cached
+
+    semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENT_AGENT_RUNS)
+
+    async def call():
+        async with semaphore:
+            report = await run_agent_process(REPORT_AGENT, context_data)
+        result = {insight_type: report[field] for insight_type, field in REPORT_FIELDS.items()}
+        if use_cache:
+            await asyncio.to_thread(insight_cache.set, cache_key, result)
+        return result
 
-    # 2. Prepare Context 
-    # Now we dump the 'clean_stats' instead of the full dict
-    context_data = {"stats": json.dumps(clean_stats, indent=2)}
-    
-    # 3. Run Async Loop
     try:
-        return asyncio.run(run_agent_process(selected_agent, context_data))
+        return await insight_flights.do((cache_key, use_cache), call)
     except Exception as e:
-        return f"Agent Engine Error: {str(e)}"
\ No newline at end of file
+        raise typed_error(e) from e
+
+async def get_ai_insights(stats_dict: dict, insight_types=tuple(AGENTS), max_concurrency: int | None = None,
+                          use_cache: bool = True, semaphore: asyncio.Semaphore | None = None,
+                          combined: bool | None = None) -> dict:
+    """
+    Runs the requested agents concurrently on the current loop.
+
+    Args:
+        stats_dict: Summary statistics produced by the data processor.
+        insight_types: Any of "Trends", "Anomalies", "Actions".
+        max_concurrency: Cap on agent runs in flight (defaults to AGENT_MAX_CONCURRENCY).
+        use_cache: Serve and store results through the disk-backed insight cache.
+        semaphore: Limiter shared with other calls (e.g. one per batch run); overrides
+            max_concurrency.
+        combined: Answer two or more insight types with one get_ai_report call (defaults to
+            AGENT_COMBINED_REPORT).
+
+    Returns:
+        A dictionary mapping each insight type to its text, or to the AgentEngineError it
+        failed with (like asyncio.gather(return_exceptions=True)).
+    """
+    semaphore = semaphore or asyncio.Semaphore(max_concurrency or MAX_CONCURRENT_AGENT_RUNS)
+    combined = COMBINED_REPORT if combined is None else combined
+
+    async def run_one(insight_type):
+        selected_agent = AGENTS.get(insight_type)
+        if selected_agent is None:
+            return UnknownInsightTypeError(f"Invalid insight type requested: {insight_type}")
+        context_data = _prepare_context(stats_dict, insight_type)
+        cache_key = insight_cache_key(selected_agent, context_data)
+        if use_cache:
+            cached = await asyncio.to_thread(insight_cache.get, cache_key)
+            if cached is not None:
+                return cached
+
+        async def call():
+            async with semaphore:
+                result = await run_agent_process(selected_agent, context_data)
+            if use_cache:
+                await asyncio.to_thread(insight_cache.set, cache_key, result)
+            return result
+
+        try:
+            # Keyed by the same content address as the cache (stats, agent, model, prompt)
+            return await insight_flights.do((cache_key, use_cache), call)
+        except Exception as e:
+            return typed_error(e)
+
+    insight_types = list(dict.fromkeys(insight_types))
+    results = {}
+    if combined and sum(insight_type in REPORT_FIELDS for insight_type in insight_types) > 1:
+        try:
+            results = await get_ai_report(stats_dict, use_cache=use_cache, semaphore=semaphore)
+        except AgentEngineError as e:
+            results = dict.fromkeys(REPORT_FIELDS, e)
+    pending = [insight_type for insight_type in insight_types if insight_type not in results]
+    results.update(zip(pending, await asyncio.gather(*(run_one(insight_type) for insight_type in pending))))
+    return {insight_type: results[insight_type] for insight_type in insight_types}
+
+async def stream_ai_insight(stats_dict: dict, insight_type: str, use_cache: bool = True):
+    """
+    Async generator of text deltas for one insight. Cache hits are yielded whole; a fully
+    streamed answer is written to the insight cache once the stream finishes. Concurrent
+    identical requests (e.g. several sessions opening the same file) share one streamed
+    model call: callers that join late get the deltas so far replayed, then follow along.
+
+    Raises:
+        AgentEngineError: If the insight fails (possibly after some deltas were yielded).
+    """
+    selected_agent = AGENTS.get(insight_type)
+    if selected_agent is None:
+        raise UnknownInsightTypeError(f"Invalid insight type requested: {insight_type}")
+    context_data = _prepare_context(stats_dict, insight_type)
+    cache_key = insight_cache_key(selected_agent, context_data)
+    if use_cache:
+        cached = await asyncio.to_thread(insight_cache.get, cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    async def upstream():
+        parts = []
+        try:
+            async for delta in stream_agent_process(selected_agent, context_data):
+                parts.append(delta)
+                yield delta
+        except AgentEngineError:
+            raise
+        except Exception as e:
+            raise typed_error(e) from e
+        # Written by the shared stream, so it lands even if the first caller has left
+        if use_cache:
+            await asyncio.to_thread(insight_cache.set, cache_key, "".join(parts))
+
+    async for delta in insight_flights.stream((cache_key, use_cache), upstream):
+        yield delta
+
+_STREAM_DONE = object()
+
+def iter_ai_insight(stats_dict: dict, insight_type: str):
+    """
+    Synchronous generator of text deltas (called by App.py). The stream is pumped on the
+    shared engine loop; closing the generator early cancels the agent run. Errors surface
+    as AgentEngineError once the deltas received before them have been yielded.
+    """
+    deltas = queue.Queue()
+
+    async def pump():
+        try:
+            async for delta in stream_ai_insight(stats_dict, insight_type):
+                deltas.put(delta)
+        finally:
+            deltas.put(_STREAM_DONE)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _get_engine_loop())
+    try:
+        while (delta := deltas.get()) is not _STREAM_DONE:
+            yield delta
+        future.result()
+    finally:
+        future.cancel()
+
+def get_ai_insight(stats_dict: dict, insight_type: str) -> str:
+    """
+    Synchronous wrapper (called by App.py): runs one agent on the shared engine loop.
+
+    Raises:
+        AgentEngineError: QuotaExceededError, UpstreamUnavailableError, ... on failure.
+    """
+    result = run_sync(get_ai_insights(stats_dict, [insight_type]))[insight_type]
+    if isinstance(result, AgentEngineError):
+        raise result
+    return result
@@ -0,0 +1,169 @@
+import numpy as np
+
+ZSCORE_THRESHOLD = 3
+# Modified z-score 0.6745 * |x - median| / MAD (Iglewicz & Hoaglin)
+MAD_THRESHOLD = 3.5
+MAD_CONSISTENCY = 0.6745
+# Tukey fences: outside [Q1 - 1.5 IQR, Q3 + 1.5 IQR]
+IQR_MULTIPLIER = 1.5
+MAX_EXAMPLES = 5
+
+# Row-level detector: squared Mahalanobis distance above the chi-square 99.9% quantile
+MAHALANOBIS_QUANTILE_Z = 3.0902  # standard normal 99.9% quantile
+MAX_MAHALANOBIS_COLUMNS = 20
+
+
+# --- DETECTORS ---
+# Each detector maps per-column statistics (NumPy arrays) to (center, scale, threshold,
+# applicable): a value is an outlier when |x - center| / scale > threshold.
+
+def zscore_detector(stats: dict) -> tuple:
+    return stats["mean"], stats["std"], ZSCORE_THRESHOLD, stats["std"] > 0
+
+
+def mad_detector(stats: dict) -> tuple:
+    return stats["median"], stats["mad"] / MAD_CONSISTENCY, MAD_THRESHOLD, stats["mad"] > 0
+
+
+def iqr_detector(stats: dict) -> tuple:
+    iqr = stats["75%"] - stats["25%"]
+    # The fences are symmetric around the quartiles' midpoint
+    return (stats["25%"] + stats["75%"]) / 2, iqr, 0.5 + IQR_MULTIPLIER, iqr > 0
+
+
+DETECTORS = {
+    "zscore": zscore_detector,
+    "mad": mad_detector,
+    "iqr": iqr_detector,
+}
+
+# The z-score fields predate sampling and keep reporting the first outliers in row order
+FIRST_EXAMPLES = {"zscore"}
+
+
+def detector_params(stats: dict) -> dict:
+    return {name: detector(stats) for name, detector in DETECTORS.items()}
+
+
+def select_columns(params: dict, idx) -> dict:
+    """Restricts detector parameters to the columns at positions ``idx``."""
+    return {
+        name: (center[idx], scale[idx], threshold, applicable[idx])
+        for name, (center, scale, threshold, applicable) in params.items()
+    }
+
+
+def outlier_masks(block: np.ndarray, params: dict, scratch: np.ndarray | None = None) -> dict:
+    """
+    Evaluates every detector over all columns of a (rows, columns) float64 block at once.
+
+    ``scratch`` (same shape as ``block``) is reused for the intermediate deviations.
+    Returns one boolean (rows, columns) mask per detector; NaNs are never outliers and
+    columns where a detector does not apply are all False.
+    """
+    if scratch is None:
+        scratch = np.empty_like(block)
+    masks = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for name, (center, scale, threshold, applicable) in params.items():
+            np.subtract(block, center, out=scratch)
+            np.abs(scratch, out=scratch)
+            np.divide(scratch, scale, out=scratch)
+            mask = scratch > threshold
+            mask[:, ~applicable] = False
+            masks[name] = mask
+    return masks
+
+
+def could_have_outliers(params: dict, minimum: float, maximum: float, idx: int) -> bool:
+    """Whether any applicable detector's fences lie inside [minimum, maximum] for column ``idx``."""
+    for center, scale, threshold, applicable in params.values():
+        if applicable[idx] and max(center[idx] - minimum, maximum - center[idx]) / scale[idx] > threshold:
+            return True
+    return False
+
+
+def row_priority(positions: np.ndarray) -> np.ndarray:
+    """
+    Deterministic pseudo-random priority per row position (SplitMix64), so sampling picks
+    the same rows however the data is chunked.
+    """
+    z = positions.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def pick_examples(positions: np.ndarray, first: bool, k: int = MAX_EXAMPLES) -> np.ndarray:
+    """
+    Chooses up to ``k`` example rows out of the (ascending) outlier ``positions``.
+
+    With ``first`` these are the first ``k``; otherwise a uniform sample without replacement
+    (the ``k`` lowest priorities, i.e. bottom-k reservoir sampling), returned in row order.
+    Picking from the union of earlier picks and new candidates gives the same result as
+    picking from everything at once, so it works across chunks.
+    """
+    if len(positions) <= k:
+        return positions
+    if first:
+        return positions[:k]
+    chosen = positions[np.argpartition(row_priority(positions), k - 1)[:k]]
+    return np.sort(chosen)
+
+
+def _chi2_quantile(dof: int, z: float) -> float:
+    # Wilson-Hilferty approximation of the chi-square quantile
+    h = 2 / (9 * dof)
+    return dof * (1 - h + z * np.sqrt(h)) ** 3
+
+
+def mahalanobis_outliers(block: np.ndarray, columns: list) -> dict | None:
+    """
+    Row-level multivariate outliers: squared Mahalanobis distance of each complete row from
+    the column means, under the (pseudo-inverted) correlation matrix of the complete rows.
+
+    Args:
+        block: (rows, columns) float64 values in row order, columns with a positive spread.
+        columns: Column names for ``block``.
+
+    Returns:
+        Counts, the threshold and sampled example rows (positions) with the columns that
+        deviate most, or None if there are too few columns or complete rows.
+    """
+    n_cols = block.shape[1]
+    complete = np.flatnonzero(~np.isnan(block).any(axis=1))
+    if n_cols < 2 or len(complete) <= 2 * n_cols:
+        return None
+
+    values = block[complete] if len(complete) < len(block) else block
+    standardized = values - values.mean(axis=0)
+    del values
+    std = np.sqrt(np.einsum("ij,ij->j", standardized, standardized) / (len(complete) - 1))
+    if not (std > 0).all():
+        return None
+    standardized /= std
+    # Correlation matrix of the complete rows (already centred and scaled)
+    correlation = standardized.T @ standardized / (len(complete) - 1)
+    precision = np.linalg.pinv(correlation, hermitian=True)
+    distances = np.einsum("ij,ij->i", standardized @ precision, standardized)
+
+    threshold = _chi2_quantile(n_cols, MAHALANOBIS_QUANTILE_Z)
+    outliers = np.flatnonzero(distances > threshold)
+    chosen = pick_examples(complete[outliers], first=False)
+    chosen_idx = np.searchsorted(complete, chosen)
+    examples = []
+    for pos, idx in zip(chosen, chosen_idx):
+        deviations = standardized[idx]
+        top = np.argsort(-np.abs(deviations), kind="stable")[:3]
+        examples.append({
+            "row": int(pos),
+            "distance": float(np.sqrt(distances[idx])),
+            "top_deviations_z": {columns[j]: float(deviations[j]) for j in top},
+        })
+    return {
+        "columns": list(columns),
+        "rows_evaluated": len(complete),
+        "distance_threshold": float(np.sqrt(threshold)),
+        "outliers_count": len(outliers),
+        "examples": examples,
+    }
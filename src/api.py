@@ -0,0 +1,337 @@
+"""
+ASGI report API, served alongside the Streamlit app.
+
+    POST /reports?filename=sales.csv    raw CSV/XLSX body -> summary statistics (immediately;
+                                        bodies over UPLOAD_SPILL_THRESHOLD_MB are spilled to disk)
+    POST /reports/{report_id}/insights  {"insight_types": [...]} -> 202 + job (queued)
+    GET  /jobs/{job_id}                 job status and, once done, the insights
+    GET  /metrics                       queue depth, job counters, latencies and stage timings
+    GET  /metrics/prometheus            stage timings in the Prometheus text format
+    GET  /healthz
+
+Insight jobs run through src.agent_engine on a bounded queue drained by a fixed pool of
+async workers. A full queue answers 429 and a server that is not accepting work (starting,
+shutting down, or with every profiling slot busy) answers 503, both with Retry-After.
+
+Usage:
+    uvicorn src.api:app --port 8000
+    AGENT_STUB_MODEL=1 uvicorn src.api:app    # canned answers, no model calls
+    TELEMETRY=1 uvicorn src.api:app           # record per-stage spans (see src.telemetry)
+"""
+import asyncio
+import collections
+import json
+import math
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from src import agent_engine, telemetry, uploads
+from src.data_processor import content_hash, process_csv_cached, process_excel_cached
+
+QUEUE_SIZE = int(os.getenv("API_QUEUE_SIZE", "32"))
+INSIGHT_WORKERS = int(os.getenv("API_INSIGHT_WORKERS", "2"))
+# Concurrent uploads being profiled (CPU-bound, in threads)
+MAX_PROFILING = int(os.getenv("API_MAX_PROFILING", str(os.cpu_count() or 1)))
+MAX_UPLOAD_BYTES = int(os.getenv("API_MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+# Streamed in chunks above this size, as in the Streamlit app
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+STREAMING_CHUNK_ROWS = 100_000
+INCREMENTAL_PROFILING = os.getenv("INCREMENTAL_PROFILING", "1") not in ("", "0")
+# Finished jobs and profiled reports kept in memory (oldest evicted first)
+MAX_JOBS = int(os.getenv("API_MAX_JOBS", "1000"))
+MAX_REPORTS = int(os.getenv("API_MAX_REPORTS", "256"))
+LATENCY_WINDOW = 1000
+
+
+def _jsonable(value):
+    # Stats may hold NumPy scalars and NaN/inf, which strict JSON has no literal for
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class StatsResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        with telemetry.span("serialize_json") as stage:
+            body = json.dumps(_jsonable(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            stage.set(bytes=len(body))
+        return body
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "p50": round(pick(0.5), 4),
+        "p95": round(pick(0.95), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+class InsightQueue:
+    """
+    Bounded job queue drained by ``workers`` coroutines, each running one job at a time.
+    """
+
+    def __init__(self, maxsize: int = QUEUE_SIZE, workers: int = INSIGHT_WORKERS):
+        self.maxsize = maxsize
+        self.worker_count = workers
+        self.queue = None
+        self.workers = []
+        self.jobs = collections.OrderedDict()
+        self.running = 0
+        self.counters = collections.Counter()
+        self.wait_seconds = collections.deque(maxlen=LATENCY_WINDOW)
+        self.run_seconds = collections.deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def accepting(self) -> bool:
+        return self.queue is not None
+
+    def start(self) -> None:
+        self.queue = asyncio.Queue(maxsize=self.maxsize)
+        self.workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+
+    async def stop(self) -> None:
+        queue, self.queue = self.queue, None
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        # Jobs that never started still need a final status for clients polling them
+        while queue is not None and not queue.empty():
+            job, _ = queue.get_nowait()
+            job["status"] = "failed"
+            job["error"] = "Server shutting down"
+            job["finished_at"] = time.time()
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        mean_run = sum(self.run_seconds) / len(self.run_seconds) if self.run_seconds else 1.0
+        depth = self.queue.qsize() if self.queue else 0
+        return max(1, math.ceil(mean_run * (depth + 1) / max(1, self.worker_count)))
+
+    def submit(self, stats: dict, insight_types: list, report_id: str) -> dict:
+        """Queues a job; raises asyncio.QueueFull when there is no room."""
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "report_id": report_id,
+            "insight_types": insight_types,
+            "status": "queued",
+            "submitted_at": time.time(),
+        }
+        self.queue.put_nowait((job, stats))
+        self.jobs[job["job_id"]] = job
+        self.counters["submitted"] += 1
+        while len(self.jobs) > MAX_JOBS:
+            oldest = next(iter(self.jobs))
+            if self.jobs[oldest]["status"] in ("queued", "running"):
+                break
+            self.jobs.popitem(last=False)
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            job, stats = await self.queue.get()
+            started = time.time()
+            self.wait_seconds.append(started - job["submitted_at"])
+            job["status"] = "running"
+            self.running += 1
+            try:
+                results = await agent_engine.get_ai_insights(stats, job["insight_types"])
+                job["result"] = {
+                    name: value for name, value in results.items() if not isinstance(value, Exception)
+                }
+                errors = {
+                    name: agent_engine.describe_error(value) for name, value in results.items()
+                    if isinstance(value, Exception)
+                }
+                if errors:
+                    job["errors"] = errors
+                job["status"] = "done"
+                self.counters["completed"] += 1
+            except asyncio.CancelledError:
+                job["status"] = "failed"
+                job["error"] = "Server shutting down"
+                raise
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                self.counters["failed"] += 1
+            finally:
+                self.running -= 1
+                job["finished_at"] = time.time()
+                self.run_seconds.append(job["finished_at"] - started)
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "queue_capacity": self.maxsize,
+            "workers": self.worker_count,
+            "jobs_running": self.running,
+            "jobs": {name: self.counters[name] for name in ("submitted", "completed", "failed", "rejected")},
+            "queue_wait_seconds": _percentiles(self.wait_seconds),
+            "run_seconds": _percentiles(self.run_seconds),
+        }
+
+
+def _unavailable(message: str, status_code: int, retry_after: int) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status_code, headers={"Retry-After": str(retry_after)})
+
+
+def create_app(queue_size: int = QUEUE_SIZE, workers: int = INSIGHT_WORKERS,
+               max_profiling: int = MAX_PROFILING) -> Starlette:
+    """
+    Builds the API with its own job queue and report store.
+    """
+    insights = InsightQueue(queue_size, workers)
+    reports = collections.OrderedDict()
+    profiling = {"active": 0, "seconds": collections.deque(maxlen=LATENCY_WINDOW)}
+
+    async def upload(request: Request) -> JSONResponse:
+        if not insights.accepting:
+            return _unavailable("Server is not accepting work", 503, 5)
+        if profiling["active"] >= max_profiling:
+            return _unavailable("All profiling slots are busy", 503, 1)
+        # Reserved before the body arrives (nothing awaited between the check and here), so
+        # uploads still sending their bodies count against the limit
+        profiling["active"] += 1
+        try:
+            return await receive_and_profile(request)
+        finally:
+            profiling["active"] -= 1
+
+    async def receive_and_profile(request: Request) -> JSONResponse:
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > MAX_UPLOAD_BYTES:
+            return JSONResponse({"error": "Upload too large"}, status_code=413)
+        try:
+            with telemetry.span("upload") as stage:
+                # Large bodies go to a memory-mapped temp file as they arrive (see src.uploads)
+                received = await uploads.receive(request.stream(), MAX_UPLOAD_BYTES)
+                stage.set(bytes=received.size, spilled=received.spilled)
+        except uploads.UploadTooLargeError:
+            return JSONResponse({"error": "Upload too large"}, status_code=413)
+
+        filename = request.query_params.get("filename", "upload.csv")
+        with received:
+            if not received.size:
+                return JSONResponse({"error": "Empty upload"}, status_code=400)
+            buffer = received.buffer
+            started = time.perf_counter()
+            chunksize = STREAMING_CHUNK_ROWS if received.size > STREAMING_THRESHOLD_BYTES else None
+
+            def profile() -> tuple[str, dict]:
+                # Hashing a large upload is CPU work too, so it stays off the event loop
+                digest = content_hash(buffer)
+                if filename.lower().endswith(".xlsx"):
+                    return digest, process_excel_cached(buffer, digest=digest)
+                return digest, process_csv_cached(
+                    buffer, chunksize=chunksize, digest=digest, incremental=INCREMENTAL_PROFILING,
+                )
+
+            try:
+                digest, stats = await asyncio.to_thread(profile)
+            except Exception as e:
+                return JSONResponse({"error": str(e)}, status_code=422)
+            finally:
+                profiling["seconds"].append(time.perf_counter() - started)
+
+        reports[digest] = stats
+        reports.move_to_end(digest)
+        while len(reports) > MAX_REPORTS:
+            reports.popitem(last=False)
+        return StatsResponse({"report_id": digest, "filename": filename, "stats": stats})
+
+    async def request_insights(request: Request) -> JSONResponse:
+        stats = reports.get(request.path_params["report_id"])
+        if stats is None:
+            return JSONResponse({"error": "Unknown report; upload the file again"}, status_code=404)
+        try:
+            payload = await request.json() if await request.body() else {}
+        except ValueError:
+            return JSONResponse({"error": "Request body is not valid JSON"}, status_code=400)
+        if not isinstance(payload, dict):
+            return JSONResponse({"error": "Request body must be a JSON object"}, status_code=400)
+        insight_types = payload.get("insight_types") or list(agent_engine.AGENTS)
+        if not isinstance(insight_types, list) or not all(isinstance(name, str) for name in insight_types):
+            return JSONResponse({"error": "insight_types must be a list of strings"}, status_code=400)
+        unknown = [name for name in insight_types if name not in agent_engine.AGENTS]
+        if unknown:
+            return JSONResponse({"error": f"Unknown insight types: {unknown}"}, status_code=400)
+        if not insights.accepting:
+            return _unavailable("Server is not accepting work", 503, 5)
+        try:
+            job = insights.submit(stats, insight_types, request.path_params["report_id"])
+        except asyncio.QueueFull:
+            insights.counters["rejected"] += 1
+            return _unavailable("Insight queue is full", 429, insights.retry_after())
+        return JSONResponse(job, status_code=202, headers={"Location": f"/jobs/{job['job_id']}"})
+
+    async def get_job(request: Request) -> JSONResponse:
+        job = insights.jobs.get(request.path_params["job_id"])
+        if job is None:
+            return JSONResponse({"error": "Unknown job"}, status_code=404)
+        return StatsResponse(job)
+
+    async def metrics(request: Request) -> JSONResponse:
+        return JSONResponse({
+            **insights.metrics(),
+            "profiling_active": profiling["active"],
+            "profiling_seconds": _percentiles(profiling["seconds"]),
+            "reports_stored": len(reports),
+            "stub_model": agent_engine.STUB_MODEL,
+            "combined_report": agent_engine.COMBINED_REPORT,
+            "rate_limit": agent_engine.rate_limit_stats(),
+            "single_flight": agent_engine.insight_flights.stats(),
+            "stages": telemetry.recorder.stages(),
+        })
+
+    async def prometheus(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(telemetry.recorder.prometheus(), media_type="text/plain; version=0.0.4")
+
+    async def healthz(request: Request) -> JSONResponse:
+        return JSONResponse({"ok": insights.accepting}, status_code=200 if insights.accepting else 503)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await asyncio.to_thread(uploads.remove_stale_spills)
+        insights.start()
+        agent_engine.warm_up()
+        try:
+            yield
+        finally:
+            await insights.stop()
+
+    app = Starlette(
+        routes=[
+            Route("/reports", upload, methods=["POST"]),
+            Route("/reports/{report_id}/insights", request_insights, methods=["POST"]),
+            Route("/jobs/{job_id}", get_job),
+            Route("/metrics", metrics),
+            Route("/metrics/prometheus", prometheus),
+            Route("/healthz", healthz),
+        ],
+        lifespan=lifespan,
+    )
+    app.state.insights = insights
+    return app
+
+
+app = create_app()
@@ -0,0 +1,326 @@
+"""
+Headless batch profiling: summary statistics (and optionally AI insights) for every CSV or
+Excel file in a directory or glob, written as one JSON and one Markdown report per file.
+
+Files are profiled in parallel worker processes. Files whose content (and options) have
+not changed since the last run into the same output directory are skipped.
+
+Usage:
+    python -m src.batch exports/ "archive/*.csv" --out reports [--workers N]
+        [--chunksize N [--incremental]] [--backend pyarrow] [--insights Trends,Anomalies,Actions]
+        [--insight-concurrency N] [--force]
+"""
+import argparse
+import asyncio
+import glob
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.data_processor import STATS_VERSION, content_hash, process_csv, process_excel
+from src.disk_cache import stable_hash
+
+MAX_BATCH_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", str(os.cpu_count() or 1)))
+
+EXTENSIONS = (".csv", ".xlsx")
+MANIFEST_NAME = "manifest.json"
+SUMMARY_NAME = "run_summary.json"
+
+
+def find_files(patterns: list) -> list:
+    """
+    Expands directories (recursively) and glob patterns into a sorted list of data files.
+    """
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        found.update(
+            os.path.abspath(path) for path in matches
+            if os.path.isfile(path) and path.lower().endswith(EXTENSIONS)
+        )
+    return sorted(found)
+
+
+def profile_file(path: str, digest: str, chunksize: int | None = None, backend: str | None = None,
+                 incremental: bool = False) -> dict:
+    """
+    Worker entry point: reads one file and generates its summary statistics.
+    """
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        file_buffer = io.BytesIO(f.read())
+    read = time.perf_counter()
+    if path.lower().endswith(".xlsx"):
+        stats = process_excel(file_buffer, digest=digest)
+    else:
+        stats = process_csv(file_buffer, chunksize=chunksize, backend=backend, incremental=incremental)
+    return {
+        "stats": stats,
+        "bytes": len(file_buffer.getbuffer()),
+        "read_seconds": read - start,
+        "profile_seconds": time.perf_counter() - read,
+    }
+
+
+def report_names(paths: list) -> dict:
+    """
+    Report file name (without extension) per path: the file name, disambiguated by a short
+    path hash when two inputs share it.
+    """
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    return {
+        path: stem if stems.count(stem) == 1 else f"{stem}-{stable_hash(path)[:8]}"
+        for path, stem in zip(paths, stems)
+    }
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f"{value:,.4g}"
+    return str(value)
+
+
+def render_markdown(path: str, stats: dict, insights: dict | None = None) -> str:
+    """
+    Human-readable report: overview, numeric columns table, top categories and insights.
+    """
+    overall = stats.get("overall_summary", {})
+    lines = [
+        f"# {os.path.basename(path)}",
+        "",
+        f"- Rows: {overall.get('row_count', 0):,}",
+        f"- Columns: {overall.get('column_count', 0)}",
+    ]
+    missing = {col: count for col, count in overall.get("missing_values_summary", {}).items() if count}
+    if missing:
+        lines.append("- Missing values: " + ", ".join(f"{col} ({count:,})" for col, count in missing.items()))
+
+    numeric = stats.get("numeric_columns", {})
+    if numeric:
+        lines += [
+            "",
+            "## Numeric columns",
+            "",
+            "| Column | Mean | Median | Std | Min | Max | Z-score outliers |",
+            "|---|---|---|---|---|---|---|",
+        ]
+        for col, col_stats in numeric.items():
+            cells = [col_stats.get(key, "") for key in ("mean", "median", "std_dev", "min", "max")]
+            cells.append(col_stats.get("anomaly_detection_zscore_outliers_count", ""))
+            lines.append(f"| {col} | " + " | ".join(_fmt(cell) for cell in cells) + " |")
+
+    categorical = stats.get("non_numeric_columns", {})
+    if categorical:
+        lines += ["", "## Top categories", ""]
+        for col, counts in categorical.items():
+            top = ", ".join(f"{value} ({count:,})" for value, count in counts.items())
+            lines.append(f"- **{col}**: {top}")
+
+    for insight_type, text in (insights or {}).items():
+        if isinstance(text, Exception):
+            text = f"_Unavailable: {text}_"
+        lines += ["", f"## {insight_type}", "", str(text).strip()]
+    return "\n".join(lines) + "\n"
+
+
+async def _gather_insights(stats_by_path: dict, insight_types: list, concurrency: int) -> dict:
+    from src import agent_engine
+
+    # One limiter for the whole run, however many files there are
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(path):
+        started = time.perf_counter()
+        insights = await agent_engine.get_ai_insights(stats_by_path[path], insight_types, semaphore=semaphore)
+        return path, insights, time.perf_counter() - started
+
+    results = await asyncio.gather(*(one(path) for path in stats_by_path))
+    return {path: (insights, seconds) for path, insights, seconds in results}
+
+
+def _load_manifest(out_dir: str) -> dict:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _json_default(value):
+    # NumPy scalars sneak into pandas-derived dicts
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _write_json(path: str, payload) -> None:
+    # Write-then-rename so an interrupted run never leaves a truncated report
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, default=_json_default)
+    os.replace(tmp, path)
+
+
+def run_batch(patterns: list, out_dir: str, workers: int | None = None, chunksize: int | None = None,
+              backend: str | None = None, insight_types: list | None = None,
+              insight_concurrency: int | None = None, force: bool = False, incremental: bool = False) -> dict:
+    """
+    Profiles every matching file and writes its reports plus a run summary to ``out_dir``.
+
+    Args:
+        patterns: Directories and/or glob patterns.
+        out_dir: Where reports, the manifest and the run summary are written.
+        workers: Worker processes (defaults to BATCH_MAX_WORKERS; 1 profiles in-process).
+        chunksize: Stream CSVs in chunks of this many rows (see process_csv).
+        backend: CSV backend (see process_csv).
+        insight_types: Also request these AI insights per file (e.g. ["Trends"]).
+        insight_concurrency: Cap on agent runs in flight across all files.
+        force: Reprocess files even if they are unchanged.
+        incremental: With chunksize, profile only the rows appended to a file since it was
+            last profiled (see src.incremental).
+
+    Returns:
+        The run summary: counts, failures, throughput and per-stage timings.
+    """
+    started = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    paths = find_files(patterns)
+    names = report_names(paths)
+    manifest = _load_manifest(out_dir)
+    stages = {"hash": 0.0, "read": 0.0, "profile": 0.0, "insights": 0.0, "write": 0.0}
+    options = {"chunksize": chunksize, "stats_version": STATS_VERSION, "insights": insight_types or []}
+    if insight_types:
+        from src.agent_engine import MODEL_ID, PROMPT_VERSION
+        options.update(model=MODEL_ID, prompt_version=PROMPT_VERSION)
+    options_key = stable_hash(options)
+
+    # Unchanged files (same bytes, same options, report still there) are skipped
+    pending, skipped, failed = {}, [], []
+    for path in paths:
+        stage_start = time.perf_counter()
+        with open(path, "rb") as f:
+            digest = content_hash(f)
+        stages["hash"] += time.perf_counter() - stage_start
+        entry = manifest.get(path, {})
+        report_exists = os.path.exists(os.path.join(out_dir, f"{names[path]}.json"))
+        if not force and report_exists and entry.get("digest") == digest and entry.get("options") == options_key:
+            skipped.append(path)
+        else:
+            pending[path] = digest
+
+    # Stage 1: statistics on the process pool
+    profiled = {}
+    workers = max(1, min(workers or MAX_BATCH_WORKERS, len(pending) or 1))
+
+    def collect(path, result):
+        stages["read"] += result["read_seconds"]
+        stages["profile"] += result["profile_seconds"]
+        profiled[path] = result
+
+    if workers == 1:
+        for path, digest in pending.items():
+            try:
+                collect(path, profile_file(path, digest, chunksize, backend, incremental))
+            except Exception as e:
+                failed.append({"path": path, "error": str(e)})
+    else:
+        # spawn, as for Excel sheets: forking a multi-threaded parent is unsafe
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {
+                pool.submit(profile_file, path, digest, chunksize, backend, incremental): path for path, digest in pending.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    collect(futures[future], future.result())
+                except Exception as e:
+                    failed.append({"path": futures[future], "error": str(e)})
+
+    # Stage 2: insights, all files sharing one concurrency limit
+    insights = {}
+    if insight_types and profiled:
+        from src.agent_engine import MAX_CONCURRENT_AGENT_RUNS, describe_error, run_sync
+        insights = run_sync(_gather_insights(
+            {path: result["stats"] for path, result in profiled.items()},
+            insight_types, insight_concurrency or MAX_CONCURRENT_AGENT_RUNS,
+        ))
+        stages["insights"] = sum(seconds for _, seconds in insights.values())
+
+    # Stage 3: reports
+    rows = 0
+    for path in sorted(profiled):
+        stage_start = time.perf_counter()
+        result = profiled[path]
+        file_insights = insights.get(path, (None, 0.0))[0]
+        report = {"source": path, "digest": pending[path], "stats": result["stats"]}
+        if file_insights is not None:
+            report["insights"] = {
+                name: text for name, text in file_insights.items() if not isinstance(text, Exception)
+            }
+            errors = {
+                name: describe_error(error) for name, error in file_insights.items() if isinstance(error, Exception)
+            }
+            if errors:
+                report["insight_errors"] = errors
+        _write_json(os.path.join(out_dir, f"{names[path]}.json"), report)
+        with open(os.path.join(out_dir, f"{names[path]}.md"), "w", encoding="utf-8") as f:
+            f.write(render_markdown(path, result["stats"], file_insights))
+        manifest[path] = {"digest": pending[path], "options": options_key, "report": names[path]}
+        rows += result["stats"].get("overall_summary", {}).get("row_count", 0)
+        stages["write"] += time.perf_counter() - stage_start
+    _write_json(os.path.join(out_dir, MANIFEST_NAME), manifest)
+
+    elapsed = time.perf_counter() - started
+    total_bytes = sum(result["bytes"] for result in profiled.values())
+    summary = {
+        "files_found": len(paths),
+        "files_processed": len(profiled),
+        "files_skipped": len(skipped),
+        "files_failed": len(failed),
+        "failures": failed,
+        "workers": workers,
+        "rows": rows,
+        "bytes": total_bytes,
+        "elapsed_seconds": round(elapsed, 4),
+        "files_per_second": round(len(profiled) / elapsed, 3) if elapsed else None,
+        "rows_per_second": round(rows / elapsed) if elapsed else None,
+        "mb_per_second": round(total_bytes / 1e6 / elapsed, 3) if elapsed else None,
+        # Summed over files (read/profile run in parallel, so they can exceed elapsed)
+        "stage_seconds": {stage: round(seconds, 4) for stage, seconds in stages.items()},
+    }
+    _write_json(os.path.join(out_dir, SUMMARY_NAME), summary)
+    return summary
+
+
+def main(argv: list | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Directories and/or glob patterns of CSV/XLSX files")
+    parser.add_argument("--out", default="reports", help="Output directory (default: reports)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=None, help="Stream CSVs in chunks of N rows")
+    parser.add_argument("--backend", choices=("pandas", "pyarrow", "polars"), default=None, help="CSV parser")
+    parser.add_argument("--insights", default="", help="Comma-separated insight types, e.g. Trends,Actions")
+    parser.add_argument("--insight-concurrency", type=int, default=None, help="Max agent runs in flight")
+    parser.add_argument("--force", action="store_true", help="Reprocess unchanged files")
+    parser.add_argument("--incremental", action="store_true",
+                        help="With --chunksize, profile only rows appended since a file was last profiled")
+    args = parser.parse_args(argv)
+
+    insight_types = [name.strip() for name in args.insights.split(",") if name.strip()]
+    summary = run_batch(
+        args.paths, args.out, workers=args.workers, chunksize=args.chunksize, backend=args.backend,
+        insight_types=insight_types, insight_concurrency=args.insight_concurrency, force=args.force,
+        incremental=args.incremental,
+    )
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["files_failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
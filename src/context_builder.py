@@ -0,0 +1,333 @@
+import copy
+import json
+import math
+
+# Per-agent prompt budgets for the stats block (estimated tokens)
+TOKEN_BUDGETS = {
+    "Trends": 1500,
+    "Anomalies": 2000,
+    "Actions": 2500,
+    # One stats block for all three briefs (agent_engine.get_ai_report)
+    "Report": 3000,
+}
+DEFAULT_TOKEN_BUDGET = 2000
+
+FLOAT_SIGNIFICANT_DIGITS = 4
+
+# Short keys sent to the model; the legend for the ones used is included in the context
+KEY_ALIASES = {
+    "overall_summary": "overall",
+    "row_count": "rows",
+    "column_count": "cols",
+    "missing_values_summary": "missing",
+    "numeric_columns": "num",
+    "non_numeric_columns": "cat",
+    "std_dev": "std",
+    "25_percentile": "p25",
+    "75_percentile": "p75",
+    "trend_indicator_min_max_delta": "range",
+    "trend_indicator_min_max_percentage": "range_pct",
+    "anomaly_detection_zscore_outliers_count": "z_outliers",
+    "anomaly_detection_zscore_outliers_examples": "z_examples",
+    "anomaly_detection_zscore_outliers_rows": "z_rows",
+    "anomaly_detection_mad_outliers_count": "mad_outliers",
+    "anomaly_detection_mad_outliers_examples": "mad_examples",
+    "anomaly_detection_mad_outliers_rows": "mad_rows",
+    "anomaly_detection_iqr_outliers_count": "iqr_outliers",
+    "anomaly_detection_iqr_outliers_examples": "iqr_examples",
+    "anomaly_detection_iqr_outliers_rows": "iqr_rows",
+    "anomaly_detection_mahalanobis": "mahalanobis",
+    "categorical_profile": "cat_profile",
+    "approx_distinct": "distinct",
+    "distinct_is_exact": "distinct_exact",
+    "top_k_error_bound": "top_err",
+    "time_series": "ts",
+    "slope_per_period": "slope",
+    "slope_pct_of_mean": "slope_pct",
+    "r_squared": "r2",
+    "last_period_growth_pct": "last_growth_pct",
+    "first_to_last_growth_pct": "total_growth_pct",
+    "rolling_mean_last": "roll_mean",
+    "rolling_std_last": "roll_std",
+    "rolling_mean_change_pct": "roll_change_pct",
+    "segments": "seg",
+}
+
+# Segment breakdowns only cover this many of the most relevant packed numeric columns
+SEGMENT_MEASURES = 5
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English/JSON).
+    """
+    return math.ceil(len(text) / 4)
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), default=_json_default)
+
+
+def _json_default(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+# --- STRATEGIES ---
+# Each strategy takes the (already copied) stats dict and returns the transformed dict.
+
+def prune_metadata(stats: dict, insight_type: str) -> dict:
+    """
+    The original diet: drop dtype metadata, and outlier examples for the Trend Analyst.
+    """
+    if "overall_summary" in stats:
+        # Remove verbose metadata that the AI doesn't strictly need
+        stats["overall_summary"].pop("data_types_distribution", None)
+
+    # For 'Trends', we don't need the detailed outlier examples (save tokens)
+    if insight_type == "Trends":
+        stats.pop("anomaly_detection_mahalanobis", None)
+        for col_stats in stats.get("numeric_columns", {}).values():
+            for key in [key for key in col_stats if key.endswith(("_outliers_examples", "_outliers_rows"))]:
+                col_stats.pop(key)
+    return stats
+
+
+def compact_missing(stats: dict, insight_type: str) -> dict:
+    """
+    Only list columns that actually have missing values.
+    """
+    overall = stats.get("overall_summary", {})
+    if "missing_values_summary" in overall:
+        overall["missing_values_summary"] = {
+            col: count for col, count in overall["missing_values_summary"].items() if count
+        }
+    return stats
+
+
+def prune_time_series(stats: dict, insight_type: str) -> dict:
+    """
+    The Forensic Auditor works from the outlier fields; trends over time are for the others.
+    """
+    if insight_type == "Anomalies":
+        stats.pop("time_series", None)
+    return stats
+
+
+def prune_segments(stats: dict, insight_type: str) -> dict:
+    """
+    Segment breakdowns answer the Strategist's "which Branch/Product" questions.
+    """
+    if insight_type not in ("Actions", "Report"):
+        stats.pop("segments", None)
+    return stats
+
+
+def round_floats(stats, digits: int = FLOAT_SIGNIFICANT_DIGITS):
+    """
+    Rounds every float to a few significant digits (NaN becomes null).
+    """
+    if isinstance(stats, dict):
+        return {key: round_floats(value, digits) for key, value in stats.items()}
+    if isinstance(stats, list):
+        return [round_floats(value, digits) for value in stats]
+    if isinstance(stats, float) and math.isfinite(stats) and stats != 0:
+        return float(f"{stats:.{digits}g}")
+    if isinstance(stats, float) and math.isnan(stats):
+        return None
+    return stats
+
+
+def shorten_keys(mapping: dict, used: set) -> dict:
+    """
+    Replaces known long keys of one dict level with KEY_ALIASES and records which were used.
+    """
+    shortened = {}
+    for key, value in mapping.items():
+        alias = KEY_ALIASES.get(key, key)
+        if alias != key:
+            used.add(key)
+        shortened[alias] = value
+    return shortened
+
+
+def _abs(value) -> float:
+    return abs(value) if isinstance(value, (int, float)) and math.isfinite(value) else 0.0
+
+
+def column_relevance(col_stats: dict, insight_type: str, trend: dict | None = None) -> float:
+    """
+    How much a numeric column matters to a given agent (higher is more relevant).
+    ``trend`` is the column's ``time_series`` entry, when there is one.
+    """
+    spread = _abs(col_stats.get("std_dev")) / (_abs(col_stats.get("mean")) or 1.0)
+    # Outliers every applicable detector agrees on (IQR alone flags ~1% of a normal column)
+    outliers = min((
+        _abs(value) for key, value in col_stats.items()
+        if key.startswith("anomaly_detection_") and key.endswith("_outliers_count")
+    ), default=0.0)
+    if insight_type == "Anomalies":
+        return outliers * 1_000 + spread
+    if insight_type == "Trends":
+        if trend:
+            # Steady moves over time first (slope weighted by how well the line fits)
+            return _abs(trend.get("slope_pct_of_mean")) * (1 + _abs(trend.get("r_squared"))) * 1_000 + spread
+        return _abs(col_stats.get("trend_indicator_min_max_percentage")) + spread
+    # Actions (and the combined report): volatile and risky measures first
+    return spread + outliers
+
+
+STRATEGIES = [prune_metadata, compact_missing, prune_time_series, prune_segments]
+
+
+def build_context(stats: dict, insight_type: str, token_budget: int | None = None) -> tuple[str, dict]:
+    """
+    Builds the stats block for one agent within a token budget.
+
+    Applies the pruning strategies, rounds floats, shortens keys, then packs numeric columns
+    in order of relevance to the agent (ties broken by name) followed by categorical
+    columns (each with its cardinality profile), stopping deterministically once the budget
+    is reached. A numeric column's time-series trend and missing-values count are packed
+    together with it (the counts of omitted columns are summed up), and segment
+    breakdowns (restricted to the top packed measures) go between the numeric and
+    categorical columns. Every section counts against the budget: other top-level sections
+    (e.g. Mahalanobis outliers) are kept ahead of the columns only while they fit.
+
+    Args:
+        stats: Summary statistics produced by the data processor (not modified).
+        insight_type: "Trends", "Anomalies" or "Actions".
+        token_budget: Overrides TOKEN_BUDGETS for this call.
+
+    Returns:
+        The compact JSON context and a report with estimated tokens before/after and the
+        columns, segment breakdowns and sections kept and dropped.
+    """
+    budget = token_budget or TOKEN_BUDGETS.get(insight_type, DEFAULT_TOKEN_BUDGET)
+    tokens_before = estimate_tokens(json.dumps(stats, indent=2, default=_json_default))
+
+    pruned = copy.deepcopy(stats)
+    for strategy in STRATEGIES:
+        pruned = strategy(pruned, insight_type)
+
+    numeric = pruned.pop("numeric_columns", {})
+    categorical = pruned.pop("non_numeric_columns", {})
+    profiles = pruned.pop("categorical_profile", {})
+    time_series = pruned.pop("time_series", None)
+    segments = pruned.pop("segments", {})
+    trends = time_series["columns"] if time_series else {}
+    ranked_numeric = sorted(
+        numeric, key=lambda col: (-column_relevance(numeric[col], insight_type, trends.get(col)), str(col))
+    )
+
+    used_keys = set()
+    context = {}
+    missing, packed_missing = {}, None
+    overall = pruned.pop("overall_summary", None)
+    if overall is not None:
+        used_keys.add("overall_summary")
+        context["overall"] = shorten_keys(round_floats(overall), used_keys)
+        if "missing" in context["overall"]:
+            # One entry per column with nulls: filled in as their columns are packed
+            missing = context["overall"]["missing"]
+            context["overall"]["missing"] = packed_missing = {}
+    # Reserve room for the section keys, the legend and the omitted-columns and
+    # omitted-missing notes
+    used_tokens = estimate_tokens(_dumps(context)) + estimate_tokens(_dumps(KEY_ALIASES)) + 32
+    sections_dropped = []
+
+    def fits(section: str, value) -> bool:
+        nonlocal used_tokens
+        cost = estimate_tokens(_dumps({section: value}))
+        if used_tokens + cost > budget:
+            return False
+        used_tokens += cost
+        return True
+
+    # Any other sections pass through verbatim (rounded), while they fit the budget
+    for key, value in pruned.items():
+        alias, value = KEY_ALIASES.get(key, key), round_floats(value)
+        if not fits(alias, value):
+            sections_dropped.append(key)
+            continue
+        if alias != key:
+            used_keys.add(key)
+        context[alias] = value
+    packed_trends = None
+    if time_series is not None:
+        header = {key: value for key, value in time_series.items() if key != "columns"}
+        if fits("ts", {**header, "columns": {}}):
+            used_keys.add("time_series")
+            context["ts"] = header
+            context["ts"]["columns"] = packed_trends = {}
+        else:
+            sections_dropped.append("time_series")
+    packed_numeric, packed_categorical, packed_profiles, packed_segments = {}, {}, {}, {}
+    dropped, segments_dropped = [], []
+    candidates = [("num", col, numeric[col]) for col in ranked_numeric]
+    candidates += [("seg", col, breakdown) for col, breakdown in segments.items()]
+    candidates += [("cat", col, counts) for col, counts in categorical.items()]
+    for section, col, col_stats in candidates:
+        if section == "seg":
+            measures = [measure for measure in packed_numeric if measure in col_stats["measures"]][:SEGMENT_MEASURES]
+            col_stats = {**col_stats, "measures": {measure: col_stats["measures"][measure] for measure in measures}}
+        compact = round_floats(col_stats)
+        extra = None
+        if section == "num":
+            compact = shorten_keys(compact, used_keys)
+            if col in trends and packed_trends is not None:
+                extra = shorten_keys(round_floats(trends[col]), used_keys)
+        elif col in profiles:
+            extra = shorten_keys(profiles[col], used_keys)
+        cost = estimate_tokens(_dumps({col: compact})) + (estimate_tokens(_dumps({col: extra})) if extra else 0)
+        # A packed column brings its missing-values count along
+        if section != "seg" and col in missing:
+            cost += estimate_tokens(_dumps({col: missing[col]}))
+        if dropped or segments_dropped or used_tokens + cost > budget:
+            (segments_dropped if section == "seg" else dropped).append(col)
+            continue
+        used_tokens += cost
+        if section == "seg":
+            packed_segments[col] = compact
+            continue
+        (packed_numeric if section == "num" else packed_categorical)[col] = compact
+        if extra:
+            (packed_trends if section == "num" else packed_profiles)[col] = extra
+        if col in missing:
+            packed_missing[col] = missing[col]
+
+    if numeric:
+        used_keys.add("numeric_columns")
+        context["num"] = packed_numeric
+    if categorical:
+        used_keys.add("non_numeric_columns")
+        context["cat"] = packed_categorical
+    if segments:
+        used_keys.add("segments")
+        context["seg"] = packed_segments
+    if profiles:
+        used_keys.add("categorical_profile")
+        context["cat_profile"] = packed_profiles
+    if dropped:
+        context["omitted_columns"] = len(dropped)
+    # Columns with nulls that were not packed (or are in no section) only count as a total
+    missing_omitted = [count for col, count in missing.items() if col not in packed_missing]
+    if missing_omitted:
+        context["overall"]["missing_omitted_columns"] = {
+            "columns": len(missing_omitted), "values": int(sum(missing_omitted)),
+        }
+    context["legend"] = {KEY_ALIASES[key]: key for key in KEY_ALIASES if key in used_keys}
+
+    text = _dumps(context)
+    report = {
+        "insight_type": insight_type,
+        "token_budget": budget,
+        "tokens_before": tokens_before,
+        "tokens_after": estimate_tokens(text),
+        "columns_kept": len(packed_numeric) + len(packed_categorical),
+        "segments_kept": len(packed_segments),
+        "segments_dropped": segments_dropped,
+        "columns_dropped": dropped,
+        "sections_dropped": sections_dropped,
+    }
+    return text, report
@@ -1,72 +1,318 @@
 import pandas as pd
 import io
+import os
+import hashlib
+import mmap
 import numpy as np
-from scipy.stats import zscore
+
+from src import telemetry
+from src.anomalies import (
+    FIRST_EXAMPLES, MAX_MAHALANOBIS_COLUMNS, detector_params, mahalanobis_outliers, outlier_masks, pick_examples,
+)
+from src.disk_cache import CACHE_DIR, DiskCache, stable_hash
+from src.excel_reader import read_workbook
+from src.frame_cache import load_frame, store_frame
+from src.incremental import summarize_csv_incremental
+from src.ingest import read_csv_frame
+from src.sampling import SAMPLE_ROWS, annotate_estimates, sample_csv
+from src.sketches import HyperLogLog, SpaceSaving
+from src.segments import MAX_DIMENSIONS, SegmentTotals, is_dimension
+from src.streaming import TOP_K_CAPACITY, summarize_csv_stream
+from src.time_series import TimeBuckets, find_time_column
+
+# Bump whenever the summary_stats schema or its numbers change so memoized stats are recomputed
+STATS_VERSION = "5"
+
+_HASH_BLOCK_BYTES = 1024 * 1024
+
+# Persistent memo of process_csv results, keyed by upload content hash
+stats_cache = DiskCache(
+    os.getenv("STATS_CACHE_DIR", CACHE_DIR),
+    "stats",
+    max_entries=int(os.getenv("STATS_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=float(os.getenv("STATS_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+)
+
+_QUARTILES = np.array([0.25, 0.5, 0.75])
+_TOP_VALUES = 5
+
+# Non-numeric columns up to this many rows (or with at most EXACT_COUNTS_MAX_DISTINCT values,
+# as estimated by HyperLogLog) get exact value counts; larger ones keep the sketch results
+EXACT_COUNTS_MAX_ROWS = int(os.getenv("EXACT_COUNTS_MAX_ROWS", "100000"))
+EXACT_COUNTS_MAX_DISTINCT = 10_000
+_SKETCH_BATCH_ROWS = 100_000
+
+
+def _sorted_median(ordered: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """
+    Median of each column of a column-sorted block (NaNs last), as numpy.median computes
+    it: the mean of the middle pair for even counts.
+    """
+    n_rows, n_cols = ordered.shape
+    median = np.full(n_cols, np.nan)
+    valid = count > 0
+    if n_rows and valid.any():
+        cols = np.arange(n_cols)
+        last = np.maximum(count - 1, 0)
+        half = count // 2
+        mid_hi = ordered[np.minimum(half, last), cols]
+        mid_lo = ordered[np.maximum(half - 1, 0), cols]
+        even = (count % 2 == 0)
+        median[valid] = np.where(even, (mid_lo + mid_hi) / 2, mid_hi)[valid]
+    return median
+
+
+def _numeric_block_stats(block: np.ndarray) -> dict:
+    """
+    Fused statistics kernel: computes count/mean/std/min/max/quartiles/median/MAD and the
+    outliers of every detector in src.anomalies for every column of a 2-D float64 block
+    in one vectorized pass.
+
+    Mirrors pandas' nanops arithmetic (NaN-filled pairwise sums, two-pass variance,
+    linear-interpolated percentiles) so the results are bit-identical to
+    ``Series.describe()`` / ``Series.median()``.
+
+    Args:
+        block: Fortran-ordered float64 array of shape (rows, columns), left in row order.
+
+    Returns:
+        A dictionary of per-column NumPy arrays plus, per detector, outlier counts and the
+        row positions of a few example outliers for each column.
+    """
+    n_rows, n_cols = block.shape
+    nan_mask = np.isnan(block)
+    count = n_rows - nan_mask.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Mean and two-pass variance (same summation order as pandas.nanops)
+        filled = np.where(nan_mask, 0.0, block)
+        mean = filled.sum(axis=0) / count
+        np.subtract(mean, filled, out=filled)
+        np.square(filled, out=filled)
+        filled[nan_mask] = 0.0
+        ddof_count = np.where(count > 1, count - 1, np.nan)
+        std = np.sqrt(filled.sum(axis=0) / ddof_count)
+        del filled, nan_mask
+
+    # Order statistics from one sorted copy (NaNs sort to the end of each column)
+    ordered = np.sort(block, axis=0)
+    cols = np.arange(n_cols)
+    last = np.maximum(count - 1, 0)
+    minimum = np.full(n_cols, np.nan)
+    maximum = np.full(n_cols, np.nan)
+    quartiles = np.full((len(_QUARTILES), n_cols), np.nan)
+    valid = count > 0
+    if n_rows and valid.any():
+        minimum[valid] = ordered[0, valid]
+        maximum[valid] = ordered[last, cols][valid]
+
+        # Linear interpolation, identical to numpy.percentile(method="linear")
+        virtual = np.multiply.outer(_QUARTILES, (count - 1).astype(np.float64))
+        previous = np.floor(virtual)
+        above = virtual >= (count - 1)
+        gamma = virtual - previous
+        prev_idx = np.where(above, last, previous).astype(np.intp)
+        next_idx = np.where(above, last, previous + 1).astype(np.intp)
+        prev_idx = np.clip(prev_idx, 0, None)
+        next_idx = np.clip(next_idx, 0, None)
+        lower = ordered[prev_idx, cols]
+        upper = ordered[next_idx, cols]
+        diff = upper - lower
+        lerp = np.where(gamma >= 0.5, upper - diff * (1 - gamma), lower + diff * gamma)
+        quartiles[:, valid] = lerp[:, valid]
+    median = _sorted_median(ordered, count)
+
+    # MAD: median absolute deviation from the median, reusing the sorted buffer
+    np.subtract(block, median, out=ordered)
+    np.abs(ordered, out=ordered)
+    ordered.sort(axis=0)
+    mad = _sorted_median(ordered, count)
+
+    stats = {
+        "count": count,
+        "mean": mean,
+        "std": std,
+        "min": minimum,
+        "max": maximum,
+        "25%": quartiles[0],
+        "50%": quartiles[1],
+        "75%": quartiles[2],
+        "median": median,
+        "mad": mad,
+    }
+
+    # Every detector over every column at once (the buffer is reused as scratch space)
+    params = detector_params(stats)
+    masks = outlier_masks(block, params, scratch=ordered)
+    del ordered
+    stats["detectors"] = {}
+    for name, mask in masks.items():
+        outlier_count = mask.sum(axis=0)
+        outlier_rows = {
+            col_idx: pick_examples(np.flatnonzero(mask[:, col_idx]), first=name in FIRST_EXAMPLES)
+            for col_idx in np.flatnonzero(outlier_count)
+        }
+        stats["detectors"][name] = {"applicable": params[name][3], "count": outlier_count, "rows": outlier_rows}
+    return stats
 
 def generate_summary_statistics(df: pd.DataFrame) -> dict:
     """
     Generates a lightweight dictionary of summary statistics from a Pandas DataFrame.
+
+    Frames compacted at ingest (see src.ingest.compact_dtypes) are reported with the dtypes
+    and date text the default CSV parser would have produced, so the output is unchanged.
+    When a datetime column is present, a ``time_series`` section reports per-column trends
+    over time buckets (see src.time_series), and low-cardinality text columns get a
+    ``segments`` breakdown of the numeric measures (see src.segments).
     """
+    # Compacted frames remember their pre-compaction dtype names and date formats
+    source_dtypes = df.attrs.get("source_dtypes", {})
+    date_formats = df.attrs.get("date_formats", {})
+    dtype_names = pd.Series([source_dtypes.get(col, str(dtype)) for col, dtype in df.dtypes.items()], dtype=object)
+
     summary_stats = {
         "overall_summary": {
             "row_count": len(df),
             "column_count": len(df.columns),
             "missing_values_summary": df.isnull().sum().to_dict(),
-            "data_types_distribution": df.dtypes.astype(str).value_counts().to_dict(),
+            "data_types_distribution": dtype_names.value_counts().to_dict(),
         },
         "numeric_columns": {}
     }
 
-    for col in df.select_dtypes(include=np.number).columns:
-        description = df[col].describe().to_dict()
-        col_stats = {
-            "mean": description.get("mean"),
-            "median": df[col].median(),
-            "std_dev": description.get("std"),
-            "min": description.get("min"),
-            "max": description.get("max"),
-            "25_percentile": description.get("25%"),
-            "75_percentile": description.get("75%"),
-        }
-        
-        # Simple trend indicator: change from min to max
-        if not pd.isna(col_stats["min"]) and not pd.isna(col_stats["max"]):
-            col_stats["trend_indicator_min_max_delta"] = col_stats["max"] - col_stats["min"]
-            if col_stats["min"] != 0:
-                col_stats["trend_indicator_min_max_percentage"] = (col_stats["max"] - col_stats["min"]) / col_stats["min"] * 100
-
-        # --- FIX STARTS HERE ---
-        # Anomaly detection: Manual Z-score calculation to handle NaNs safely
-        std_dev = df[col].std()
-        mean_val = df[col].mean()
-        
-        if std_dev > 0: # Avoid division by zero
-            # Calculate Z-score using Pandas (preserves index alignment)
-            # (Value - Mean) / StdDev
-            z_scores = (df[col] - mean_val) / std_dev
-            
-            # Filter for outliers (|Z| > 3)
-            outliers = df[col][z_scores.abs() > 3].dropna().tolist()
-            
-            col_stats["anomaly_detection_zscore_outliers_count"] = len(outliers)
-            col_stats["anomaly_detection_zscore_outliers_examples"] = outliers[:5] 
-        # --- FIX ENDS HERE ---
-
-        summary_stats["numeric_columns"][col] = col_stats
+    numeric_cols = df.select_dtypes(include=np.number).columns
+    if len(numeric_cols):
+        block = np.asfortranarray(df[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan, copy=True))
+        fused = _numeric_block_stats(block)
+        # Row-level outliers across the columns that vary
+        spread_idx = np.flatnonzero(fused["std"] > 0)[:MAX_MAHALANOBIS_COLUMNS]
+        multivariate = mahalanobis_outliers(block[:, spread_idx], [numeric_cols[i] for i in spread_idx])
+        del block
+
+        for idx, col in enumerate(numeric_cols):
+            col_stats = {
+                "mean": float(fused["mean"][idx]),
+                "median": float(fused["median"][idx]),
+                "std_dev": float(fused["std"][idx]),
+                "min": float(fused["min"][idx]),
+                "max": float(fused["max"][idx]),
+                "25_percentile": float(fused["25%"][idx]),
+                "75_percentile": float(fused["75%"][idx]),
+            }
+
+            # Simple trend indicator: change from min to max
+            if not pd.isna(col_stats["min"]) and not pd.isna(col_stats["max"]):
+                col_stats["trend_indicator_min_max_delta"] = col_stats["max"] - col_stats["min"]
+                if col_stats["min"] != 0:
+                    col_stats["trend_indicator_min_max_percentage"] = (col_stats["max"] - col_stats["min"]) / col_stats["min"] * 100
+
+            # Anomaly detection per detector (z-score |Z| > 3, robust MAD, IQR fences), NaN-safe
+            for name, detected in fused["detectors"].items():
+                if not detected["applicable"][idx]:
+                    continue
+                rows = detected["rows"].get(idx, [])
+                prefix = f"anomaly_detection_{name}_outliers"
+                col_stats[f"{prefix}_count"] = int(detected["count"][idx])
+                col_stats[f"{prefix}_examples"] = df[col].iloc[rows].tolist()
+                col_stats[f"{prefix}_rows"] = df.index[rows].tolist()
+
+            summary_stats["numeric_columns"][col] = col_stats
+
+        if multivariate:
+            labels = df.index[[example["row"] for example in multivariate["examples"]]].tolist()
+            for example, label in zip(multivariate["examples"], labels):
+                example["row"] = label
+            summary_stats["anomaly_detection_mahalanobis"] = multivariate
     
-    # Add non-numeric column value counts for context
+    # Add non-numeric column value counts (and cardinality) for context
     summary_stats["non_numeric_columns"] = {}
+    summary_stats["categorical_profile"] = {}
     for col in df.select_dtypes(exclude=np.number).columns:
-        summary_stats["non_numeric_columns"][col] = df[col].value_counts().head(5).to_dict()
+        top_values, profile = _categorical_column_stats(df[col])
+        if col in date_formats:
+            top_values.index = pd.DatetimeIndex(top_values.index).strftime(date_formats[col])
+        elif pd.api.types.is_datetime64_any_dtype(df[col].dtype):
+            # Dates read as datetimes (e.g. Excel date cells) have no source text; key them by ISO string
+            top_values.index = pd.DatetimeIndex(top_values.index).map(pd.Timestamp.isoformat)
+        summary_stats["non_numeric_columns"][col] = top_values.to_dict()
+        summary_stats["categorical_profile"][col] = profile
+
+    # Trends along the first datetime column, if there is one
+    time_column = find_time_column(df) if len(numeric_cols) else None
+    if time_column:
+        buckets = TimeBuckets(*time_column)
+        buckets.update(df)
+        time_series = buckets.summary(numeric_cols)
+        if time_series:
+            summary_stats["time_series"] = time_series
+
+    # Segment breakdowns for low-cardinality dimensions (one groupby per dimension)
+    dimensions = [
+        col for col, profile in summary_stats["categorical_profile"].items()
+        if (not time_column or col != time_column[0])
+        and not pd.api.types.is_datetime64_any_dtype(df[col].dtype)
+        and is_dimension(profile["approx_distinct"], len(df))
+    ][:MAX_DIMENSIONS] if len(numeric_cols) else []
+    segments = {}
+    for col in dimensions:
+        totals = SegmentTotals(col)
+        totals.update(df)
+        breakdown = totals.summary(numeric_cols)
+        if breakdown:
+            segments[col] = breakdown
+    if segments:
+        summary_stats["segments"] = segments
 
     return summary_stats
 
-def process_csv(file_buffer: io.BytesIO) -> dict:
+def _categorical_column_stats(series: pd.Series) -> tuple[pd.Series, dict]:
+    """
+    Top values and cardinality of one non-numeric column.
+
+    Small columns and categoricals get exact counts. Larger columns never build a full hash
+    table: each batch's value counts feed a Space-Saving heavy-hitters summary and a
+    HyperLogLog distinct counter. Columns that turn out to have few distinct values are
+    then recounted exactly; ID-like columns keep the sketch results and their error bounds.
+
+    Returns:
+        The top values with their counts, and the column's ``categorical_profile`` entry.
+    """
+    if len(series) > EXACT_COUNTS_MAX_ROWS and not isinstance(series.dtype, pd.CategoricalDtype):
+        summary, distinct = SpaceSaving(capacity=TOP_K_CAPACITY), HyperLogLog()
+        for start in range(0, len(series), _SKETCH_BATCH_ROWS):
+            counts = series.iloc[start:start + _SKETCH_BATCH_ROWS].value_counts(sort=False)
+            summary.update_counts(counts)
+            distinct.update(counts.index)
+        estimate = distinct.estimate()
+        if not summary.is_exact and estimate > EXACT_COUNTS_MAX_DISTINCT:
+            return pd.Series(summary.top(_TOP_VALUES), dtype=np.int64), {
+                "approx_distinct": round(estimate),
+                "distinct_is_exact": False,
+                "top_k_error_bound": summary.top_error_bound(_TOP_VALUES),
+            }
+
+    counts = series.value_counts()
+    return counts.head(_TOP_VALUES), {
+        "approx_distinct": int(np.count_nonzero(counts.to_numpy())),
+        "distinct_is_exact": True,
+        "top_k_error_bound": 0,
+    }
+
+def process_csv(file_buffer: io.BytesIO, chunksize: int | None = None, backend: str | None = None,
+                incremental: bool = False) -> dict:
     """
     Ingests CSV data from a file-like object, processes it, and generates summary statistics.
 
     Args:
         file_buffer: A file-like object containing the CSV data.
+        chunksize: If set, stream the file in chunks of this many rows through mergeable
+            accumulators so peak memory stays bounded regardless of file size.
+        backend: Parse with "pandas", "pyarrow" (multithreaded) or "polars" and compact
+            dtypes at ingest (categoricals, downcast numbers, parsed dates). None keeps the
+            plain pandas.read_csv path. The summary is identical either way.
+        incremental: With chunksize, resume from the stored state of a previously profiled
+            file that this one extends with appended rows, and store this file's state
+            (see src.incremental).
 
     Returns:
         A dictionary containing summary statistics suitable for LLM context.
@@ -80,10 +326,202 @@ def process_csv(file_buffer: io.BytesIO) -> dict:
         raise ValueError("File buffer is empty.")
 
     try:
-        file_buffer.seek(0)
-        df = pd.read_csv(file_buffer)
-        return generate_summary_statistics(df)
+        if chunksize:
+            with telemetry.span("stream_csv", bytes=_buffer_size(file_buffer)) as stage:
+                summarize = summarize_csv_incremental if incremental else summarize_csv_stream
+                stats = summarize(file_buffer, chunksize=chunksize)
+                stage.set(rows=stats["overall_summary"]["row_count"])
+                return stats
+        with telemetry.span("parse_csv", bytes=_buffer_size(file_buffer), backend=backend or "pandas") as stage:
+            if backend:
+                df = read_csv_frame(file_buffer, backend=backend)
+            else:
+                file_buffer.seek(0)
+                df = pd.read_csv(file_buffer)
+            stage.set(rows=len(df), columns=df.shape[1])
+        return _timed_summary(df)
     except pd.errors.EmptyDataError:
         raise pd.errors.EmptyDataError("The provided CSV file is empty or unparseable.")
     except Exception as e:
-        raise Exception(f"Error processing CSV file: {e}")
\ No newline at end of file
+        raise Exception(f"Error processing CSV file: {e}")
+
+def process_csv_sample(file_buffer: io.BytesIO, rows: int = SAMPLE_ROWS) -> dict | None:
+    """
+    Estimated summary statistics from a position-stratified sample of the CSV (see
+    src.sampling): a fraction of process_csv's time on large files. Counts are scaled to
+    the estimated row count, means carry 95% confidence intervals, and
+    ``overall_summary["estimated"]`` is True.
+
+    Args:
+        file_buffer: A seekable file-like object containing the CSV data.
+        rows: Target sample size.
+
+    Returns:
+        The estimated statistics, or None if the file is too small for sampling to pay off.
+    """
+    if not file_buffer:
+        raise ValueError("File buffer is empty.")
+
+    try:
+        with telemetry.span("sample_csv", bytes=_buffer_size(file_buffer)) as stage:
+            sampled = sample_csv(file_buffer, rows=rows)
+            if sampled is None:
+                return None
+            df, report = sampled
+            stage.set(rows=len(df), columns=df.shape[1])
+        return annotate_estimates(_timed_summary(df), report)
+    except pd.errors.EmptyDataError:
+        raise pd.errors.EmptyDataError("The provided CSV file is empty or unparseable.")
+    except Exception as e:
+        raise Exception(f"Error processing CSV file: {e}")
+
+def _timed_summary(df: pd.DataFrame) -> dict:
+    with telemetry.span("stats", rows=len(df), columns=df.shape[1]):
+        return generate_summary_statistics(df)
+
+def _memory_view(file_buffer) -> memoryview | None:
+    """Zero-copy view of an in-memory (BytesIO) or memory-mapped buffer; None for other streams."""
+    if isinstance(file_buffer, io.BytesIO):
+        return file_buffer.getbuffer()
+    if isinstance(file_buffer, mmap.mmap):
+        return memoryview(file_buffer)
+    return None
+
+def _buffer_size(file_buffer) -> int | None:
+    view = _memory_view(file_buffer)
+    if view is None:
+        return None
+    with view:
+        return view.nbytes
+
+def hash_blocks(blocks) -> str:
+    """
+    Incrementally hashes an iterable of byte blocks (e.g. as an upload streams in).
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for block in blocks:
+        digest.update(block)
+    return digest.hexdigest()
+
+def content_hash(file_buffer: io.BytesIO) -> str:
+    """
+    Fast content hash of a file-like object. In-memory and memory-mapped buffers are hashed
+    in place through a memoryview; other streams are read in fixed-size blocks.
+    """
+    view = _memory_view(file_buffer)
+    file_buffer.seek(0)
+    try:
+        if view is None:
+            with telemetry.span("hash"):
+                return hash_blocks(iter(lambda: file_buffer.read(_HASH_BLOCK_BYTES), b""))
+        # The view must be released before the buffer can be resized or closed
+        with view, telemetry.span("hash", bytes=view.nbytes):
+            return hash_blocks(view[start:start + _HASH_BLOCK_BYTES] for start in range(0, view.nbytes, _HASH_BLOCK_BYTES))
+    finally:
+        file_buffer.seek(0)
+
+def process_excel(file_buffer: io.BytesIO, sheet_name: str | None = None, digest: str | None = None) -> dict:
+    """
+    Ingests an .xlsx workbook and generates summary statistics with the same engine as CSVs.
+
+    Sheets are streamed with openpyxl's read-only mode and parsed in parallel; with no
+    ``sheet_name`` every sheet sharing the first sheet's header is stacked. The parsed frame
+    is cached as Parquet keyed by content hash, so re-analysing a workbook skips the XML parse.
+
+    Args:
+        file_buffer: A file-like object containing the workbook.
+        sheet_name: Only analyse this sheet.
+        digest: Precomputed content_hash of the buffer, if the caller already has it.
+
+    Returns:
+        A dictionary containing summary statistics suitable for LLM context.
+
+    Raises:
+        ValueError: If the file buffer is empty.
+        Exception: For workbook parsing errors.
+    """
+    if not file_buffer:
+        raise ValueError("File buffer is empty.")
+
+    try:
+        frame_key = stable_hash(digest or content_hash(file_buffer), "xlsx", sheet_name)
+        cached = load_frame(frame_key)
+        if cached is not None:
+            df, included, skipped = cached, cached.attrs.get("sheets", []), cached.attrs.get("skipped_sheets", [])
+        else:
+            with telemetry.span("parse_xlsx", bytes=_buffer_size(file_buffer)) as stage:
+                file_buffer.seek(0)
+                df, included, skipped = read_workbook(file_buffer.read(), sheet_name=sheet_name)
+                stage.set(rows=len(df), columns=df.shape[1])
+            df.attrs["sheets"], df.attrs["skipped_sheets"] = included, skipped
+            store_frame(frame_key, df)
+
+        summary_stats = _timed_summary(df)
+        if len(included) + len(skipped) > 1:
+            summary_stats["overall_summary"]["sheets"] = included
+            if skipped:
+                summary_stats["overall_summary"]["skipped_sheets"] = skipped
+        return summary_stats
+    except Exception as e:
+        raise Exception(f"Error processing Excel file: {e}")
+
+def _cached(kind: str, digest: str, options: dict) -> tuple[str, dict | None]:
+    key = stable_hash(digest, kind, options, STATS_VERSION)
+    with telemetry.span("stats_cache_lookup", kind=kind) as stage:
+        cached = stats_cache.get(key)
+        stage.set(hit=cached is not None)
+    return key, cached
+
+def _memoized(kind: str, file_buffer: io.BytesIO, digest: str | None, options: dict, compute) -> dict:
+    key, cached = _cached(kind, digest or content_hash(file_buffer), options)
+    if cached is not None:
+        return cached
+    stats = compute()
+    stats_cache.set(key, stats)
+    return stats
+
+def cached_csv_stats(digest: str, chunksize: int | None = None) -> dict | None:
+    """
+    The stats process_csv_cached has stored for this content hash and chunksize, if any.
+    """
+    return _cached("csv", digest, {"chunksize": chunksize})[1]
+
+def process_csv_cached(file_buffer: io.BytesIO, chunksize: int | None = None, digest: str | None = None,
+                       backend: str | None = None, incremental: bool = False) -> dict:
+    """
+    Memoized process_csv: identical bytes (under any file name) skip parsing and stats
+    entirely, across sessions and restarts.
+
+    Args:
+        file_buffer: A file-like object containing the CSV data.
+        chunksize: Passed through to process_csv (part of the cache key).
+        backend: Passed through to process_csv.
+        incremental: Passed through to process_csv.
+        digest: Precomputed content_hash of the buffer, if the caller already has it.
+
+    Returns:
+        A dictionary containing summary statistics suitable for LLM context. Results served
+        from the store have been through a JSON round trip (non-string keys become strings).
+    """
+    if not file_buffer:
+        raise ValueError("File buffer is empty.")
+
+    # The backend does not change the summary (nor, beyond sketch error, does resuming), so
+    # neither is part of the key
+    return _memoized(
+        "csv", file_buffer, digest, {"chunksize": chunksize},
+        lambda: process_csv(file_buffer, chunksize=chunksize, backend=backend, incremental=incremental),
+    )
+
+def process_excel_cached(file_buffer: io.BytesIO, sheet_name: str | None = None, digest: str | None = None) -> dict:
+    """
+    Memoized process_excel (see process_csv_cached).
+    """
+    if not file_buffer:
+        raise ValueError("File buffer is empty.")
+
+    digest = digest or content_hash(file_buffer)
+    return _memoized(
+        "xlsx", file_buffer, digest, {"sheet_name": sheet_name},
+        lambda: process_excel(file_buffer, sheet_name=sheet_name, digest=digest),
+    )
@@ -0,0 +1,125 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+
+
+def stable_hash(*parts) -> str:
+    """
+    Content address for cache keys: SHA-256 over the canonical JSON of ``parts``.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _json_default(value):
+    # NumPy scalars (np.float64, np.int64, np.bool_) sneak into pandas-derived dicts
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class DiskCache:
+    """
+    Small SQLite-backed key/value store shared by every process pointing at the same directory.
+
+    Entries expire after ``ttl_seconds`` and the least recently used ones are evicted once the
+    store grows past ``max_entries`` or ``max_bytes``. Hit/miss counters live in the database
+    too, so they aggregate across processes and replicas.
+    """
+
+    def __init__(self, directory: str, name: str, max_entries: int = 5000,
+                 max_bytes: int = 256 * 1024 * 1024, ttl_seconds: float | None = 7 * 24 * 3600):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}.sqlite3")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation keeps this safe across threads and processes
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _bump(self, conn: sqlite3.Connection, counter: str) -> None:
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (counter,),
+        )
+
+    def get(self, key: str):
+        """
+        Returns the cached value for ``key`` or None on a miss.
+        """
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._bump(conn, "misses")
+                return None
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._bump(conn, "hits")
+        return json.loads(row[0])
+
+    def set(self, key: str, value) -> None:
+        payload = json.dumps(value, default=_json_default)
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,))
+        count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        evicted = 0
+        for key, entry_size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            count -= 1
+            size -= entry_size
+            evicted += 1
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (evicted,),
+        )
+
+    def clear(self) -> None:
+        with contextlib.closing(self._connect()) as conn:
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM counters")
+
+    def stats(self) -> dict:
+        with contextlib.closing(self._connect()) as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "entries": count,
+            "bytes": size,
+        }
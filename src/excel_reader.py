@@ -0,0 +1,81 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+MAX_SHEET_WORKERS = int(os.getenv("EXCEL_MAX_WORKERS", str(os.cpu_count() or 1)))
+
+
+def list_sheets(data: bytes) -> list:
+    from openpyxl import load_workbook  # deferred: only needed once a workbook is uploaded
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def read_sheet(data: bytes, sheet_name: str) -> pd.DataFrame:
+    """
+    Streams one worksheet with openpyxl's read-only mode (no full DOM) into a DataFrame.
+    The first row is the header.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        # Raw cell values; dtypes are inferred once the sheets are stacked
+        df = pd.DataFrame(list(rows), columns=columns, dtype=object)
+    finally:
+        workbook.close()
+
+    # Excel rows that are entirely blank come through as all-None tuples
+    return df.dropna(how="all").reset_index(drop=True)
+
+
+def _infer_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    for col in df.columns:
+        # Mixed number/text cells (e.g. item codes) are identifiers: keep them as text.
+        # ("mixed-integer-float" is just ints alongside floats, which stay numeric.)
+        if pd.api.types.infer_dtype(df[col], skipna=True) in ("mixed", "mixed-integer"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    # Numbers become int64/float64 and text gets the string dtype read_csv would use
+    # (which is also what Parquet round-trips to)
+    return df.infer_objects()
+
+
+def read_workbook(data: bytes, sheet_name: str | None = None) -> tuple[pd.DataFrame, list, list]:
+    """
+    Parses a workbook into one frame, reading sheets in parallel worker processes.
+
+    With ``sheet_name`` only that sheet is read. Otherwise every sheet with the same header
+    as the first one is stacked (the common "one tab per month" layout); sheets with a
+    different header are skipped.
+
+    Returns:
+        The frame, the sheet names included and the sheet names skipped.
+    """
+    sheets = [sheet_name] if sheet_name else list_sheets(data)
+    if len(sheets) == 1 or MAX_SHEET_WORKERS <= 1:
+        frames = [read_sheet(data, sheet) for sheet in sheets]
+    else:
+        workers = min(len(sheets), MAX_SHEET_WORKERS)
+        # openpyxl is pure Python, so sheets are parsed in processes rather than threads.
+        # spawn avoids forking a multi-threaded Streamlit server.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            frames = list(pool.map(read_sheet, [data] * len(sheets), sheets))
+
+    header = list(frames[0].columns)
+    included = [sheet for sheet, frame in zip(sheets, frames) if list(frame.columns) == header]
+    skipped = [sheet for sheet in sheets if sheet not in included]
+    kept = [frame for frame in frames if list(frame.columns) == header]
+    df = pd.concat(kept, ignore_index=True) if len(kept) > 1 else kept[0]
+    return _infer_dtypes(df), included, skipped
@@ -0,0 +1,56 @@
+import glob
+import os
+
+import pandas as pd
+
+from src.disk_cache import CACHE_DIR
+
+FRAME_CACHE_DIR = os.getenv("FRAME_CACHE_DIR", os.path.join(CACHE_DIR, "frames"))
+FRAME_CACHE_MAX_FILES = int(os.getenv("FRAME_CACHE_MAX_FILES", "50"))
+
+
+def _path(key: str) -> str:
+    return os.path.join(FRAME_CACHE_DIR, f"{key}.parquet")
+
+
+def load_frame(key: str) -> pd.DataFrame | None:
+    """
+    Returns the cached columnar copy of a parsed frame, or None if absent/unreadable.
+    """
+    path = _path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pd.read_parquet(path)
+    except (ImportError, OSError, ValueError):
+        return None
+    os.utime(path)  # mark as recently used
+    return df
+
+
+def store_frame(key: str, df: pd.DataFrame) -> bool:
+    """
+    Writes a parsed frame as Parquet (pyarrow ships with Streamlit). Caching is best effort:
+    frames pyarrow cannot encode are simply not cached.
+    """
+    os.makedirs(FRAME_CACHE_DIR, exist_ok=True)
+    path = _path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)  # atomic, so concurrent readers never see partial files
+    except (ImportError, OSError, ValueError, TypeError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    _evict()
+    return True
+
+
+def _evict() -> None:
+    files = sorted(glob.glob(os.path.join(FRAME_CACHE_DIR, "*.parquet")), key=os.path.getmtime, reverse=True)
+    for stale in files[FRAME_CACHE_MAX_FILES:]:
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
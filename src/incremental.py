@@ -0,0 +1,215 @@
+"""
+Incremental re-profiling of CSV files that grow by appended rows (e.g. a daily export with
+one more day at the end).
+
+After a streamed profile, its pass-1 state (src.streaming.StreamProfile: moments, quantile,
+heavy-hitter and distinct sketches, null counts, time buckets, segment totals) is pickled
+under the file's header and length, with the values lying beyond (or just inside) the
+outlier fences. When a later upload starts with exactly the bytes of a stored file, only
+the appended tail is parsed and merged into that state; outliers in the old rows are
+re-evaluated from the kept values. Columns whose fences moved inward past the kept band (or
+that kept too many values), and mixed-type columns, are re-read from the whole file.
+
+The result matches ``summarize_csv_stream`` on the whole file up to the quantile sketch's
+error: merging changes how the sketch compacts, so medians and quartiles (and the MAD/IQR
+fences derived from them) may differ within its rank error bound.
+"""
+import glob
+import hashlib
+import io
+import os
+import pickle
+
+import numpy as np
+
+from src import telemetry
+from src.anomalies import could_have_outliers, select_columns
+from src.disk_cache import CACHE_DIR, stable_hash
+from src.streaming import DEFAULT_CHUNK_ROWS, OutlierScan, StreamProfile, _read_chunks, rescan
+
+PROFILE_STATE_DIR = os.getenv("PROFILE_STATE_DIR", os.path.join(CACHE_DIR, "profiles"))
+PROFILE_STATE_MAX_FILES = int(os.getenv("PROFILE_STATE_MAX_FILES", "20"))
+# Bump when StreamProfile or the kept-values layout changes so old states are ignored
+STATE_VERSION = "1"
+# Values kept for later runs: those beyond every detector's fences pulled this far towards the center
+CANDIDATE_MARGIN = 0.2
+MAX_KEPT_PER_COLUMN = 100_000
+
+_HEADER_MAX_BYTES = 64 * 1024
+_HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def _dataset_key(file_buffer: io.BytesIO) -> str:
+    # Files sharing a header line are candidates for sharing a prefix
+    file_buffer.seek(0)
+    return stable_hash(file_buffer.readline(_HEADER_MAX_BYTES).hex(), STATE_VERSION)[:24]
+
+
+def _stored_states(dataset: str) -> list:
+    states = []
+    for path in glob.glob(os.path.join(PROFILE_STATE_DIR, f"{dataset}-*.pkl")):
+        try:
+            _, length, digest = os.path.basename(path)[:-len(".pkl")].split("-")
+            states.append((int(length), digest, path))
+        except ValueError:
+            continue
+    return states
+
+
+def _hash_prefixes(file_buffer: io.BytesIO, lengths) -> tuple[dict, str]:
+    """Digests of the first ``lengths`` bytes and of the whole file, in one read."""
+    hasher = hashlib.blake2b(digest_size=20)
+    digests = {}
+    position = 0
+    file_buffer.seek(0)
+    for length in sorted(set(lengths)) + [None]:
+        while length is None or position < length:
+            block = file_buffer.read(_HASH_BLOCK_BYTES if length is None else min(_HASH_BLOCK_BYTES, length - position))
+            if not block:
+                break
+            hasher.update(block)
+            position += len(block)
+        if length is not None and position == length:
+            digests[length] = hasher.copy().hexdigest()
+    return digests, hasher.hexdigest()
+
+
+def _at_row_boundary(file_buffer: io.BytesIO, length: int) -> bool:
+    # The stored file's last row must be complete in the new one too
+    file_buffer.seek(length - 1)
+    around = file_buffer.read(2)
+    return around[:1] == b"\n" or around[1:2] in (b"\n", b"\r")
+
+
+def _load(path: str) -> dict | None:
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    os.utime(path)  # mark as recently used
+    return state if state.get("version") == STATE_VERSION else None
+
+
+def _store(dataset: str, length: int, digest: str, state: dict) -> None:
+    os.makedirs(PROFILE_STATE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_STATE_DIR, f"{dataset}-{length}-{digest}.pkl")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # atomic, so concurrent readers never see partial files
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    files = sorted(glob.glob(os.path.join(PROFILE_STATE_DIR, "*.pkl")), key=os.path.getmtime, reverse=True)
+    for stale in files[PROFILE_STATE_MAX_FILES:]:
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
+
+
+def _widened(params: dict) -> dict:
+    return {
+        name: (center, scale, threshold * (1 - CANDIDATE_MARGIN), applicable)
+        for name, (center, scale, threshold, applicable) in params.items()
+    }
+
+
+def _band(params: dict, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """Per column, the interval inside every applicable detector's fences (unbounded if none applies)."""
+    low, high = np.full(n, -np.inf), np.full(n, np.inf)
+    with np.errstate(invalid="ignore"):
+        for center, scale, threshold, applicable in params.values():
+            low = np.where(applicable, np.fmax(low, center - threshold * scale), low)
+            high = np.where(applicable, np.fmin(high, center + threshold * scale), high)
+    return low, high
+
+
+def summarize_csv_incremental(file_buffer: io.BytesIO, chunksize: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """
+    ``summarize_csv_stream`` that resumes from the stored state of the longest previously
+    profiled prefix of this file (if any) and stores this file's state for the next upload.
+
+    Args:
+        file_buffer: A seekable file-like object containing the CSV data.
+        chunksize: Number of rows parsed per chunk.
+
+    Returns:
+        A dictionary with the same schema as ``generate_summary_statistics``.
+    """
+    dataset = _dataset_key(file_buffer)
+    file_buffer.seek(0, io.SEEK_END)
+    size = file_buffer.tell()
+    stored = [entry for entry in _stored_states(dataset) if 0 < entry[0] <= size]
+    digests, digest = _hash_prefixes(file_buffer, [length for length, _, _ in stored])
+
+    state, prefix_bytes = None, 0
+    for length, stored_digest, path in sorted(stored, reverse=True):
+        if digests.get(length) == stored_digest and _at_row_boundary(file_buffer, length):
+            state = _load(path)
+            if state is not None:
+                prefix_bytes = length
+                break
+
+    with telemetry.span("incremental_profile", bytes=size, resumed_bytes=prefix_bytes) as stage:
+        if state is None:
+            profile, kept = StreamProfile(), {}
+            for chunk in _read_chunks(file_buffer, chunksize):
+                profile.update(chunk)
+            prefix_rows = 0
+        else:
+            profile, kept = state["profile"], state["kept"]
+            prefix_rows = profile.row_count
+            if prefix_bytes < size:
+                for chunk in _read_chunks(file_buffer, chunksize, prefix_bytes, header=None, names=profile.columns):
+                    profile.update(chunk)
+
+        numeric_cols, moments, params, numeric_stats = profile.numeric_summary()
+        n = len(numeric_cols)
+        fence_low, fence_high = _band(params, n)
+        widened = _widened(params)
+        low, high = _band(widened, n)
+
+        # Columns whose kept values still hold every old row beyond the new fences need only the tail
+        resumed, full = [], []
+        for idx, col in enumerate(numeric_cols):
+            if not could_have_outliers(widened, moments["min"][idx], moments["max"][idx], idx):
+                continue
+            entry = kept.get(col)
+            if state is not None and entry is not None and fence_low[idx] <= entry[0] and fence_high[idx] >= entry[1]:
+                # Never narrower than the old band: only values beyond it were kept
+                low[idx], high[idx] = min(low[idx], entry[0]), max(high[idx], entry[1])
+                resumed.append(idx)
+            else:
+                full.append(idx)
+        stage.set(rows=profile.row_count - prefix_rows, resumed_columns=len(resumed), rescanned_columns=len(full))
+
+        scans = []
+        if resumed:
+            scan = OutlierScan([numeric_cols[idx] for idx in resumed], select_columns(params, resumed),
+                               (low[resumed], high[resumed]), MAX_KEPT_PER_COLUMN)
+            for col in scan.columns:
+                scan.replay(col, kept[col][2], kept[col][3])
+            if prefix_bytes < size:
+                rescan(file_buffer, chunksize, profile, scan, [], prefix_bytes, prefix_rows, profile.columns)
+            scans.append(scan)
+        mixed_cols = profile.mixed_columns()
+        if full or mixed_cols:
+            scan = OutlierScan([numeric_cols[idx] for idx in full], select_columns(params, full),
+                               (low[full], high[full]), MAX_KEPT_PER_COLUMN)
+            rescan(file_buffer, chunksize, profile, scan, mixed_cols)
+            scans.append(scan)
+
+        new_kept = {}
+        for idx, col in enumerate(numeric_cols):
+            scan = next((scan for scan in scans if col in scan.kept), None)
+            values = scan.kept_values(col) if scan is not None else (np.empty(0, dtype=np.int64), np.empty(0))
+            new_kept[col] = None if values is None else (low[idx], high[idx], *values)
+        for scan in scans:
+            scan.finish(numeric_stats, profile.accumulators)
+
+    _store(dataset, size, digest, {"version": STATE_VERSION, "profile": profile, "kept": new_kept})
+    return profile.summary(numeric_stats)
@@ -0,0 +1,168 @@
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKENDS = ("pandas", "pyarrow", "polars")
+
+# pandas.read_csv's default na_values, so every backend agrees on what counts as missing
+PANDAS_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+# Strings with at most this share of distinct values become categoricals
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Text formats that are parsed to datetime64 (only if formatting back reproduces the text)
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+
+
+def _read_pandas(file_buffer: io.BytesIO) -> pd.DataFrame:
+    return pd.read_csv(file_buffer)
+
+
+def _read_pyarrow(file_buffer: io.BytesIO) -> pd.DataFrame:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    # Arrow infers ISO dates/timestamps by itself; keep them as text so date handling (and
+    # the summary) is identical across backends. The first block is enough to find them.
+    schema = pa_csv.open_csv(file_buffer).schema
+    file_buffer.seek(0)
+    text_columns = {
+        field.name: pa.string() for field in schema
+        if pa.types.is_timestamp(field.type) or pa.types.is_date(field.type) or pa.types.is_time(field.type)
+    }
+    table = pa_csv.read_csv(
+        file_buffer,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=text_columns,
+            null_values=PANDAS_NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    return table.to_pandas()
+
+
+def _read_polars(file_buffer: io.BytesIO) -> pd.DataFrame:
+    try:
+        import polars as pl
+    except ImportError as e:
+        raise ImportError("The 'polars' backend requires `pip install polars`.") from e
+
+    # Multithreaded reader; polars does not parse dates unless asked to
+    return pl.read_csv(file_buffer, null_values=PANDAS_NA_VALUES, infer_schema_length=None).to_pandas()
+
+
+_READERS = {
+    "pandas": _read_pandas,
+    "pyarrow": _read_pyarrow,
+    "polars": _read_polars,
+}
+
+
+def detect_date_format(series: pd.Series) -> str | None:
+    """
+    Returns the DATE_FORMATS entry that parses ``series`` and formats it back unchanged.
+    """
+    values = series.dropna()
+    if values.empty:
+        return None
+    sample = values.iloc[:100]
+    for fmt in DATE_FORMATS:
+        parsed = pd.to_datetime(sample, format=fmt, errors="coerce")
+        if parsed.isna().any() or not (parsed.dt.strftime(fmt) == sample).all():
+            continue
+        # Dates repeat a lot; checking the distinct values is enough
+        distinct = pd.Series(values.unique())
+        parsed = pd.to_datetime(distinct, format=fmt, errors="coerce")
+        if not parsed.isna().any() and (parsed.dt.strftime(fmt) == distinct).all():
+            return fmt
+    return None
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shrinks a freshly parsed frame without changing any value the stats engine sees:
+
+    - integers are downcast to the smallest integer type that holds them,
+    - floats become float32 only when every value survives the round trip exactly,
+    - ISO date/datetime text becomes datetime64 (format recorded for exact rendering),
+    - low-cardinality text becomes a categorical whose categories keep first-seen order.
+
+    The original dtype names and the date formats are kept in ``df.attrs`` so
+    ``generate_summary_statistics`` reports exactly what the default parser would have.
+    """
+    source_dtypes = df.dtypes.astype(str).to_dict()
+    date_formats = {}
+    compacted = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_integer_dtype(series.dtype):
+            series = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series.dtype):
+            narrow = series.astype(np.float32)
+            if np.array_equal(narrow.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True):
+                series = narrow
+        elif pd.api.types.is_string_dtype(series.dtype) or series.dtype == object:
+            if pd.api.types.infer_dtype(series, skipna=True) != "string":
+                compacted[col] = series
+                continue
+            fmt = detect_date_format(series)
+            if fmt:
+                date_formats[col] = fmt
+                series = pd.to_datetime(series, format=fmt)
+            else:
+                # factorize numbers values in first-seen order (missing -> -1)
+                codes, uniques = pd.factorize(series)
+                if len(uniques) <= CATEGORY_MAX_UNIQUE_RATIO * len(series):
+                    series = pd.Series(pd.Categorical.from_codes(codes, categories=uniques), index=series.index, name=col)
+        compacted[col] = series
+
+    compact = pd.DataFrame(compacted, index=df.index)
+    compact.attrs["source_dtypes"] = source_dtypes
+    compact.attrs["date_formats"] = date_formats
+    return compact
+
+
+def read_csv_frame(file_buffer: io.BytesIO, backend: str = "pyarrow", compact: bool = True) -> pd.DataFrame:
+    """
+    Parses a CSV with the chosen backend and (optionally) compacts its dtypes.
+
+    The frame's ``attrs["ingest"]`` reports the backend, parse time and memory used before
+    and after compaction.
+
+    Args:
+        file_buffer: A file-like object containing the CSV data.
+        backend: "pandas" (single-threaded C parser), "pyarrow" (multithreaded Arrow
+            reader) or "polars" (multithreaded, optional dependency).
+        compact: Downcast numbers, parse dates and categorize low-cardinality text.
+
+    Returns:
+        The parsed DataFrame.
+    """
+    if backend not in _READERS:
+        raise ValueError(f"Unknown CSV backend '{backend}'. Choose one of {BACKENDS}.")
+
+    file_buffer.seek(0)
+    if not file_buffer.read(1):
+        # Same error pandas raises, whatever the backend
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+    file_buffer.seek(0)
+    start = time.perf_counter()
+    df = _READERS[backend](file_buffer)
+    parsed = time.perf_counter()
+    raw_bytes = int(df.memory_usage(deep=True).sum())
+    if compact:
+        df = compact_dtypes(df)
+    df.attrs["ingest"] = {
+        "backend": backend,
+        "parse_seconds": round(parsed - start, 4),
+        "compact_seconds": round(time.perf_counter() - parsed, 4),
+        "memory_bytes_parsed": raw_bytes,
+        "memory_bytes": int(df.memory_usage(deep=True).sum()),
+    }
+    return df
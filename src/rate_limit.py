@@ -0,0 +1,88 @@
+import asyncio
+import collections
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at ``per_minute`` and holding at most
+    ``per_minute`` tokens (one minute of burst).
+
+    ``reserve`` takes tokens immediately, even into debt, and returns how long the caller
+    must wait for them. Callers therefore queue in arrival order without any loop-bound
+    primitive, so one bucket can be shared by every event loop and thread in the process.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        # A single request larger than the bucket would otherwise never fit
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Process-wide limiter for model calls: requests per minute and (estimated) tokens per
+    minute, plus a shared pause after the provider reports a rate limit, so every caller
+    backs off together instead of hammering the quota.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self.counters = collections.Counter()
+        self._lock = threading.Lock()
+
+    async def acquire(self, tokens: int) -> float:
+        """Waits for capacity for one request of ``tokens``; returns the seconds waited."""
+        wait = max(
+            self.requests.reserve(1),
+            self.tokens.reserve(tokens),
+            self.paused_until - time.monotonic(),
+        )
+        self.record("requests")
+        if wait > 0:
+            self.record("throttled")
+            self.record("throttled_seconds", wait)
+            await asyncio.sleep(wait)
+        return max(wait, 0.0)
+
+    def pause(self, seconds: float) -> None:
+        """Holds back every caller for ``seconds`` (e.g. the provider's Retry-After)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def record(self, counter: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[counter] += amount
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["throttled_seconds"] = round(counters.get("throttled_seconds", 0.0), 3)
+        return counters
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0, retry_after: float | None = None) -> float:
+    """
+    Full-jitter exponential backoff for retry ``attempt`` (0-based), never shorter than the
+    server's Retry-After.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,171 @@
+"""
+Fast row samples of large CSV files, and summary statistics estimated from them.
+
+The data (after the header) is cut into SAMPLE_BLOCKS equal byte ranges and a short run of
+consecutive rows is read from a random offset inside each, so the sample is stratified by
+position in the file (early and late rows, e.g. of a time-ordered export, are both
+represented) and costs a few hundred seeks instead of a full parse. The row count is
+estimated from the file size and the sampled rows' byte lengths.
+
+Rows are split on newlines, so line breaks inside quoted fields mis-split the sampled
+runs; the sample then fails to parse and the head of the file is sampled instead
+(``method: "head"``).
+"""
+import io
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_ROWS = int(os.getenv("PROGRESSIVE_SAMPLE_ROWS", "50000"))
+SAMPLE_BLOCKS = 256
+# Two-sided 95% normal quantile for the confidence intervals
+Z_95 = 1.959964
+
+_HEADER_MAX_BYTES = 64 * 1024
+
+
+def _ci(estimate: float, stderr: float) -> list:
+    return [estimate - Z_95 * stderr, estimate + Z_95 * stderr]
+
+
+def sample_csv(file_buffer: io.BytesIO, rows: int = SAMPLE_ROWS, blocks: int = SAMPLE_BLOCKS,
+               seed: int = 0) -> tuple[pd.DataFrame, dict] | None:
+    """
+    Reads a position-stratified sample of about ``rows`` rows.
+
+    Args:
+        file_buffer: A seekable file-like object containing the CSV data.
+        rows: Target sample size.
+        blocks: Number of byte ranges the rows are drawn from.
+        seed: Seed for the offsets within each range (fixed, so a file always yields the
+            same sample and the same estimated stats).
+
+    Returns:
+        The sampled frame and the sampling report (estimated row count with its 95%
+        confidence interval, sampled rows and fraction), or None when the file is too
+        small for sampling to save anything (profile it whole instead).
+    """
+    file_buffer.seek(0, io.SEEK_END)
+    size = file_buffer.tell()
+    file_buffer.seek(0)
+    header = file_buffer.readline(_HEADER_MAX_BYTES)
+    data_start = file_buffer.tell()
+    data_bytes = size - data_start
+    per_block = max(1, math.ceil(rows / blocks))
+
+    # Rows of the first block give the typical row length, and show whether sampling pays
+    first = [file_buffer.readline() for _ in range(per_block)]
+    first = [line for line in first if line]
+    if not first or sum(map(len, first)) * blocks * 2 >= data_bytes:
+        return None
+
+    rng = np.random.default_rng(seed)
+    run_bytes = sum(map(len, first))
+    bounds = np.linspace(data_start, size, blocks + 1).astype(np.int64)
+    lines = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        offset = int(start + rng.integers(0, max(1, end - start - run_bytes)))
+        file_buffer.seek(offset)
+        if offset > data_start:
+            file_buffer.readline()  # finish the row the offset landed in
+        for _ in range(per_block):
+            # Stop at the next range, so runs never overlap
+            if file_buffer.tell() >= end:
+                break
+            line = file_buffer.readline()
+            if not line:
+                break
+            lines.append(line)
+
+    method, lines_per_row = "stratified_blocks", 1.0
+    try:
+        df = pd.read_csv(io.BytesIO(header + b"".join(lines)))
+        if len(df) != len(lines):
+            raise pd.errors.ParserError("rows span sampled lines")
+    except (pd.errors.ParserError, UnicodeDecodeError):
+        file_buffer.seek(0)
+        df = pd.read_csv(file_buffer, nrows=rows)
+        file_buffer.seek(data_start)
+        lines = [line for line in (file_buffer.readline() for _ in range(rows)) if line]
+        method = "head"
+        # Rows span several lines each
+        lines_per_row = len(lines) / max(1, len(pd.read_csv(io.BytesIO(header + b"".join(lines)))))
+    file_buffer.seek(0)
+
+    lengths = np.fromiter(map(len, lines), dtype=np.float64, count=len(lines))
+    mean_length = lengths.mean()
+    estimated_rows = data_bytes / mean_length / lines_per_row
+    # Delta method: the row count is data_bytes / mean row length
+    stderr = estimated_rows * lengths.std(ddof=1) / math.sqrt(len(lengths)) / mean_length if len(lengths) > 1 else 0.0
+    low, high = _ci(estimated_rows, stderr)
+    report = {
+        "method": method,
+        "sample_rows": len(df),
+        "estimated_row_count": round(estimated_rows),
+        "row_count_ci95": [max(len(df), math.floor(low)), math.ceil(high)],
+        "sampled_fraction": float(min(1.0, len(df) / estimated_rows)),
+    }
+    return df, report
+
+
+def _scaled(value, scale: float):
+    if isinstance(value, (int, np.integer)):
+        return round(value * scale)
+    return value * scale if isinstance(value, (float, np.floating)) else value
+
+
+def annotate_estimates(stats: dict, report: dict) -> dict:
+    """
+    Turns summary statistics of a sample into estimates for the whole file, in place.
+
+    Counts (rows, missing values, outliers, value and segment counts and sums) are scaled
+    up to the estimated row count; numeric means get a 95% confidence interval; row
+    positions of outlier examples (positions in the sample, not the file) are dropped.
+    ``overall_summary`` is marked ``estimated`` and carries the sampling report.
+    """
+    n = report["estimated_row_count"]
+    m = report["sample_rows"]
+    scale = n / m if m else 1.0
+    overall = stats["overall_summary"]
+    missing = overall["missing_values_summary"]
+    overall["row_count"] = n
+    overall["missing_values_summary"] = {col: _scaled(count, scale) for col, count in missing.items()}
+    overall["estimated"] = True
+    overall["sample"] = report
+
+    # Finite population correction: the sample can be a sizable share of the file
+    fpc = math.sqrt(max(0.0, 1 - m / n)) if n else 0.0
+    for col, col_stats in stats.get("numeric_columns", {}).items():
+        k = m - missing.get(col, 0)
+        if k > 1 and col_stats.get("std_dev") is not None:
+            col_stats["mean_ci95"] = _ci(col_stats["mean"], col_stats["std_dev"] / math.sqrt(k) * fpc)
+        for key in list(col_stats):
+            if key.startswith("anomaly_detection_") and key.endswith("_outliers_count"):
+                col_stats[key] = _scaled(col_stats[key], scale)
+            elif key.startswith("anomaly_detection_") and key.endswith("_outliers_rows"):
+                del col_stats[key]
+
+    mahalanobis = stats.get("anomaly_detection_mahalanobis")
+    if mahalanobis:
+        for key in ("rows_evaluated", "outliers_count"):
+            if key in mahalanobis:
+                mahalanobis[key] = _scaled(mahalanobis[key], scale)
+        for example in mahalanobis.get("examples", []):
+            example.pop("row", None)
+
+    for counts in stats.get("non_numeric_columns", {}).values():
+        for value in counts:
+            counts[value] = _scaled(counts[value], scale)
+    for profile in stats.get("categorical_profile", {}).values():
+        # Values the sample missed are not counted
+        profile["distinct_is_exact"] = False
+    for breakdown in stats.get("segments", {}).values():
+        for measure in breakdown.get("measures", {}).values():
+            for ranking in measure.values():
+                for segment in ranking.values() if isinstance(ranking, dict) else ():
+                    for key in ("sum", "count"):
+                        if key in segment:
+                            segment[key] = _scaled(segment[key], scale)
+    return stats
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# Dimension columns need between 2 and this many distinct values (and ~2+ rows per segment)
+MAX_SEGMENT_CARDINALITY = 50
+MAX_DIMENSIONS = 5
+# Segments reported per measure at each end of the ranking
+TOP_SEGMENTS = 3
+
+
+def is_dimension(distinct: int, rows: int) -> bool:
+    return 2 <= distinct <= MAX_SEGMENT_CARDINALITY and distinct * 2 <= rows
+
+
+class SegmentTotals:
+    """
+    Mergeable per-segment sums and non-null counts of every numeric measure for one
+    dimension column, from a single ``groupby`` per frame (or chunk).
+
+    Stops tracking (``overflowed``) once the column has more than ``max_segments`` values,
+    so ID-like columns cost one chunk at most.
+    """
+
+    def __init__(self, dimension: str, max_segments: int = MAX_SEGMENT_CARDINALITY):
+        self.dimension = dimension
+        self.max_segments = max_segments
+        self.sums = None
+        self.counts = None
+        self.overflowed = False
+
+    def update(self, df: pd.DataFrame) -> None:
+        if self.overflowed:
+            return
+        measures = df.select_dtypes(include=np.number)
+        if measures.empty:
+            return
+        # One pass: both aggregations share the groupby's factorization of the keys
+        grouped = measures.groupby(df[self.dimension].rename(None), sort=False, observed=True)
+        self._add(grouped.sum(), grouped.count())
+
+    def merge(self, other: "SegmentTotals") -> None:
+        if other.overflowed:
+            self._overflow()
+        elif other.sums is not None and not self.overflowed:
+            self._add(other.sums, other.counts)
+
+    def _add(self, sums: pd.DataFrame, counts: pd.DataFrame) -> None:
+        if self.sums is not None:
+            sums = pd.concat([self.sums, sums]).groupby(level=0, sort=False).sum()
+            counts = pd.concat([self.counts, counts]).groupby(level=0, sort=False).sum()
+        self.sums, self.counts = sums, counts
+        if len(sums) > self.max_segments:
+            self._overflow()
+
+    def _overflow(self) -> None:
+        self.overflowed = True
+        self.sums = self.counts = None
+
+    @property
+    def segment_count(self) -> int:
+        return 0 if self.sums is None else len(self.sums)
+
+    def summary(self, measures, k: int = TOP_SEGMENTS) -> dict | None:
+        """
+        Top and bottom ``k`` segments by sum for each of ``measures`` (ties keep first-seen
+        order). When there are at most ``2 * k`` segments they are all listed under "top".
+        """
+        if self.sums is None:
+            return None
+        per_measure = {}
+        for measure in measures:
+            if measure not in self.sums.columns:
+                continue
+            counts = self.counts[measure]
+            sums = self.sums[measure][counts > 0]
+            if sums.empty:
+                continue
+            total = sums.sum()
+            ranked = sums.sort_values(ascending=False, kind="stable")
+
+            def describe(keys):
+                return {
+                    str(key): _segment_entry(ranked[key], int(counts[key]), total) for key in keys
+                }
+
+            if len(ranked) <= 2 * k:
+                per_measure[measure] = {"top": describe(ranked.index)}
+            else:
+                per_measure[measure] = {"top": describe(ranked.index[:k]), "bottom": describe(ranked.index[::-1][:k])}
+        if not per_measure:
+            return None
+        return {"segment_count": self.segment_count, "measures": per_measure}
+
+
+def _segment_entry(total, count: int, grand_total) -> dict:
+    entry = {"sum": total.item(), "mean": float(total / count), "count": count}
+    if grand_total:
+        entry["share_pct"] = float(total / grand_total * 100)
+    return entry
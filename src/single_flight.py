@@ -0,0 +1,179 @@
+import asyncio
+import collections
+import concurrent.futures
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.future = concurrent.futures.Future()
+        self.waiters = 0
+        self.task = None
+        self.loop = None
+
+
+class _Stream:
+    def __init__(self):
+        self.items = []
+        self.finished = False
+        self.error = None
+        # wake-up event -> the loop its subscriber runs on
+        self.subscribers = {}
+        self.task = None
+        self.loop = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one upstream call whose outcome
+    (result or exception) every caller receives.
+
+    Works across threads and event loops: the call runs as a task on the first caller's
+    loop and the others wait on a thread-safe future. Cancelling one caller never cancels
+    the shared call while anyone else is still waiting; once every caller has gone, the
+    call is cancelled. A caller that joined a call cancelled that way starts a new one.
+
+    ``stream`` does the same for streamed calls (async iterators): the stream is consumed
+    once and every caller receives all of its items, including those produced before it
+    joined.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self.counters = collections.Counter()
+
+    async def do(self, key, call):
+        """
+        Returns ``await call()``, sharing it with concurrent callers using the same ``key``.
+        """
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                flight.waiters += 1
+                self.counters["calls" if leader else "coalesced"] += 1
+            if leader:
+                flight.loop = asyncio.get_running_loop()
+                flight.task = asyncio.ensure_future(call())
+                flight.task.add_done_callback(lambda task, key=key, flight=flight: self._finish(key, flight, task))
+            try:
+                return await asyncio.shield(asyncio.wrap_future(flight.future))
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    self._leave(flight)
+                    raise
+                # The shared call was abandoned by everyone else: start over
+                continue
+            finally:
+                with self._lock:
+                    flight.waiters = max(0, flight.waiters - 1)
+
+    def _leave(self, flight: _Flight) -> None:
+        with self._lock:
+            abandoned = flight.waiters == 1 and not flight.future.done()
+        if abandoned:
+            flight.loop.call_soon_threadsafe(flight.task.cancel)
+
+    def _finish(self, key, flight: _Flight, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        if task.cancelled():
+            flight.future.cancel()
+        elif task.exception() is not None:
+            flight.future.set_exception(task.exception())
+        else:
+            flight.future.set_result(task.result())
+
+    async def stream(self, key, call):
+        """
+        Yields the items of ``call()`` (an async iterator), sharing one consumption of it
+        with concurrent callers using the same ``key``; raises its exception, if any, once
+        its items have been yielded.
+        """
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        with self._lock:
+            flight = self._streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._streams[key] = _Stream()
+                flight.loop = loop
+            flight.subscribers[wake] = loop
+            self.counters["calls" if leader else "coalesced"] += 1
+        if leader:
+            flight.task = loop.create_task(self._pump(key, flight, call))
+        index = 0
+        try:
+            while True:
+                # Cleared before reading, so items published after the read wake us up
+                wake.clear()
+                with self._lock:
+                    items = flight.items[index:]
+                    finished, error = flight.finished, flight.error
+                index += len(items)
+                for item in items:
+                    yield item
+                if finished:
+                    if error is not None:
+                        raise error
+                    return
+                if not items:
+                    await wake.wait()
+        finally:
+            self._unsubscribe(key, flight, wake)
+
+    async def _pump(self, key, flight: _Stream, call) -> None:
+        try:
+            async for item in call():
+                self._publish(flight, item)
+        except BaseException as e:
+            # Cancellation too, so subscribers on other loops never wait forever
+            self._end_stream(key, flight, e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            self._end_stream(key, flight, None)
+
+    def _publish(self, flight: _Stream, item) -> None:
+        with self._lock:
+            flight.items.append(item)
+        self._wake(flight)
+
+    def _end_stream(self, key, flight: _Stream, error) -> None:
+        with self._lock:
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            flight.finished, flight.error = True, error
+        self._wake(flight)
+
+    def _wake(self, flight: _Stream) -> None:
+        with self._lock:
+            subscribers = list(flight.subscribers.items())
+        for wake, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:  # that subscriber's loop has closed
+                pass
+
+    def _unsubscribe(self, key, flight: _Stream, wake: asyncio.Event) -> None:
+        with self._lock:
+            flight.subscribers.pop(wake, None)
+            abandoned = not flight.subscribers and not flight.finished
+            if abandoned and self._streams.get(key) is flight:
+                # Nobody can join it any more, so nobody is left to see it cancelled
+                del self._streams[key]
+        if abandoned and flight.task is not None:
+            flight.loop.call_soon_threadsafe(flight.task.cancel)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights) + len(self._streams)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "in_flight": len(self._flights) + len(self._streams)}
@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    """
+    Mergeable KLL-style quantile sketch with bounded memory.
+
+    Values are buffered in levels of compactors; level ``h`` items carry weight ``2**h``.
+    While nothing has been compacted the sketch is exact and quantiles match
+    ``numpy.percentile(method="linear")``; afterwards the rank error is roughly ``1.7 / k``.
+    """
+
+    def __init__(self, k: int = 256, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0, dtype=np.float64))
+            items = np.sort(items)
+            # Keep one item back on odd-sized buffers so total weight is preserved
+            held = items[-1:] if len(items) % 2 else items[:0]
+            paired = items[:len(items) - len(held)]
+            promoted = paired[self._rng.integers(2)::2]
+            self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+            self.levels[level] = held.copy()
+            # Capacities shrink as levels are added, so re-check from the bottom
+            level = 0
+
+    def update(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.n += other.n
+        self._compress()
+
+    @property
+    def is_exact(self) -> bool:
+        return len(self.levels[0]) == self.n
+
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        if self.is_exact:
+            return np.percentile(self.levels[0], qs * 100)
+
+        return self._weighted_quantiles(np.concatenate(self.levels), qs)
+
+    def _weighted_quantiles(self, values: np.ndarray, qs: np.ndarray) -> np.ndarray:
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values, weights = values[order], weights[order]
+        # Each weighted item stands for a run of ranks; interpolate on the run centres
+        centres = np.cumsum(weights) - (weights + 1) / 2
+        return np.interp(qs * (self.n - 1), centres, values)
+
+    def median_absolute_deviation(self, center: float) -> float:
+        """Median of |x - center| over the summarized values (exact while the sketch is)."""
+        if self.n == 0:
+            return np.nan
+        if self.is_exact:
+            return float(np.median(np.abs(self.levels[0] - center)))
+        deviations = np.abs(np.concatenate(self.levels) - center)
+        return float(self._weighted_quantiles(deviations, np.array([0.5]))[0])
+
+    def rank(self, value: float) -> float:
+        """Estimated number of values <= ``value``."""
+        weights = [np.count_nonzero(items <= value) * 2.0 ** level for level, items in enumerate(self.levels)]
+        return float(sum(weights))
+
+
+class SpaceSaving:
+    """
+    Mergeable Space-Saving heavy-hitters summary: keeps at most ``capacity`` keys with counts
+    that overestimate the true count by no more than that key's entry in ``errors``.
+
+    ``error_bound`` caps every overestimate and the count of any key that is not tracked.
+    Updates are vectorized: a batch is reduced with ``value_counts`` and folded in with the
+    mergeable-summaries combine rule, so the per-row cost is a hash of the batch only.
+    Exact (error bound 0) while the number of distinct keys fits within ``capacity``.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.errors = pd.Series(dtype=np.int64)
+        self.error_bound = 0
+
+    def update(self, values: pd.Series) -> None:
+        self.update_counts(values.value_counts(sort=False))
+
+    def update_counts(self, counts) -> None:
+        """Folds exact ``{key: count}`` counts (dict or Series) into the summary."""
+        counts = pd.Series(counts, dtype=np.int64) if isinstance(counts, dict) else counts.astype(np.int64)
+        dropped_bound = 0
+        if len(counts) > self.capacity:
+            # Only the batch's own heavy hitters and keys already tracked can stay tracked;
+            # every other key occurred at most ``dropped_bound`` times in this batch
+            keep = (counts.rank(method="first", ascending=False) <= self.capacity).to_numpy()
+            keep = keep | counts.index.isin(self.counts.index)
+            if not keep.all():
+                dropped_bound = int(counts[~keep].max())
+                counts = counts[keep]
+        self._combine(counts, pd.Series(0, index=counts.index, dtype=np.int64), 0, dropped_bound)
+
+    def merge(self, other: "SpaceSaving") -> None:
+        self._combine(other.counts, other.errors, other.error_bound)
+
+    def _combine(self, counts: pd.Series, errors: pd.Series, other_bound: int, dropped_bound: int = 0) -> None:
+        # A key missing from one side may still have occurred there up to that side's bound.
+        # Union keeps first-seen order, so ties rank like Series.value_counts().
+        index = self.counts.index.union(counts.index.rename(None), sort=False)
+        combined = self.counts.reindex(index, fill_value=self.error_bound) + counts.reindex(index, fill_value=other_bound)
+        combined_errors = self.errors.reindex(index, fill_value=self.error_bound) + errors.reindex(index, fill_value=other_bound)
+        bound = self.error_bound + other_bound + dropped_bound
+        if len(combined) > self.capacity:
+            keep = (combined.rank(method="first", ascending=False) <= self.capacity).to_numpy()
+            bound = max(bound, int(combined[~keep].max()))
+            combined, combined_errors = combined[keep], combined_errors[keep]
+        self.counts, self.errors, self.error_bound = combined, combined_errors, bound
+
+    @property
+    def is_exact(self) -> bool:
+        return self.error_bound == 0
+
+    def top(self, n: int) -> dict:
+        # Stable sort keeps first-seen order for ties, matching Series.value_counts()
+        return self.counts.sort_values(ascending=False, kind="stable").head(n).to_dict()
+
+    def top_error_bound(self, n: int) -> int:
+        """Largest overestimate among the ``top(n)`` counts."""
+        top = self.counts.sort_values(ascending=False, kind="stable").head(n)
+        return int(self.errors[top.index].max()) if len(top) else 0
+
+
+class HyperLogLog:
+    """
+    Mergeable HyperLogLog distinct counter over 64-bit pandas value hashes.
+
+    Uses ``2**precision`` one-byte registers (16 KiB by default) for a relative standard
+    error of about ``1.04 / sqrt(2**precision)`` (~0.8%), with linear counting for small
+    cardinalities. Updates are fully vectorized.
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values) -> None:
+        """Adds a Series or Index of values (feeding only the distinct ones is equivalent)."""
+        values = values.dropna()
+        if len(values):
+            # Callers mostly pass distinct values, so skip pandas' factorize-then-hash path
+            self.update_hashes(pd.util.hash_pandas_object(values, index=False, categorize=False).to_numpy())
+
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        width = 64 - self.precision
+        buckets = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # rest < 2**53 converts to float exactly; frexp's exponent is floor(log2(rest)) + 1
+        # (0 for rest == 0), so this is the position of the leftmost 1-bit in the width-bit word
+        _, exponent = np.frexp(rest.astype(np.float64))
+        ranks = (width + 1 - exponent).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return float(m * np.log(m / zeros))
+        return float(raw)
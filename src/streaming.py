@@ -0,0 +1,440 @@
+import collections
+import io
+
+import numpy as np
+import pandas as pd
+
+from src.anomalies import (
+    FIRST_EXAMPLES, could_have_outliers, detector_params, outlier_masks, pick_examples, select_columns,
+)
+from src.segments import MAX_DIMENSIONS, SegmentTotals, is_dimension
+from src.sketches import HyperLogLog, QuantileSketch, SpaceSaving
+from src.time_series import TimeBuckets, find_time_column
+
+DEFAULT_CHUNK_ROWS = 100_000
+# Keys tracked per non-numeric column by the heavy-hitters summary
+TOP_K_CAPACITY = 1024
+
+
+class NumericAccumulator:
+    """
+    Mergeable per-column numeric state: Welford/Chan moments, min/max and a quantile sketch.
+    """
+
+    def __init__(self, sketch_k: int = 256):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+        self.sketch = QuantileSketch(k=sketch_k)
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        chunk_mean = values.mean()
+        self._merge_moments(
+            len(values), float(chunk_mean), float(np.square(values - chunk_mean).sum()),
+            float(values.min()), float(values.max()),
+        )
+        self.sketch.update(values)
+
+    def merge(self, other: "NumericAccumulator") -> None:
+        if other.count:
+            self._merge_moments(other.count, other.mean, other.m2, other.min, other.max)
+        self.sketch.merge(other.sketch)
+
+    def _merge_moments(self, count: int, mean: float, m2: float, minimum: float, maximum: float) -> None:
+        if not self.count:
+            self.count, self.mean, self.m2, self.min, self.max = count, mean, m2, minimum, maximum
+            return
+        # Chan et al. parallel combination of (count, mean, M2)
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else np.nan
+
+
+class ColumnAccumulator:
+    """
+    Everything tracked for one CSV column across chunks. A column starts out numeric and is
+    demoted to categorical if any chunk parses it as text (as a full ``read_csv`` would).
+    """
+
+    def __init__(self, sketch_k: int = 256, top_k_capacity: int = TOP_K_CAPACITY):
+        self.row_count = 0
+        self.null_count = 0
+        self.dtypes = []
+        self.numeric = NumericAccumulator(sketch_k=sketch_k)
+        self.frequent = SpaceSaving(capacity=top_k_capacity)
+        self.distinct = HyperLogLog()
+
+    def update(self, series: pd.Series) -> None:
+        nulls = int(series.isnull().sum())
+        self.row_count += len(series)
+        self.null_count += nulls
+        if nulls == len(series):
+            # All-null chunks parse as float64 and say nothing about the real dtype
+            return
+        self.dtypes.append(series.dtype)
+        if _is_numeric_dtype(series.dtype):
+            self.numeric.update(series.to_numpy(dtype=np.float64, na_value=np.nan))
+        else:
+            self.update_text(series)
+
+    def update_text(self, series: pd.Series) -> None:
+        counts = series.value_counts(sort=False)
+        self.frequent.update_counts(counts)
+        self.distinct.update(counts.index)
+
+    def merge(self, other: "ColumnAccumulator") -> None:
+        self.row_count += other.row_count
+        self.null_count += other.null_count
+        self.dtypes.extend(other.dtypes)
+        self.numeric.merge(other.numeric)
+        self.frequent.merge(other.frequent)
+        self.distinct.merge(other.distinct)
+
+    @property
+    def dtype(self):
+        """The dtype a single full ``read_csv`` would have inferred for this column."""
+        if not self.dtypes:
+            # read_csv gives all-null columns float64, and header-only columns object
+            return np.dtype("float64") if self.row_count else np.dtype("object")
+        first = self.dtypes[0]
+        kinds = {getattr(dtype, "kind", "O") for dtype in self.dtypes}
+        # Integers with nulls anywhere (e.g. only in all-null chunks) parse as float64
+        if kinds <= set("iu") and self.null_count:
+            return np.dtype("float64")
+        if all(dtype == first for dtype in self.dtypes):
+            return first
+        if kinds <= set("iuf"):
+            return np.result_type(*self.dtypes)
+        for dtype in self.dtypes:
+            if pd.api.types.is_string_dtype(dtype) and dtype != object:
+                return dtype
+        return np.dtype("object")
+
+    @property
+    def is_numeric(self) -> bool:
+        return _is_numeric_dtype(self.dtype)
+
+    @property
+    def is_mixed(self) -> bool:
+        """Some chunks parsed as numbers, but the column as a whole is text."""
+        return not self.is_numeric and self.numeric.count > 0
+
+    def categorical_profile(self, top: int = 5) -> dict:
+        # While the summary is exact it holds every distinct value
+        exact = self.frequent.is_exact
+        return {
+            "approx_distinct": len(self.frequent.counts) if exact else round(self.distinct.estimate()),
+            "distinct_is_exact": exact,
+            "top_k_error_bound": self.frequent.top_error_bound(top),
+        }
+
+
+def _read_chunks(file_buffer: io.BytesIO, chunksize: int, start: int = 0, **kwargs):
+    file_buffer.seek(start)
+    try:
+        reader = pd.read_csv(file_buffer, chunksize=chunksize, **kwargs)
+    except pd.errors.EmptyDataError:
+        if start:
+            return  # a tail of blank lines
+        raise
+    with reader:
+        yield from reader
+
+
+class StreamProfile:
+    """
+    Pass-1 state of a streamed profile: per-column accumulators, hourly time buckets and
+    per-segment totals. Everything in it is mergeable, so a profile can be pickled and
+    resumed later with more rows (see src.incremental).
+    """
+
+    def __init__(self):
+        self.accumulators = {}
+        self.row_count = 0
+        self.buckets = None
+        self.segments = {}
+
+    @property
+    def columns(self) -> list:
+        return list(self.accumulators)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.row_count += len(chunk)
+        for col in chunk.columns:
+            if col not in self.accumulators:
+                self.accumulators[col] = ColumnAccumulator()
+            self.accumulators[col].update(chunk[col])
+            if not _is_numeric_dtype(chunk[col].dtype):
+                if col not in self.segments:
+                    self.segments[col] = SegmentTotals(col)
+                self.segments[col].update(chunk)
+        if self.buckets is None:
+            time_column = find_time_column(chunk)
+            self.buckets = TimeBuckets(*time_column) if time_column else None
+        if self.buckets is not None:
+            self.buckets.update(chunk)
+
+    def numeric_columns(self) -> list:
+        return [col for col, acc in self.accumulators.items() if acc.is_numeric]
+
+    def mixed_columns(self) -> list:
+        return [col for col, acc in self.accumulators.items() if acc.is_mixed]
+
+    def numeric_summary(self) -> tuple:
+        """Numeric column names, the detectors' parameters and the per-column stats (counts still 0)."""
+        numeric_cols = self.numeric_columns()
+        moments = _numeric_moments([self.accumulators[col].numeric for col in numeric_cols])
+        params = detector_params(moments)
+        numeric_stats = {col: _numeric_column_stats(moments, params, idx) for idx, col in enumerate(numeric_cols)}
+        return numeric_cols, moments, params, numeric_stats
+
+    def reset_text(self, columns) -> None:
+        """Forgets the text summaries of ``columns`` before they are re-read as text."""
+        for col in columns:
+            acc = self.accumulators[col]
+            acc.frequent = SpaceSaving(capacity=acc.frequent.capacity)
+            acc.distinct = HyperLogLog()
+
+    def summary(self, numeric_stats: dict) -> dict:
+        accumulators, row_count = self.accumulators, self.row_count
+        dtypes = pd.Series({col: str(acc.dtype) for col, acc in accumulators.items()}, dtype=object)
+        summary_stats = {
+            "overall_summary": {
+                "row_count": row_count,
+                "column_count": len(accumulators),
+                "missing_values_summary": {col: acc.null_count for col, acc in accumulators.items()},
+                "data_types_distribution": dtypes.value_counts().to_dict(),
+            },
+            "numeric_columns": numeric_stats,
+            "non_numeric_columns": {
+                col: acc.frequent.top(5) for col, acc in accumulators.items() if not acc.is_numeric
+            },
+            "categorical_profile": {
+                col: acc.categorical_profile() for col, acc in accumulators.items() if not acc.is_numeric
+            },
+        }
+        buckets = self.buckets
+        time_series = buckets.summary(list(numeric_stats)) if buckets is not None and numeric_stats else None
+        if time_series:
+            summary_stats["time_series"] = time_series
+
+        time_column = buckets.time_column if buckets is not None else None
+        dimensions = [
+            col for col, totals in self.segments.items()
+            if col != time_column and not accumulators[col].is_numeric and not accumulators[col].is_mixed
+            and not totals.overflowed and is_dimension(totals.segment_count, row_count)
+        ][:MAX_DIMENSIONS] if numeric_stats else []
+        breakdowns = {col: self.segments[col].summary(list(numeric_stats)) for col in dimensions}
+        if any(breakdowns.values()):
+            summary_stats["segments"] = {col: breakdown for col, breakdown in breakdowns.items() if breakdown}
+        return summary_stats
+
+
+class OutlierScan:
+    """
+    Pass-2 state: outlier counts and example candidates per (detector, column), fed rows in
+    ascending order. With a ``band`` (per-column low/high arrays), every value outside it is
+    also kept with its row position, so a later run can re-evaluate them under new fences
+    without re-reading these rows (see src.incremental).
+    """
+
+    def __init__(self, columns: list, params: dict, band: tuple | None = None, max_kept: int | None = None):
+        self.columns = columns
+        self.params = params
+        self.band = band
+        self.max_kept = max_kept
+        self.counts = collections.Counter()
+        self.candidates = {}
+        # Per column: lists of (rows, values) parts, or None once more than max_kept were seen
+        self.kept = {col: [] for col in columns} if band is not None else {}
+        self._kept_sizes = collections.Counter()
+
+    def update(self, chunk: pd.DataFrame, offset: int) -> None:
+        """Scans one chunk whose first row is at position ``offset``."""
+        block = chunk[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        for name, mask in outlier_masks(block, self.params).items():
+            for j in np.flatnonzero(mask.any(axis=0)):
+                col = self.columns[j]
+                # Global positions, so sampling picks the same rows however the file is chunked
+                positions = np.flatnonzero(mask[:, j]) + offset
+                self._add(name, col, positions, lambda picked, col=col: chunk[col].iloc[picked - offset].tolist())
+        if self.band is not None:
+            with np.errstate(invalid="ignore"):
+                outside = (block < self.band[0]) | (block > self.band[1])
+            for j in np.flatnonzero(outside.any(axis=0)):
+                positions = np.flatnonzero(outside[:, j])
+                self._keep(self.columns[j], positions + offset, block[positions, j])
+
+    def replay(self, col: str, rows: np.ndarray, values: np.ndarray) -> None:
+        """Feeds previously kept values of ``col`` (ascending ``rows``) as if they were scanned."""
+        j = self.columns.index(col)
+        masks = outlier_masks(values[:, None], select_columns(self.params, [j]))
+        for name, mask in masks.items():
+            hits = np.flatnonzero(mask[:, 0])
+            if len(hits):
+                self._add(name, col, rows[hits], lambda picked: values[np.searchsorted(rows, picked)].tolist())
+        if self.band is not None:
+            outside = (values < self.band[0][j]) | (values > self.band[1][j])
+            self._keep(col, rows[outside], values[outside])
+
+    def _add(self, name: str, col: str, positions: np.ndarray, values_at) -> None:
+        first = name in FIRST_EXAMPLES
+        self.counts[(name, col)] += len(positions)
+        picked = pick_examples(positions, first)
+        old_rows, old_values = self.candidates.get((name, col), (np.empty(0, dtype=np.int64), []))
+        rows = np.concatenate((old_rows, picked))
+        values = old_values + values_at(picked)
+        keep = np.searchsorted(rows, pick_examples(rows, first))
+        self.candidates[(name, col)] = (rows[keep], [values[i] for i in keep])
+
+    def _keep(self, col: str, rows: np.ndarray, values: np.ndarray) -> None:
+        if self.kept[col] is None or not len(rows):
+            return
+        self._kept_sizes[col] += len(rows)
+        if self.max_kept is not None and self._kept_sizes[col] > self.max_kept:
+            self.kept[col] = None
+            return
+        self.kept[col].append((rows, values))
+
+    def kept_values(self, col: str) -> tuple | None:
+        """All kept (rows, values) of ``col`` in row order, or None if it overflowed."""
+        parts = self.kept.get(col)
+        if parts is None:
+            return None
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        return np.concatenate([rows for rows, _ in parts]), np.concatenate([values for _, values in parts])
+
+    def finish(self, numeric_stats: dict, accumulators: dict) -> None:
+        """Writes the counts and examples into ``numeric_stats``."""
+        for (name, col), count in self.counts.items():
+            numeric_stats[col][f"anomaly_detection_{name}_outliers_count"] = count
+        for (name, col), (rows, values) in self.candidates.items():
+            # Chunks that happened to have no NaNs parse as int64 even if the full column is
+            # float64 (and replayed values are float64 whatever the column)
+            kind = accumulators[col].dtype.kind
+            if kind == "f":
+                values = [float(v) for v in values]
+            elif kind in "iu":
+                values = [int(v) for v in values]
+            numeric_stats[col][f"anomaly_detection_{name}_outliers_examples"] = values
+            numeric_stats[col][f"anomaly_detection_{name}_outliers_rows"] = rows.tolist()
+
+
+def summarize_csv_stream(file_buffer: io.BytesIO, chunksize: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """
+    Bounded-memory equivalent of ``generate_summary_statistics(pd.read_csv(file_buffer))``.
+
+    Pass 1 folds each chunk into per-column accumulators. Pass 2 re-reads only the columns
+    that need it: numeric columns whose range crosses a detector's fences (z-score, MAD or
+    IQR; to count outliers and pick examples) and text columns that some chunks parsed as
+    numbers. The row-level Mahalanobis detector needs the full block and is batch-only. Peak memory is one
+    chunk plus the fixed-size sketches (and the hourly time buckets and per-segment totals of
+    low-cardinality columns). Mean/std are exact up to float rounding; quartiles and
+    median come from the quantile sketch and are exact until it first compacts.
+
+    Args:
+        file_buffer: A seekable file-like object containing the CSV data.
+        chunksize: Number of rows parsed per chunk.
+
+    Returns:
+        A dictionary with the same schema as ``generate_summary_statistics``.
+    """
+    profile = StreamProfile()
+    for chunk in _read_chunks(file_buffer, chunksize):
+        profile.update(chunk)
+
+    numeric_cols, moments, params, numeric_stats = profile.numeric_summary()
+
+    # Pass 2: outliers per detector and re-parsing of mixed-type columns as text
+    outlier_idx = [
+        idx for idx in range(len(numeric_cols))
+        if could_have_outliers(params, moments["min"][idx], moments["max"][idx], idx)
+    ]
+    mixed_cols = profile.mixed_columns()
+    if outlier_idx or mixed_cols:
+        scan = OutlierScan([numeric_cols[idx] for idx in outlier_idx], select_columns(params, outlier_idx))
+        rescan(file_buffer, chunksize, profile, scan, mixed_cols)
+        scan.finish(numeric_stats, profile.accumulators)
+    return profile.summary(numeric_stats)
+
+
+def rescan(file_buffer: io.BytesIO, chunksize: int, profile: StreamProfile, scan: OutlierScan, mixed_cols: list,
+           start: int = 0, offset: int = 0, names: list | None = None) -> None:
+    """
+    Pass 2 over the file (or, from byte ``start`` with header-less ``names``, over its tail
+    whose first row is at position ``offset``): feeds ``scan`` and re-reads ``mixed_cols``
+    as text.
+    """
+    profile.reset_text(mixed_cols)
+    usecols = scan.columns + mixed_cols
+    if not usecols:
+        return
+    header = {"header": None, "names": names} if names is not None else {}
+    chunks = _read_chunks(file_buffer, chunksize, start, usecols=usecols, dtype={col: str for col in mixed_cols}, **header)
+    for chunk in chunks:
+        for col in mixed_cols:
+            profile.accumulators[col].update_text(chunk[col])
+        if scan.columns:
+            scan.update(chunk, offset)
+        offset += len(chunk)
+
+
+def _is_numeric_dtype(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _numeric_moments(accs: list) -> dict:
+    """Per-column statistics of the numeric accumulators as arrays (the detectors' input)."""
+    quantiles = np.array([acc.sketch.quantiles([0.25, 0.5, 0.75]) for acc in accs]).reshape(-1, 3).T
+    return {
+        "mean": np.array([acc.mean if acc.count else np.nan for acc in accs], dtype=np.float64),
+        "std": np.array([acc.std for acc in accs], dtype=np.float64),
+        "min": np.array([acc.min for acc in accs], dtype=np.float64),
+        "max": np.array([acc.max for acc in accs], dtype=np.float64),
+        "25%": quantiles[0],
+        "median": quantiles[1],
+        "75%": quantiles[2],
+        "mad": np.array([
+            acc.sketch.median_absolute_deviation(median) for acc, median in zip(accs, quantiles[1])
+        ], dtype=np.float64),
+    }
+
+
+def _numeric_column_stats(moments: dict, params: dict, idx: int) -> dict:
+    col_stats = {
+        "mean": float(moments["mean"][idx]),
+        "median": float(moments["median"][idx]),
+        "std_dev": float(moments["std"][idx]),
+        "min": float(moments["min"][idx]),
+        "max": float(moments["max"][idx]),
+        "25_percentile": float(moments["25%"][idx]),
+        "75_percentile": float(moments["75%"][idx]),
+    }
+
+    # Simple trend indicator: change from min to max
+    if not pd.isna(col_stats["min"]) and not pd.isna(col_stats["max"]):
+        col_stats["trend_indicator_min_max_delta"] = col_stats["max"] - col_stats["min"]
+        if col_stats["min"] != 0:
+            col_stats["trend_indicator_min_max_percentage"] = (col_stats["max"] - col_stats["min"]) / col_stats["min"] * 100
+
+    # Filled in by pass 2 for columns whose range crosses a detector's fences
+    for name, (_, _, _, applicable) in params.items():
+        if applicable[idx]:
+            col_stats[f"anomaly_detection_{name}_outliers_count"] = 0
+            col_stats[f"anomaly_detection_{name}_outliers_examples"] = []
+            col_stats[f"anomaly_detection_{name}_outliers_rows"] = []
+    return col_stats
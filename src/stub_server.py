@@ -0,0 +1,359 @@
+"""
+Local OpenAI-compatible model server for offline load tests and CI.
+
+Serves ``POST /v1/chat/completions`` (plain and streamed) with canned answers after a
+configurable latency, so the real client stack (AsyncOpenAI + the Agents SDK, the rate
+limiter and retries) runs end to end without a provider:
+
+    python -m src.stub_server --port 8089 --latency lognormal:0.8,0.4 --error-rate 0.05
+    AGENT_BASE_URL=http://127.0.0.1:8089/v1/ streamlit run app.py
+
+    GET  /v1/models   the served model
+    GET  /stats       request, 429 and token counters; concurrency high-water mark
+    POST /stats/reset
+
+Latency specs (seconds, time to the first token): ``fixed:0.5``, ``uniform:0.2,1.0``,
+``normal:0.6,0.1``, ``lognormal:0.6,0.5`` (median, sigma) or ``exponential:0.5`` (mean).
+Streamed answers then emit one token every ``token_latency`` seconds; plain answers wait
+for the whole answer. Injected 429s (``error_rate``, or any request over ``rpm`` in the
+last minute) carry a Retry-After header. Tokens are counted like the engine estimates
+them (4 characters per token).
+
+Requests with a JSON schema ``response_format`` (structured output) get a JSON object
+filling each of the schema's properties with the canned text. A simulated prefix cache
+reports ``prompt_tokens_details.cached_tokens``: the whole blocks of ``prefix_cache_tokens``
+tokens at the start of the prompt (system message first) that an earlier prompt also
+started with.
+"""
+import argparse
+import asyncio
+import collections
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from src.context_builder import estimate_tokens
+
+DEFAULT_PORT = 8089
+DEFAULT_MODEL = "stub-model"
+DEFAULT_PREFIX_CACHE_TOKENS = 256
+# Cached prefix blocks kept before the simulated cache starts over
+_MAX_CACHED_PREFIXES = 100_000
+_WORDS = (
+    "Revenue", "grew", "steadily", "while", "costs", "held", "flat;", "the", "Austin", "branch",
+    "shows", "unusual", "spikes", "worth", "reviewing", "before", "next", "quarter.",
+)
+
+
+def parse_latency(spec: str, rng: random.Random | None = None):
+    """
+    A sampler (no-argument callable returning seconds >= 0) for a latency spec such as
+    ``lognormal:0.6,0.5``.
+
+    Raises:
+        ValueError: For unknown distributions or malformed parameters.
+    """
+    rng = rng or random.Random()
+    kind, _, params = spec.partition(":")
+    try:
+        args = [float(value) for value in params.split(",")] if params else []
+    except ValueError:
+        raise ValueError(f"Malformed latency parameters: {spec!r}") from None
+    distributions = {
+        "fixed": (1, lambda value: value),
+        "uniform": (2, rng.uniform),
+        "normal": (2, rng.gauss),
+        "lognormal": (2, lambda median, sigma: rng.lognormvariate(math.log(median), sigma)),
+        "exponential": (1, lambda mean: rng.expovariate(1 / mean)),
+    }
+    if kind not in distributions:
+        raise ValueError(f"Unknown latency distribution {kind!r}. Choose one of {sorted(distributions)}.")
+    arity, sample = distributions[kind]
+    if len(args) != arity:
+        raise ValueError(f"{kind} latency takes {arity} parameter(s): {spec!r}")
+    return lambda: max(0.0, sample(*args))
+
+
+class StubModel:
+    """
+    Answers, delays, injected failures and counters behind the stub endpoints.
+    """
+
+    def __init__(self, latency: str = "fixed:0.05", token_latency: float = 0.0, completion_tokens: int = 40,
+                 error_rate: float = 0.0, rpm: float | None = None, retry_after: float = 1.0,
+                 model: str = DEFAULT_MODEL, seed: int | None = None,
+                 prefix_cache_tokens: int = DEFAULT_PREFIX_CACHE_TOKENS):
+        self.rng = random.Random(seed)
+        self.latency = parse_latency(latency, self.rng)
+        self.token_latency = token_latency
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.model = model
+        self.prefix_cache_tokens = prefix_cache_tokens
+        self.in_flight = 0
+        self.counters = collections.Counter()
+        self._recent = collections.deque()
+        self._prefixes = set()
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self._recent.clear()
+        self._prefixes.clear()
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "in_flight": self.in_flight,
+            **{key: self.counters[key] for key in (
+                "requests", "streamed", "rate_limited", "completed", "max_in_flight",
+                "prompt_tokens", "cached_tokens", "completion_tokens",
+            )},
+        }
+
+    def rate_limited(self) -> bool:
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 60:
+            self._recent.popleft()
+        if self.rpm is not None and len(self._recent) >= self.rpm:
+            return True
+        if self.rng.random() < self.error_rate:
+            return True
+        self._recent.append(now)
+        return False
+
+    def answer(self, schema: dict | None = None) -> list:
+        """
+        The answer's tokens (words with their separating space). With a JSON ``schema``, the
+        JSON object's words: ``completion_tokens`` per property.
+        """
+        words = [("" if i == 0 else " ") + _WORDS[i % len(_WORDS)] for i in range(self.completion_tokens)]
+        if schema is None:
+            return words
+        text = json.dumps({name: "".join(words) for name in schema.get("properties", {})})
+        return [("" if i == 0 else " ") + word for i, word in enumerate(text.split(" "))]
+
+    def cached_tokens(self, prompt: str) -> int:
+        """
+        Prompt tokens the simulated prefix cache serves, then caches this prompt's blocks.
+        """
+        if not self.prefix_cache_tokens:
+            return 0
+        if len(self._prefixes) > _MAX_CACHED_PREFIXES:
+            self._prefixes.clear()
+        block = self.prefix_cache_tokens * 4
+        digest = hashlib.sha256()
+        cached, hit = 0, True
+        for end in range(block, len(prompt) + 1, block):
+            # Each key covers the whole prefix up to the end of its block
+            digest.update(prompt[end - block:end].encode("utf-8"))
+            key = digest.hexdigest()
+            hit = hit and key in self._prefixes
+            if hit:
+                cached += self.prefix_cache_tokens
+            self._prefixes.add(key)
+        return cached
+
+
+def _prompt_text(payload: dict) -> str:
+    text = ""
+    for message in payload.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        text += content or ""
+    return text
+
+
+def _response_schema(payload: dict) -> dict | None:
+    response_format = payload.get("response_format") or {}
+    if response_format.get("type") != "json_schema":
+        return None
+    return response_format.get("json_schema", {}).get("schema", {})
+
+
+def create_app(stub: StubModel | None = None) -> Starlette:
+    """
+    Builds the stub server around ``stub`` (a default StubModel if None).
+    """
+    stub = stub or StubModel()
+
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        stub.counters["requests"] += 1
+        if stub.rate_limited():
+            stub.counters["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Resource exhausted (stub)", "type": "rate_limit_exceeded", "code": 429}},
+                status_code=429, headers={"Retry-After": str(stub.retry_after)},
+            )
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = payload.get("model") or stub.model
+        tokens = stub.answer(_response_schema(payload))
+        prompt = _prompt_text(payload)
+        prompt_tokens = estimate_tokens(prompt)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+            "prompt_tokens_details": {"cached_tokens": stub.cached_tokens(prompt)},
+        }
+        stub.in_flight += 1
+        stub.counters["max_in_flight"] = max(stub.counters["max_in_flight"], stub.in_flight)
+
+        def finish() -> None:
+            stub.in_flight -= 1
+            stub.counters["completed"] += 1
+            stub.counters["prompt_tokens"] += usage["prompt_tokens"]
+            stub.counters["cached_tokens"] += usage["prompt_tokens_details"]["cached_tokens"]
+            stub.counters["completion_tokens"] += usage["completion_tokens"]
+
+        if not payload.get("stream"):
+            try:
+                await asyncio.sleep(stub.latency() + stub.token_latency * len(tokens))
+            finally:
+                finish()
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        stub.counters["streamed"] += 1
+        include_usage = (payload.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta: dict, finish_reason: str | None = None) -> str:
+            body = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(body)}\n\n"
+
+        async def events():
+            try:
+                await asyncio.sleep(stub.latency())
+                for i, token in enumerate(tokens):
+                    if i and stub.token_latency:
+                        await asyncio.sleep(stub.token_latency)
+                    yield chunk({"role": "assistant", "content": token} if i == 0 else {"content": token})
+                yield chunk({}, "stop")
+                if include_usage:
+                    body = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                            "model": model, "choices": [], "usage": usage}
+                    yield f"data: {json.dumps(body)}\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                finish()
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def models(request: Request) -> JSONResponse:
+        return JSONResponse({"object": "list", "data": [{"id": stub.model, "object": "model", "owned_by": "stub"}]})
+
+    async def stats(request: Request) -> JSONResponse:
+        return JSONResponse(stub.stats())
+
+    async def reset(request: Request) -> JSONResponse:
+        stub.reset()
+        return JSONResponse(stub.stats())
+
+    app = Starlette(routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/v1/models", models),
+        Route("/stats", stats),
+        Route("/stats/reset", reset, methods=["POST"]),
+    ])
+    app.state.stub = stub
+    return app
+
+
+class BackgroundServer:
+    """
+    The stub server on a daemon thread (for tests and the load harness). Port 0 picks a
+    free port; ``base_url`` is what AGENT_BASE_URL should be set to.
+    """
+
+    def __init__(self, stub: StubModel | None = None, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+
+        self.stub = stub or StubModel()
+        self.server = uvicorn.Server(uvicorn.Config(create_app(self.stub), host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, name="stub-model-server", daemon=True)
+        self.host = host
+        self.port = port
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1/"
+
+    def start(self, timeout: float = 10.0) -> "BackgroundServer":
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Stub model server failed to start")
+            time.sleep(0.01)
+        self.port = self.server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+
+def main(argv: list | None = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", default="fixed:0.05", help="Time to first token, e.g. lognormal:0.6,0.5")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between streamed tokens")
+    parser.add_argument("--completion-tokens", type=int, default=40)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--rpm", type=float, default=None, help="Answer 429 above this many requests per minute")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--prefix-cache-tokens", type=int, default=DEFAULT_PREFIX_CACHE_TOKENS,
+                        help="Block size of the simulated prefix cache (0 to disable)")
+    args = parser.parse_args(argv)
+
+    stub = StubModel(
+        latency=args.latency, token_latency=args.token_latency, completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate, rpm=args.rpm, retry_after=args.retry_after, seed=args.seed,
+        prefix_cache_tokens=args.prefix_cache_tokens,
+    )
+    uvicorn.run(create_app(stub), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Per-stage latency and memory spans for the report pipeline (upload, parse, stats, context
+building, JSON serialization, model round trip, rendering).
+
+    with telemetry.span("parse_csv", bytes=size) as stage:
+        df = pd.read_csv(buffer)
+        stage.set(rows=len(df))
+
+Each span records wall time, the growth of the process's peak RSS while it ran and any
+attributes set on it (rows, bytes, prompt_chars, ...). Spans are aggregated per stage in
+``recorder`` (exported as JSON or Prometheus text) and, with TELEMETRY_LOG set, appended to
+that file as JSON lines ("-" for stderr).
+
+Disabled unless TELEMETRY=1: ``span`` then returns a shared no-op, so instrumented code
+pays one global lookup per stage.
+"""
+import collections
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENABLED = os.getenv("TELEMETRY", "") not in ("", "0")
+LOG_PATH = os.getenv("TELEMETRY_LOG") or None
+RECENT_SPANS = 200
+
+# Attributes summed per stage in the aggregates (others only appear on individual spans)
+COUNTED_ATTRS = ("rows", "bytes", "columns", "prompt_chars", "tokens", "input_tokens", "output_tokens",
+                 "cached_tokens")
+
+# ru_maxrss is in kilobytes on Linux and bytes on macOS
+_MAXRSS_SCALE = 1 if sys.platform == "darwin" else 1024
+
+_current = contextvars.ContextVar("telemetry_span", default=None)
+
+
+def peak_rss_bytes() -> int:
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_SCALE
+
+
+class Span:
+    """
+    One timed stage. The peak RSS delta is process-wide: concurrent stages on other
+    threads contribute to it too.
+    """
+    __slots__ = ("name", "attrs", "parent", "seconds", "peak_rss_delta_bytes", "error",
+                 "_started", "_rss_before", "_token")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.seconds = None
+        self.peak_rss_delta_bytes = 0
+        self.error = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        parent = _current.get()
+        self.parent = parent.name if parent is not None else None
+        self._token = _current.set(self)
+        self._rss_before = peak_rss_bytes()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._started
+        self.peak_rss_delta_bytes = peak_rss_bytes() - self._rss_before
+        # Cancellation and generator close (BaseException) are not failures
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.error = exc_type.__name__
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited in another context (e.g. an async generator finalized elsewhere)
+            pass
+        recorder.record(self)
+        return False
+
+    def as_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "parent": self.parent,
+            "seconds": round(self.seconds, 6) if self.seconds is not None else None,
+            "peak_rss_delta_bytes": self.peak_rss_delta_bytes,
+            "error": self.error,
+            **self.attrs,
+        }
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Recorder:
+    """
+    Thread-safe per-stage aggregates plus a window of the most recent spans.
+    """
+
+    def __init__(self, recent: int = RECENT_SPANS, log_path: str | None = LOG_PATH):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._recent = collections.deque(maxlen=recent)
+
+    def record(self, span: Span) -> None:
+        line = span.as_dict()
+        with self._lock:
+            stage = self._stages.get(span.name)
+            if stage is None:
+                stage = self._stages[span.name] = collections.Counter(seconds_max=0.0, peak_rss_delta_max_bytes=0)
+            stage["count"] += 1
+            stage["seconds_sum"] += span.seconds
+            stage["seconds_max"] = max(stage["seconds_max"], span.seconds)
+            stage["peak_rss_delta_max_bytes"] = max(stage["peak_rss_delta_max_bytes"], span.peak_rss_delta_bytes)
+            if span.error:
+                stage["errors"] += 1
+            for attr in COUNTED_ATTRS:
+                value = span.attrs.get(attr)
+                if isinstance(value, (int, float)):
+                    stage[f"{attr}_total"] += value
+            self._recent.append(line)
+            if self.log_path:
+                self._write(line)
+
+    def _write(self, line: dict) -> None:
+        text = json.dumps({"ts": round(time.time(), 3), **line}, default=str) + "\n"
+        if self.log_path == "-":
+            sys.stderr.write(text)
+            return
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def stages(self) -> dict:
+        """Aggregates per stage: count, seconds_sum/max/mean, peak RSS delta max, totals."""
+        with self._lock:
+            stages = {name: dict(stage) for name, stage in self._stages.items()}
+        for stage in stages.values():
+            stage["seconds_mean"] = stage["seconds_sum"] / stage["count"]
+            for key in ("seconds_sum", "seconds_max", "seconds_mean"):
+                stage[key] = round(stage[key], 6)
+        return stages
+
+    def recent(self, limit: int | None = None) -> list:
+        with self._lock:
+            spans = list(self._recent)
+        return spans[-limit:] if limit else spans
+
+    def snapshot(self) -> dict:
+        return {"enabled": ENABLED, "stages": self.stages(), "recent": self.recent(20)}
+
+    def prometheus(self, prefix: str = "report") -> str:
+        """Aggregates in the Prometheus text exposition format (version 0.0.4)."""
+        stages = self.stages()
+        metrics = [
+            ("stage_seconds", "summary", "Wall time per pipeline stage", None),
+            ("stage_seconds_max", "gauge", "Slowest run of each stage", "seconds_max"),
+            ("stage_peak_rss_delta_bytes_max", "gauge", "Largest peak RSS growth during a stage",
+             "peak_rss_delta_max_bytes"),
+            ("stage_errors_total", "counter", "Stage runs that raised", "errors"),
+        ] + [
+            (f"stage_{attr}_total", "counter", f"Sum of {attr} processed per stage", f"{attr}_total")
+            for attr in COUNTED_ATTRS
+        ]
+        lines = []
+        for metric, kind, help_text, field in metrics:
+            name = f"{prefix}_{metric}"
+            samples = []
+            for stage, values in sorted(stages.items()):
+                label = '{stage="%s"}' % stage.replace("\\", "\\\\").replace('"', '\\"')
+                if field is None:
+                    samples.append(f"{name}_sum{label} {values['seconds_sum']}")
+                    samples.append(f"{name}_count{label} {values['count']}")
+                elif field in values or field == "errors":
+                    samples.append(f"{name}{label} {values.get(field, 0)}")
+            if samples:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", *samples]
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._recent.clear()
+
+
+recorder = Recorder()
+
+
+def enabled() -> bool:
+    return ENABLED
+
+
+def enable(flag: bool = True) -> None:
+    global ENABLED
+    ENABLED = flag
+
+
+def span(name: str, **attrs):
+    """
+    Context manager timing one stage; ``set`` on the returned span adds attributes
+    discovered while it runs (e.g. rows parsed).
+    """
+    if not ENABLED:
+        return _NOOP
+    return Span(name, attrs)
@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+
+from src.ingest import detect_date_format
+
+# Candidate bucket sizes, finest first, with their nominal length
+FREQUENCIES = (
+    ("h", pd.Timedelta(hours=1)),
+    ("D", pd.Timedelta(days=1)),
+    ("W", pd.Timedelta(weeks=1)),
+    ("MS", pd.Timedelta(days=30.44)),
+    ("QS", pd.Timedelta(days=91.31)),
+    ("YS", pd.Timedelta(days=365.25)),
+)
+# Rolling window (in buckets) per bucket size: a day of hours, a week of days, ...
+ROLLING_WINDOWS = {"h": 24, "D": 7, "W": 4, "MS": 3, "QS": 4, "YS": 3}
+MAX_BUCKETS = 400
+# Fitted change over the whole range (as % of the mean) below which a series is "Stable"
+STABLE_CHANGE_PCT = 5.0
+
+# Rows are first summed into hourly buckets; the reporting frequency is picked at the end
+_BASE_FREQ = "h"
+_DETECTION_ROWS = 1000
+
+
+def find_time_column(df: pd.DataFrame) -> tuple[str, str | None] | None:
+    """
+    Returns the first datetime column (and the text format it was parsed with, if any),
+    or None. Columns already typed as datetime64 count, and so do text columns whose
+    leading values are ISO dates/timestamps (see src.ingest.DATE_FORMATS).
+    """
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return col, None
+        if pd.api.types.is_string_dtype(series.dtype) or series.dtype == object:
+            # A leading sample is enough: rows that do not parse are skipped when bucketing
+            head = series.head(_DETECTION_ROWS)
+            if pd.api.types.infer_dtype(head, skipna=True) == "string":
+                fmt = detect_date_format(head)
+                if fmt:
+                    return col, fmt
+    return None
+
+
+class TimeBuckets:
+    """
+    Mergeable per-bucket sums and counts of the numeric columns along one time column.
+
+    Rows are folded into hourly buckets (only occupied ones are stored), so the state is
+    bounded by the number of distinct hours in the data rather than by the row count, and
+    chunks of a streamed file can be added one at a time.
+    """
+
+    def __init__(self, time_column: str, date_format: str | None = None):
+        self.time_column = time_column
+        self.date_format = date_format
+        self.sums = None
+        self.counts = None
+
+    def update(self, df: pd.DataFrame) -> None:
+        times = df[self.time_column]
+        if not pd.api.types.is_datetime64_any_dtype(times.dtype):
+            times = pd.to_datetime(times, format=self.date_format, errors="coerce")
+        if times.dt.tz is not None:
+            times = times.dt.tz_localize(None)
+        numeric = df.select_dtypes(include=np.number)
+        keep = times.notna().to_numpy()
+        if not keep.any() or numeric.empty:
+            return
+
+        grouped = numeric[keep].groupby(times[keep].dt.floor(_BASE_FREQ).rename(None))
+        self._add(grouped.sum().astype(np.float64), grouped.count())
+
+    def merge(self, other: "TimeBuckets") -> None:
+        if other.sums is not None:
+            self._add(other.sums, other.counts)
+
+    def _add(self, sums: pd.DataFrame, counts: pd.DataFrame) -> None:
+        if self.sums is None:
+            self.sums, self.counts = sums, counts
+            return
+        self.sums = pd.concat([self.sums, sums]).groupby(level=0).sum()
+        self.counts = pd.concat([self.counts, counts]).groupby(level=0).sum()
+
+    def summary(self, columns) -> dict | None:
+        """
+        The ``time_series`` section for ``columns`` (numeric column names), or None if
+        fewer than two buckets have data.
+        """
+        if self.sums is None:
+            return None
+        columns = [col for col in columns if col in self.sums.columns]
+        sums = self.sums[columns].sort_index()
+        counts = self.counts[columns].sort_index()
+        freq = choose_frequency(sums.index)
+        sums = sums.resample(freq).sum()
+        counts = counts.resample(freq).sum()
+        if len(sums) < 2 or not columns:
+            return None
+
+        # Bucket means: empty buckets are NaN and are ignored by the fits below
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums.to_numpy() / counts.to_numpy()
+        window = min(ROLLING_WINDOWS[freq], len(means))
+        stats = trend_statistics(means, window)
+
+        label = "%Y-%m-%d %H:%M" if freq == "h" else "%Y-%m-%d"
+        per_column = {}
+        for idx, col in enumerate(columns):
+            if stats["valid_buckets"][idx] < 2:
+                continue
+            metrics = {
+                "slope_per_period": stats["slope"][idx],
+                "slope_pct_of_mean": stats["slope_pct"][idx],
+                "r_squared": stats["r_squared"][idx],
+                "direction": stats["direction"][idx],
+                "last_period_growth_pct": stats["last_growth_pct"][idx],
+                "first_to_last_growth_pct": stats["total_growth_pct"][idx],
+                "rolling_mean_last": stats["rolling_mean"][idx],
+                "rolling_std_last": stats["rolling_std"][idx],
+                "rolling_mean_change_pct": stats["rolling_change_pct"][idx],
+            }
+            # Undefined metrics (zero baselines, too few buckets for a second window) are left out
+            per_column[col] = {
+                key: value if isinstance(value, str) else float(value)
+                for key, value in metrics.items() if isinstance(value, str) or not np.isnan(value)
+            }
+        if not per_column:
+            return None
+        return {
+            "time_column": self.time_column,
+            "frequency": freq,
+            "start": sums.index[0].strftime(label),
+            "end": sums.index[-1].strftime(label),
+            "periods": len(sums),
+            "rolling_window": window,
+            "columns": per_column,
+        }
+
+
+def choose_frequency(bucket_times: pd.DatetimeIndex) -> str:
+    """
+    The finest bucket size that is no finer than the data's typical spacing and yields at
+    most MAX_BUCKETS buckets over its span.
+    """
+    values = bucket_times.asi8
+    span = pd.Timedelta(int(values[-1] - values[0]), unit=bucket_times.unit) if len(values) else pd.Timedelta(0)
+    steps = np.diff(values)
+    step = pd.Timedelta(int(np.median(steps)), unit=bucket_times.unit) if len(steps) else pd.Timedelta(0)
+    for freq, length in FREQUENCIES:
+        if length >= step * 0.9 and span / length < MAX_BUCKETS:
+            return freq
+    return FREQUENCIES[-1][0]
+
+
+def _pct(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(denominator != 0, numerator / np.abs(denominator) * 100, np.nan)
+
+
+def trend_statistics(means: np.ndarray, window: int) -> dict:
+    """
+    Batched trend kernel over a (buckets, columns) matrix of bucket means (NaN = no data).
+
+    Fits an OLS line per column against the bucket index, and computes period-over-period
+    growth between the last two non-empty buckets, first-to-last growth and rolling-window
+    mean/std, all as whole-matrix NumPy operations.
+    """
+    n_buckets, n_cols = means.shape
+    valid = ~np.isnan(means)
+    n = valid.sum(axis=0)
+    x = np.arange(n_buckets, dtype=np.float64)[:, None]
+    y = np.where(valid, means, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # OLS slope and R^2 with per-column masks
+        x_mean = (x * valid).sum(axis=0) / n
+        y_mean = y.sum(axis=0) / n
+        dx = np.where(valid, x - x_mean, 0.0)
+        dy = np.where(valid, y - y_mean, 0.0)
+        sxx = (dx * dx).sum(axis=0)
+        sxy = (dx * dy).sum(axis=0)
+        syy = (dy * dy).sum(axis=0)
+        slope = sxy / sxx
+        r_squared = np.where(syy > 0, sxy * sxy / (sxx * syy), 0.0)
+
+    # Positions of the first, last and second-to-last non-empty bucket per column
+    cols = np.arange(n_cols)
+    order = np.cumsum(valid, axis=0)
+    first = valid.argmax(axis=0)
+    last = n_buckets - 1 - valid[::-1].argmax(axis=0)
+    previous = np.clip((order == (n - 1)[None, :]).argmax(axis=0), 0, None)
+    first_value, last_value = means[first, cols], means[last, cols]
+    previous_value = np.where(n >= 2, means[previous, cols], np.nan)
+
+    rolling = pd.DataFrame(means).rolling(window, min_periods=1)
+    rolling_mean = rolling.mean().to_numpy()
+    rolling_std = rolling.std().to_numpy()
+    # Compare with the rolling window that ended one full window earlier (if there is one)
+    earlier = n_buckets - 1 - window
+
+    fitted_change_pct = _pct(slope * (n_buckets - 1), y_mean)
+    # A zero mean (or a single bucket) leaves no relative change: flat is Stable, otherwise no direction
+    direction = np.select(
+        [
+            np.isnan(fitted_change_pct) & (slope == 0),
+            np.isnan(fitted_change_pct),
+            np.abs(fitted_change_pct) < STABLE_CHANGE_PCT,
+            fitted_change_pct > 0,
+        ],
+        ["Stable", None, "Stable", "Growth"],
+        default="Decline",
+    )
+    return {
+        "valid_buckets": n,
+        "slope": slope,
+        "slope_pct": _pct(slope, y_mean),
+        "r_squared": r_squared,
+        "direction": direction.tolist(),
+        "last_growth_pct": _pct(last_value - previous_value, previous_value),
+        "total_growth_pct": _pct(last_value - first_value, first_value),
+        "rolling_mean": rolling_mean[-1],
+        "rolling_std": rolling_std[-1],
+        "rolling_change_pct": (
+            _pct(rolling_mean[-1] - rolling_mean[earlier], rolling_mean[earlier]) if earlier >= 0
+            else np.full(n_cols, np.nan)
+        ),
+    }
@@ -0,0 +1,171 @@
+"""
+Upload buffers that avoid holding extra copies of large files in memory.
+
+Small uploads are profiled straight from the buffer they arrived in (Streamlit's
+UploadedFile is already a BytesIO; hashing reads it through a memoryview). Uploads above
+SPILL_THRESHOLD_BYTES are copied block by block to a temp file and parsed through a
+read-only memory map, so their pages come from the OS page cache and can be dropped under
+memory pressure instead of living on the Python heap.
+
+Spilled files are deleted as soon as the upload is closed (``with open_upload(...)``), or
+when the Upload is garbage collected if it never was. Files left behind by a crashed
+process are swept on the next ``remove_stale_spills`` after SPILL_MAX_AGE_SECONDS.
+"""
+import glob
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import time
+import weakref
+
+SPILL_THRESHOLD_BYTES = int(os.getenv("UPLOAD_SPILL_THRESHOLD_MB", "50")) * 1024 * 1024
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None  # None = the system temp dir
+SPILL_PREFIX = "upload-"
+SPILL_MAX_AGE_SECONDS = 24 * 3600
+
+_COPY_BLOCK_BYTES = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """The upload exceeded the caller's size limit while it was being received."""
+
+
+def _release(buffer, path: str) -> None:
+    buffer.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class Upload:
+    """
+    A received upload as a seekable, read-only ``buffer``: the original in-memory buffer, or
+    a memory map of the temp file it was spilled to (``path``).
+    """
+
+    def __init__(self, buffer, size: int, path: str | None = None):
+        self.buffer = buffer
+        self.size = size
+        self.path = path
+        # Runs once: on close(), or at garbage collection / interpreter exit otherwise
+        self._finalizer = weakref.finalize(self, _release, buffer, path) if path else None
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def close(self) -> None:
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _spill_file():
+    return tempfile.NamedTemporaryFile(prefix=SPILL_PREFIX, dir=UPLOAD_TMP_DIR, delete=False)
+
+
+def _mapped(f) -> Upload:
+    """Maps a spill file that has been fully written; the file object is closed."""
+    f.flush()
+    size = f.tell()
+    if size == 0:
+        # mmap cannot map empty files
+        f.close()
+        os.remove(f.name)
+        return Upload(io.BytesIO(), 0)
+    try:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        f.close()
+        os.remove(f.name)
+        raise
+    f.close()  # the map keeps its own handle
+    return Upload(buffer, size, f.name)
+
+
+def spill(fileobj) -> Upload:
+    """
+    Copies a readable file-like object to a memory-mapped temp file, in fixed-size blocks.
+    """
+    f = _spill_file()
+    try:
+        fileobj.seek(0)
+        shutil.copyfileobj(fileobj, f, _COPY_BLOCK_BYTES)
+    except BaseException:
+        f.close()
+        os.remove(f.name)
+        raise
+    return _mapped(f)
+
+
+def open_upload(uploaded_file, threshold: int | None = None) -> Upload:
+    """
+    Wraps an in-memory upload (e.g. Streamlit's UploadedFile) for profiling: used as is up
+    to ``threshold`` bytes (default SPILL_THRESHOLD_BYTES), spilled to a memory-mapped
+    temp file above it.
+
+    Use as a context manager so spilled files are removed once profiling is done.
+    """
+    threshold = SPILL_THRESHOLD_BYTES if threshold is None else threshold
+    size = getattr(uploaded_file, "size", None)
+    if size is None:
+        size = uploaded_file.getbuffer().nbytes
+    if size <= threshold:
+        uploaded_file.seek(0)
+        return Upload(uploaded_file, size)
+    return spill(uploaded_file)
+
+
+async def receive(chunks, max_bytes: int, threshold: int | None = None) -> Upload:
+    """
+    Collects an async iterator of byte chunks (e.g. Starlette's ``request.stream()``):
+    in memory up to ``threshold`` bytes (default SPILL_THRESHOLD_BYTES), then spilled to a
+    memory-mapped temp file.
+
+    Raises:
+        UploadTooLargeError: Once more than ``max_bytes`` have arrived.
+    """
+    threshold = SPILL_THRESHOLD_BYTES if threshold is None else threshold
+    memory, size, f = io.BytesIO(), 0, None
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+            if f is None and size > threshold:
+                f = _spill_file()
+                f.write(memory.getbuffer())
+                memory = None
+            (memory if f is None else f).write(chunk)
+    except BaseException:
+        if f is not None:
+            f.close()
+            os.remove(f.name)
+        raise
+    if f is None:
+        memory.seek(0)
+        return Upload(memory, size)
+    return _mapped(f)
+
+
+def remove_stale_spills(max_age: float = SPILL_MAX_AGE_SECONDS) -> int:
+    """Deletes spill files older than ``max_age`` seconds (left by crashed processes)."""
+    removed = 0
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(UPLOAD_TMP_DIR or tempfile.gettempdir(), f"{SPILL_PREFIX}*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
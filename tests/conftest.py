@@ -0,0 +1,5 @@
+import os
+
+# agent_engine reads the key at import and builds its client from it when the SDK is first
+# loaded; give it a dummy key for offline tests
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
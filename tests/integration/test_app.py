@@ -1,100 +1,145 @@
+import threading
+
 import pytest
-from unittest.mock import patch, MagicMock
+from pathlib import Path
+from unittest.mock import patch
 from streamlit.testing.v1 import AppTest
 
-# Mocking the external dependencies
-@pytest.fixture(autouse=True)
-def mock_dependencies():
-    with patch('ai_report_generator.src.data_processor.process_csv') as mock_process_csv, \
-         patch('ai_report_generator.src.agent_engine.get_ai_insight') as mock_get_ai_insight:
-        
-        # Configure mock_process_csv to return a sample stats dictionary
-        mock_process_csv.return_value = {
-            "overall_summary": {"row_count": 5, "column_count": 2},
-            "numeric_columns": {"sales": {"mean": 100.0}},
-            "non_numeric_columns": {}
-        }
-        
-        # Configure mock_get_ai_insight to return specific responses based on insight_type
-        mock_get_ai_insight.side_effect = lambda stats, insight_type: f"Mocked {insight_type} Insight"
+from src.agent_engine import QuotaExceededError
 
-        yield mock_process_csv, mock_get_ai_insight
-
-def test_app_initial_state():
-    at = AppTest.from_file("ai_report_generator/app.py")
-    at.run()
-    
-    assert at.title[0].value == "AI Workflow & Report Generator"
-    assert at.file_uploader[0].label == "Upload your CSV file"
-    assert at.info[0].value == "Please upload a CSV file to get started."
+APP = str(Path(__file__).resolve().parents[2] / "app.py")
+CSV = b"col1,col2\n1,10\n2,20"
+STATS = {
+    "overall_summary": {"row_count": 5, "column_count": 2, "missing_values_summary": {"col1": 0, "col2": 0}},
+    "numeric_columns": {"sales": {"mean": 100.0}},
+    "non_numeric_columns": {},
+}
 
-def test_app_upload_and_process_csv(mock_dependencies):
-    at = AppTest.from_file("ai_report_generator/app.py")
-    at.run()
-
-    # Simulate file upload
-    csv_content = "col1,col2\n1,10\n2,20"
-    at.file_uploader[0].upload(csv_content.encode('utf-8'), "test.csv", "text/csv")
-    at.run() # Rerun app after upload
-
-    assert at.success[0].value == "CSV file processed successfully!"
-    assert at.subheader[0].value == "Generate AI Insights"
-    mock_dependencies[0].assert_called_once() # Verify process_csv was called
-
-def test_app_trends_button_click(mock_dependencies):
-    at = AppTest.from_file("ai_report_generator/app.py")
-    at.run()
+# Mocking the external dependencies (app.py imports them by name on every script run)
+@pytest.fixture(autouse=True)
+def mock_dependencies():
+    with patch('src.data_processor.process_csv_cached') as mock_process_csv, \
+         patch('src.agent_engine.iter_ai_insight') as mock_iter_ai_insight:
 
-    # Simulate file upload
-    csv_content = "col1,col2\n1,10\n2,20"
-    at.file_uploader[0].upload(csv_content.encode('utf-8'), "test.csv", "text/csv")
-    at.run()
+        # Configure mock_process_csv to return a sample stats dictionary
+        mock_process_csv.return_value = STATS
 
-    # Click the "Trends" button
-    at.button[0].click().run() # Assuming "📈 Get Trends" is the first button
+        # Stream each insight in two deltas
+        mock_iter_ai_insight.side_effect = lambda stats, insight_type: iter(["Mocked ", f"{insight_type} Insight"])
 
-    assert at.markdown[0].value == "### Trends Insight"
-    assert at.write[1].value == "Mocked Trends Insight"
-    mock_dependencies[1].assert_called_with(mock_dependencies[0].return_value, "Trends")
+        yield mock_process_csv, mock_iter_ai_insight
 
-def test_app_anomalies_button_click(mock_dependencies):
-    at = AppTest.from_file("ai_report_generator/app.py")
+def uploaded_app(filename="test.csv", content=CSV):
+    at = AppTest.from_file(APP, default_timeout=30)
     at.run()
+    at.sidebar.file_uploader[0].upload(filename, content, "text/csv")
+    return at.run()
 
-    csv_content = "col1,col2\n1,10\n2,20"
-    at.file_uploader[0].upload(csv_content.encode('utf-8'), "test.csv", "text/csv")
+def test_app_initial_state():
+    at = AppTest.from_file(APP, default_timeout=30)
     at.run()
 
-    at.button[1].click().run() # Assuming "Anomaly Detection" is the second button
+    assert at.sidebar.title[0].value == "🎛️ Data Control"
+    assert at.sidebar.info[0].value == "Upload a file to begin."
+    assert "Upload a CSV or Excel file to start." in at.main.info[0].value
 
-    assert at.markdown[1].value == "### Anomalies Insight"
-    assert at.write[2].value == "Mocked Anomalies Insight"
-    mock_dependencies[1].assert_called_with(mock_dependencies[0].return_value, "Anomalies")
+def test_app_upload_and_process_csv(mock_dependencies):
+    at = uploaded_app()
 
-def test_app_actions_button_click(mock_dependencies):
-    at = AppTest.from_file("ai_report_generator/app.py")
-    at.run()
+    assert not at.exception
+    mock_dependencies[0].assert_called_once()
+    assert at.session_state['stats_dict'] == STATS
+    assert len(at.radio) == 1
 
-    csv_content = "col1,col2\n1,10\n2,20"
-    at.file_uploader[0].upload(csv_content.encode('utf-8'), "test.csv", "text/csv")
+    # The sidebar (drawn before processing) shows the stats from the next run on
     at.run()
-
-    at.button[2].click().run() # Assuming "Strategic Actions" is the third button
-
-    assert at.markdown[2].value == "### Strategic Actions Insight"
-    assert at.write[3].value == "Mocked Actions Insight"
-    mock_dependencies[1].assert_called_with(mock_dependencies[0].return_value, "Actions")
+    assert at.sidebar.metric[0].value == "5"
+    mock_dependencies[0].assert_called_once()
+
+@pytest.mark.parametrize("tab, insight_type, result_key", [
+    ("📈 Trends Analyst", "Trends", "trend_result"),
+    ("🛡️ Anomaly Hunter", "Anomalies", "anomaly_result"),
+    ("♟️ The Strategist", "Actions", "action_result"),
+])
+def test_app_agent_selection(mock_dependencies, tab, insight_type, result_key):
+    at = uploaded_app()
+    at.radio[0].set_value(tab).run()
+
+    assert not at.exception
+    mock_dependencies[1].assert_called_once_with(STATS, insight_type)
+    assert at.session_state[result_key] == f"Mocked {insight_type} Insight"
+    assert any(f"Mocked {insight_type} Insight" in md.value for md in at.markdown)
+
+def test_app_quota_error(mock_dependencies):
+    def exhausted(stats, insight_type):
+        raise QuotaExceededError("quota", retry_after=12.5)
+        yield
+
+    mock_dependencies[1].side_effect = exhausted
+    at = uploaded_app()
+    at.radio[0].set_value("📈 Trends Analyst").run()
+
+    assert "13 seconds" in at.warning[0].value
+    assert at.session_state['trend_result'] is None
 
 def test_app_error_on_file_processing(mock_dependencies):
     mock_dependencies[0].side_effect = ValueError("Test processing error")
-    
-    at = AppTest.from_file("ai_report_generator/app.py")
-    at.run()
 
-    csv_content = "invalid csv content"
-    at.file_uploader[0].upload(csv_content.encode('utf-8'), "bad.csv", "text/csv")
-    at.run()
+    at = uploaded_app("bad.csv", b"invalid csv content")
 
     assert at.error[0].value == "Error: Test processing error"
-    assert at.info[0].value == "Please ensure you upload a valid CSV file."
     assert at.session_state['stats_dict'] is None
+
+ESTIMATE = {
+    "overall_summary": {
+        "row_count": 1000, "column_count": 2, "missing_values_summary": {"col1": 0, "col2": 0},
+        "estimated": True, "sample": {"sampled_fraction": 0.05, "row_count_ci95": [990, 1010]},
+    },
+    "numeric_columns": {}, "non_numeric_columns": {},
+}
+
+def test_app_progressive_profiling(mock_dependencies, monkeypatch):
+    monkeypatch.setenv("PROGRESSIVE_THRESHOLD_MB", "0")
+    estimate = ESTIMATE
+    release = threading.Event()
+    mock_dependencies[0].side_effect = lambda *args, **kwargs: release.wait(10) and STATS
+
+    with patch('src.data_processor.cached_csv_stats', return_value=None), \
+         patch('src.data_processor.process_csv_sample', return_value=estimate):
+        at = uploaded_app()
+        # The estimates are shown (and usable) before the full scan finishes
+        assert at.session_state['stats_dict'] == estimate
+        assert at.sidebar.metric[0].value == "≈1,000"
+        at.radio[0].set_value("📈 Trends Analyst").run()
+        mock_dependencies[1].assert_called_once_with(estimate, "Trends")
+
+        release.set()
+        _, job = at.session_state['refine_job']
+        job.result(timeout=10)
+        at.run()
+
+    assert at.session_state['stats_dict'] == STATS
+    assert at.sidebar.metric[0].value == "5"
+    # Insights are regenerated from the exact stats
+    mock_dependencies[1].assert_called_with(STATS, "Trends")
+
+def test_app_refines_every_upload_on_a_warm_pool(mock_dependencies, monkeypatch):
+    monkeypatch.setenv("PROGRESSIVE_THRESHOLD_MB", "0")
+    release = threading.Event()
+    mock_dependencies[0].side_effect = lambda *args, **kwargs: release.wait(10) and STATS
+
+    with patch('src.data_processor.cached_csv_stats', return_value=None), \
+         patch('src.data_processor.process_csv_sample', return_value=ESTIMATE):
+        at = AppTest.from_file(APP, default_timeout=30)
+        at.run()
+        # Later jobs run on the worker threads the earlier ones started
+        for i in range(3):
+            release.clear()
+            at.sidebar.file_uploader[0].upload(f"test{i}.csv", CSV + b"\n%d,0" % i, "text/csv")
+            at.run()
+            assert at.session_state['stats_dict'] == ESTIMATE
+            _, job = at.session_state['refine_job']
+            release.set()
+            assert job.result(timeout=10) == STATS
+            at.run()
+            assert at.session_state['stats_dict'] == STATS
@@ -0,0 +1,210 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from src import agent_engine
+from src.disk_cache import DiskCache
+
+
+STATS = {
+    "overall_summary": {"row_count": 3, "data_types_distribution": {"int64": 2}},
+    "numeric_columns": {"sales": {"mean": 2.0, "anomaly_detection_zscore_outliers_examples": [9]}},
+}
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch, tmp_path):
+    cache = DiskCache(str(tmp_path), "insights")
+    monkeypatch.setattr(agent_engine, "insight_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def fake_runs(monkeypatch):
+    calls = {"active": 0, "peak": 0, "agents": [], "contexts": {}, "loops": set(), "threads": set()}
+
+    async def fake_run_agent_process(agent, context_data):
+        calls["active"] += 1
+        calls["peak"] = max(calls["peak"], calls["active"])
+        calls["agents"].append(agent.name)
+        calls["contexts"][agent.name] = json.loads(context_data["stats"])
+        calls["loops"].add(id(asyncio.get_running_loop()))
+        calls["threads"].add(threading.current_thread().name)
+        await asyncio.sleep(0.05)
+        calls["active"] -= 1
+        return f"{agent.name} insight"
+
+    monkeypatch.setattr(agent_engine, "run_agent_process", fake_run_agent_process)
+    return calls
+
+
+def test_get_ai_insights_fans_out_concurrently(fake_runs):
+    results = agent_engine.run_sync(agent_engine.get_ai_insights(STATS, ["Trends", "Anomalies", "Actions"]))
+
+    assert results == {
+        "Trends": "Trend Analyst insight",
+        "Anomalies": "Anomaly Hunter insight",
+        "Actions": "Strategist insight",
+    }
+    assert fake_runs["peak"] == 3
+
+
+def test_get_ai_insights_respects_concurrency_cap(fake_runs):
+    agent_engine.run_sync(agent_engine.get_ai_insights(STATS, ["Trends", "Anomalies", "Actions"], max_concurrency=1))
+    assert fake_runs["peak"] == 1
+
+
+def test_get_ai_insight_reuses_one_engine_loop(fake_runs):
+    assert agent_engine.get_ai_insight(STATS, "Trends") == "Trend Analyst insight"
+    assert agent_engine.get_ai_insight(STATS, "Actions") == "Strategist insight"
+    assert len(fake_runs["loops"]) == 1
+    assert fake_runs["threads"] == {"agent-engine-loop"}
+
+
+def test_get_ai_insight_prunes_without_mutating_input(fake_runs):
+    agent_engine.get_ai_insight(STATS, "Trends")
+    trends_context = fake_runs["contexts"]["Trend Analyst"]
+    assert "data_types_distribution" not in trends_context["overall"]
+    assert "z_examples" not in trends_context["num"]["sales"]
+    assert STATS["numeric_columns"]["sales"]["anomaly_detection_zscore_outliers_examples"] == [9]
+    assert "data_types_distribution" in STATS["overall_summary"]
+
+
+def test_get_ai_insight_invalid_type(fake_runs):
+    with pytest.raises(agent_engine.UnknownInsightTypeError):
+        agent_engine.get_ai_insight(STATS, "Invalid")
+    assert fake_runs["agents"] == []
+
+
+def test_get_ai_insight_reports_agent_errors(monkeypatch):
+    async def failing_run(agent, context_data):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(agent_engine, "run_agent_process", failing_run)
+    with pytest.raises(agent_engine.AgentEngineError, match="Agent Engine Error: boom"):
+        agent_engine.get_ai_insight(STATS, "Trends")
+    results = agent_engine.run_sync(agent_engine.get_ai_insights(STATS, ["Trends"]))
+    assert isinstance(results["Trends"], agent_engine.AgentEngineError)
+
+
+def test_get_ai_insight_serves_repeats_from_disk_cache(fake_runs, isolated_cache):
+    assert agent_engine.get_ai_insight(STATS, "Anomalies") == "Anomaly Hunter insight"
+    assert agent_engine.get_ai_insight(STATS, "Anomalies") == "Anomaly Hunter insight"
+    assert fake_runs["agents"] == ["Anomaly Hunter"]
+    assert isolated_cache.stats()["hits"] == 1
+
+
+def test_cache_key_changes_with_prompt_version(fake_runs, monkeypatch):
+    agent_engine.get_ai_insight(STATS, "Trends")
+    monkeypatch.setattr(agent_engine, "PROMPT_VERSION", "test-bump")
+    agent_engine.get_ai_insight(STATS, "Trends")
+    assert fake_runs["agents"] == ["Trend Analyst", "Trend Analyst"]
+
+
+def test_agent_errors_are_not_cached(monkeypatch, isolated_cache):
+    async def failing_run(agent, context_data):
+        raise RuntimeError("429 quota")
+
+    monkeypatch.setattr(agent_engine, "run_agent_process", failing_run)
+    with pytest.raises(agent_engine.AgentEngineError):
+        agent_engine.get_ai_insight(STATS, "Trends")
+    assert isolated_cache.stats()["entries"] == 0
+
+
+@pytest.fixture
+def fake_stream(monkeypatch):
+    calls = []
+
+    async def fake_stream_agent_process(agent, context_data):
+        calls.append(agent.name)
+        for delta in ("Revenue ", "is ", "growing."):
+            await asyncio.sleep(0)
+            yield delta
+
+    monkeypatch.setattr(agent_engine, "stream_agent_process", fake_stream_agent_process)
+    return calls
+
+
+def test_iter_ai_insight_yields_deltas_then_caches_full_text(fake_stream, isolated_cache):
+    assert list(agent_engine.iter_ai_insight(STATS, "Trends")) == ["Revenue ", "is ", "growing."]
+    # Second request is served whole from the cache without touching the model
+    assert list(agent_engine.iter_ai_insight(STATS, "Trends")) == ["Revenue is growing."]
+    assert fake_stream == ["Trend Analyst"]
+    # ...and the non-streaming path shares the same cache entry
+    assert agent_engine.get_ai_insight(STATS, "Trends") == "Revenue is growing."
+
+
+def test_iter_ai_insight_reports_errors_without_caching(monkeypatch, isolated_cache):
+    async def failing_stream(agent, context_data):
+        yield "partial "
+        raise RuntimeError("429 Resource exhausted")
+
+    monkeypatch.setattr(agent_engine, "stream_agent_process", failing_stream)
+    deltas = []
+    with pytest.raises(agent_engine.AgentEngineError, match="429 Resource exhausted"):
+        for delta in agent_engine.iter_ai_insight(STATS, "Anomalies"):
+            deltas.append(delta)
+    assert deltas == ["partial "]
+    assert isolated_cache.stats()["entries"] == 0
+
+
+def test_closing_iter_ai_insight_early_cancels_the_run(monkeypatch, isolated_cache):
+    finished = threading.Event()
+
+    async def endless_stream(agent, context_data):
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield "tick "
+        finally:
+            finished.set()
+
+    monkeypatch.setattr(agent_engine, "stream_agent_process", endless_stream)
+    stream = agent_engine.iter_ai_insight(STATS, "Actions")
+    assert next(stream) == "tick "
+    stream.close()
+    assert finished.wait(5)
+    assert isolated_cache.stats()["entries"] == 0
+
+
+@pytest.fixture
+def fake_reports(monkeypatch):
+    calls = []
+
+    async def fake_run_agent_process(agent, context_data):
+        calls.append((agent.name, json.loads(context_data["stats"])))
+        return {field: f"{field} insight" for field in agent_engine.REPORT_FIELDS.values()}
+
+    monkeypatch.setattr(agent_engine, "run_agent_process", fake_run_agent_process)
+    return calls
+
+
+def test_combined_report_answers_every_type_in_one_call(fake_reports):
+    results = agent_engine.run_sync(agent_engine.get_ai_insights(STATS, ["Trends", "Actions", "Bogus"], combined=True))
+
+    assert results["Trends"] == "trends insight" and results["Actions"] == "actions insight"
+    assert isinstance(results["Bogus"], agent_engine.UnknownInsightTypeError)
+    assert [name for name, _ in fake_reports] == ["Report Writer"]
+    # One stats block for every brief: the outlier examples pruned for Trends alone are kept
+    assert "z_examples" in fake_reports[0][1]["num"]["sales"]
+
+    again = agent_engine.run_sync(agent_engine.get_ai_insights(STATS, list(agent_engine.AGENTS), combined=True))
+    assert again["Anomalies"] == "anomalies insight"
+    assert len(fake_reports) == 1  # served from the insight cache
+
+
+def test_combined_report_failure_is_reported_per_type(monkeypatch):
+    async def unavailable(agent, context_data):
+        raise agent_engine.UpstreamUnavailableError("The AI service is unavailable: down")
+
+    monkeypatch.setattr(agent_engine, "run_agent_process", unavailable)
+    results = agent_engine.run_sync(agent_engine.get_ai_insights(STATS, ["Trends", "Anomalies"], combined=True))
+    assert set(results) == {"Trends", "Anomalies"}
+    assert all(isinstance(error, agent_engine.UpstreamUnavailableError) for error in results.values())
+
+
+def test_single_insights_keep_their_agent_in_combined_mode(fake_runs, monkeypatch):
+    monkeypatch.setattr(agent_engine, "COMBINED_REPORT", True)
+    assert agent_engine.get_ai_insight(STATS, "Trends") == "Trend Analyst insight"
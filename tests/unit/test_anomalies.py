@@ -0,0 +1,121 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.anomalies import (
+    IQR_MULTIPLIER, MAD_CONSISTENCY, MAD_THRESHOLD, detector_params, mahalanobis_outliers, outlier_masks,
+    pick_examples,
+)
+from src.context_builder import build_context
+from src.data_processor import generate_summary_statistics, process_csv
+
+
+def skewed_frame(rows: int = 500, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    amount = rng.lognormal(3, 1, size=rows)
+    amount[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({"amount": amount, "units": rng.integers(0, 50, size=rows)})
+
+
+def test_mad_and_iqr_counts_match_pandas_reference():
+    df = skewed_frame()
+    stats = generate_summary_statistics(df)["numeric_columns"]["amount"]
+    amount = df["amount"].dropna()
+
+    median = amount.median()
+    mad = (amount - median).abs().median()
+    robust_z = MAD_CONSISTENCY * (amount - median).abs() / mad
+    assert stats["anomaly_detection_mad_outliers_count"] == int((robust_z > MAD_THRESHOLD).sum())
+
+    q1, q3 = amount.quantile([0.25, 0.75])
+    iqr = q3 - q1
+    fenced = (amount < q1 - IQR_MULTIPLIER * iqr) | (amount > q3 + IQR_MULTIPLIER * iqr)
+    assert stats["anomaly_detection_iqr_outliers_count"] == int(fenced.sum())
+
+
+def test_examples_are_sampled_rows_of_the_frame():
+    df = skewed_frame().set_index(pd.RangeIndex(1000, 1500))
+    stats = generate_summary_statistics(df)["numeric_columns"]["amount"]
+    for name in ("zscore", "mad", "iqr"):
+        rows = stats[f"anomaly_detection_{name}_outliers_rows"]
+        examples = stats[f"anomaly_detection_{name}_outliers_examples"]
+        assert len(rows) == len(examples) == min(5, stats[f"anomaly_detection_{name}_outliers_count"])
+        assert rows == sorted(rows)
+        assert df.loc[rows, "amount"].tolist() == examples
+    # The z-score fields keep reporting the first outliers in row order
+    z_rows = stats["anomaly_detection_zscore_outliers_rows"]
+    flagged = df.index[np.abs(df["amount"] - df["amount"].mean()) / df["amount"].std() > 3]
+    assert z_rows == flagged[:5].tolist()
+
+
+def test_sampling_is_deterministic_and_chunk_independent():
+    positions = np.flatnonzero(np.random.default_rng(1).random(10_000) < 0.1)
+    whole = pick_examples(positions, first=False)
+    assert len(whole) == 5 and (whole == pick_examples(positions, first=False)).all()
+
+    picked = np.empty(0, dtype=np.int64)
+    for chunk in np.array_split(positions, 13):
+        picked = pick_examples(np.concatenate((picked, pick_examples(chunk, first=False))), first=False)
+    assert (picked == whole).all()
+
+
+def test_outlier_masks_skip_nans_and_constant_columns():
+    block = np.column_stack((np.ones(20), np.tile([5.0, np.nan, 6.0, 5.5], 5)))
+    block[3, 1] = 500.0
+    stats = {
+        "mean": np.nanmean(block, axis=0), "std": np.nanstd(block, axis=0, ddof=1),
+        "median": np.nanmedian(block, axis=0), "mad": np.array([0.0, 0.0]),
+        "25%": np.nanpercentile(block, 25, axis=0), "75%": np.nanpercentile(block, 75, axis=0),
+    }
+    masks = outlier_masks(block, detector_params(stats))
+    assert not masks["zscore"][:, 0].any() and not masks["mad"].any()
+    assert np.flatnonzero(masks["iqr"][:, 1]).tolist() == [3]
+    assert np.flatnonzero(masks["zscore"][:, 1]).tolist() == [3]
+
+
+def test_mahalanobis_flags_an_unusual_combination():
+    rng = np.random.default_rng(0)
+    height = rng.normal(170, 10, size=1000)
+    weight = height * 0.9 - 80 + rng.normal(0, 3, size=1000)
+    # Ordinary height and ordinary weight, but not together
+    height[500], weight[500] = 185.0, 55.0
+    df = pd.DataFrame({"height": height, "weight": weight})
+
+    assert (np.abs(df.iloc[500] - df.mean()) / df.std() < 2).all()
+    stats = generate_summary_statistics(df)
+    multivariate = stats["anomaly_detection_mahalanobis"]
+    assert multivariate["columns"] == ["height", "weight"]
+    assert 500 in [example["row"] for example in multivariate["examples"]]
+    assert multivariate["outliers_count"] < 10
+
+
+def test_mahalanobis_needs_two_columns_and_enough_rows():
+    assert mahalanobis_outliers(np.ones((100, 1)), ["a"]) is None
+    assert mahalanobis_outliers(np.random.default_rng(0).normal(size=(4, 2)), ["a", "b"]) is None
+
+
+def test_streaming_reports_the_same_outliers():
+    # Small enough for the streaming quantile sketch to be exact
+    df = skewed_frame(rows=240, seed=3)
+    buffer = io.BytesIO(df.to_csv(index=False).encode("utf-8"))
+    expected = process_csv(buffer)["numeric_columns"]
+    actual = process_csv(io.BytesIO(buffer.getvalue()), chunksize=37)["numeric_columns"]
+    for col in expected:
+        for key, value in expected[col].items():
+            if key.startswith("anomaly_detection_"):
+                assert actual[col][key] == value, (col, key)
+
+
+def test_context_shortens_detector_fields():
+    df = skewed_frame()
+    df["cost"] = df["units"] * 2.0 + np.random.default_rng(0).normal(0, 1, size=len(df))
+    stats = generate_summary_statistics(df)
+    anomalies = json.loads(build_context(stats, "Anomalies")[0])
+    trends = json.loads(build_context(stats, "Trends")[0])
+    assert "mad_outliers" in anomalies["num"]["amount"] and "iqr_rows" in anomalies["num"]["amount"]
+    assert anomalies["legend"]["mahalanobis"] == "anomaly_detection_mahalanobis"
+    assert "mahalanobis" not in trends
+    assert not [key for key in trends["num"]["amount"] if key.endswith(("_examples", "_rows"))]
+    assert "iqr_outliers" in trends["num"]["amount"]
@@ -0,0 +1,158 @@
+import asyncio
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from starlette.testclient import TestClient
+
+from src import agent_engine, api, data_processor
+from src.disk_cache import DiskCache
+
+CSV = pd.DataFrame({
+    "Branch": ["NY", "LA", "NY", "SF"] * 10,
+    "Revenue": np.arange(40, dtype=float),
+}).to_csv(index=False).encode("utf-8")
+
+
+@pytest.fixture(autouse=True)
+def stub_model(monkeypatch, tmp_path):
+    monkeypatch.setattr(agent_engine, "STUB_MODEL", True)
+    monkeypatch.setattr(agent_engine, "STUB_LATENCY_SECONDS", 0.01)
+    monkeypatch.setattr(agent_engine, "insight_cache", DiskCache(str(tmp_path), "insights"))
+    monkeypatch.setattr(data_processor, "stats_cache", DiskCache(str(tmp_path), "stats"))
+
+
+def wait_for(client, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_upload_returns_stats_and_insight_jobs_complete():
+    with TestClient(api.create_app()) as client:
+        response = client.post("/reports?filename=sales.csv", content=CSV)
+        assert response.status_code == 200
+        body = response.json()
+        expected = data_processor.process_csv(io.BytesIO(CSV))
+        assert body["stats"] == json.loads(json.dumps(expected))
+
+        response = client.post(f"/reports/{body['report_id']}/insights", json={"insight_types": ["Trends", "Actions"]})
+        assert response.status_code == 202
+        assert response.headers["Location"] == f"/jobs/{response.json()['job_id']}"
+        job = wait_for(client, response.json()["job_id"])
+        assert job["status"] == "done"
+        assert set(job["result"]) == {"Trends", "Actions"}
+        assert job["result"]["Trends"].startswith("[stub] Trend Analyst")
+
+        metrics = client.get("/metrics").json()
+        assert metrics["jobs"]["submitted"] == metrics["jobs"]["completed"] == 1
+        assert metrics["queue_depth"] == 0 and metrics["run_seconds"]["count"] == 1
+        assert metrics["profiling_seconds"]["count"] == 1 and metrics["stub_model"] is True
+
+
+def test_full_queue_answers_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(agent_engine, "STUB_LATENCY_SECONDS", 0.3)
+    with TestClient(api.create_app(queue_size=1, workers=1)) as client:
+        report_id = client.post("/reports", content=CSV).json()["report_id"]
+        responses = [client.post(f"/reports/{report_id}/insights") for _ in range(4)]
+        rejected = [response for response in responses if response.status_code == 429]
+        assert rejected and all(int(response.headers["Retry-After"]) >= 1 for response in rejected)
+        assert client.get("/metrics").json()["jobs"]["rejected"] == len(rejected)
+        accepted = [response.json()["job_id"] for response in responses if response.status_code == 202]
+        assert all(wait_for(client, job_id)["status"] == "done" for job_id in accepted)
+
+
+def test_stop_fails_queued_and_running_jobs(monkeypatch):
+    monkeypatch.setattr(agent_engine, "STUB_LATENCY_SECONDS", 5)
+
+    async def submit_then_stop():
+        queue = api.InsightQueue(maxsize=4, workers=1)
+        queue.start()
+        jobs = [queue.submit({"numeric_columns": {}}, ["Trends"], "report") for _ in range(3)]
+        await asyncio.sleep(0.05)
+        await queue.stop()
+        return jobs
+
+    jobs = asyncio.run(submit_then_stop())
+    assert [job["status"] for job in jobs] == ["failed"] * 3
+    assert all(job["error"] == "Server shutting down" and "finished_at" in job for job in jobs)
+
+
+def test_profiling_slots_are_held_while_bodies_arrive():
+    app = api.create_app(max_profiling=1)
+
+    async def upload(body_sent: asyncio.Event) -> int:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": "/reports", "raw_path": b"/reports", "query_string": b"",
+            "root_path": "", "headers": [], "client": ("test", 1), "server": ("test", 80),
+        }
+        messages = [{"type": "http.request", "body": CSV, "more_body": False}]
+        statuses = []
+
+        async def receive():
+            # A slow client: nothing arrives until every upload has been let in (or not)
+            await body_sent.wait()
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        await app(scope, receive, send)
+        return statuses[0]
+
+    async def concurrent_uploads():
+        async with app.router.lifespan_context(app):
+            body_sent = asyncio.Event()
+            tasks = [asyncio.create_task(upload(body_sent)) for _ in range(4)]
+            await asyncio.sleep(0.1)
+            body_sent.set()
+            return sorted(await asyncio.gather(*tasks))
+
+    assert asyncio.run(concurrent_uploads()) == [200, 503, 503, 503]
+
+
+def test_uploads_are_hashed_off_the_event_loop(monkeypatch):
+    hashed_on_loop = []
+
+    def content_hash(buffer):
+        try:
+            asyncio.get_running_loop()
+            hashed_on_loop.append(True)
+        except RuntimeError:
+            hashed_on_loop.append(False)
+        return data_processor.content_hash(buffer)
+
+    monkeypatch.setattr(api, "content_hash", content_hash)
+    with TestClient(api.create_app()) as client:
+        assert client.post("/reports", content=CSV).status_code == 200
+    assert hashed_on_loop == [False]
+
+
+def test_not_started_server_answers_503():
+    client = TestClient(api.create_app())  # no lifespan: the worker pool never started
+    response = client.post("/reports", content=CSV)
+    assert response.status_code == 503 and response.headers["Retry-After"] == "5"
+    assert client.get("/healthz").status_code == 503
+
+
+def test_bad_requests():
+    with TestClient(api.create_app()) as client:
+        assert client.post("/reports", content=b"").status_code == 400
+        assert client.post("/reports/unknown/insights").status_code == 404
+        assert client.get("/jobs/unknown").status_code == 404
+        report_id = client.post("/reports", content=CSV).json()["report_id"]
+        assert client.post(f"/reports/{report_id}/insights", json={"insight_types": ["Poems"]}).status_code == 400
+        for body in (b"{not json", b"[]", b'"Trends"', b'{"insight_types": "Trends"}', b'{"insight_types": [1]}'):
+            response = client.post(f"/reports/{report_id}/insights", content=body)
+            assert response.status_code == 400, body
+        nan_stats = client.post("/reports", content=b"a,b\n1,x\n").json()["stats"]
+        assert nan_stats["numeric_columns"]["a"]["std_dev"] is None
@@ -0,0 +1,106 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from src import agent_engine, batch
+from src.data_processor import process_csv
+from src.disk_cache import DiskCache
+
+
+def write_csv(path, rows: int, offset: int = 0) -> None:
+    pd.DataFrame({
+        "Branch": ["NY", "LA"] * (rows // 2),
+        "Revenue": [float(offset + i) for i in range(rows)],
+    }).to_csv(path, index=False)
+
+
+@pytest.fixture
+def exports(tmp_path):
+    folder = tmp_path / "exports"
+    (folder / "nested").mkdir(parents=True)
+    write_csv(folder / "ny.csv", 20)
+    write_csv(folder / "nested" / "la.csv", 40, offset=100)
+    (folder / "notes.txt").write_text("not data")
+    return folder
+
+
+def test_reports_and_summary_are_written(exports, tmp_path):
+    out = tmp_path / "reports"
+    summary = batch.run_batch([str(exports)], str(out), workers=1)
+
+    assert summary["files_found"] == summary["files_processed"] == 2
+    assert summary["files_failed"] == 0 and summary["rows"] == 60
+    assert set(summary["stage_seconds"]) == {"hash", "read", "profile", "insights", "write"}
+    report = json.loads((out / "ny.json").read_text())
+    with open(exports / "ny.csv", "rb") as f:
+        assert report["stats"] == json.loads(json.dumps(process_csv(f)))
+    markdown = (out / "la.md").read_text()
+    assert markdown.startswith("# la.csv") and "| Revenue |" in markdown
+    assert json.loads((out / batch.SUMMARY_NAME).read_text()) == summary
+
+
+def test_unchanged_files_are_skipped(exports, tmp_path):
+    out = str(tmp_path / "reports")
+    batch.run_batch([str(exports)], out, workers=1)
+    assert batch.run_batch([str(exports)], out, workers=1)["files_skipped"] == 2
+
+    write_csv(exports / "ny.csv", 22)
+    rerun = batch.run_batch([str(exports)], out, workers=1)
+    assert (rerun["files_processed"], rerun["files_skipped"]) == (1, 1)
+    assert json.loads((tmp_path / "reports" / "ny.json").read_text())["stats"]["overall_summary"]["row_count"] == 22
+
+    assert batch.run_batch([str(exports)], out, workers=1, force=True)["files_processed"] == 2
+    assert batch.run_batch([str(exports)], out, workers=1, chunksize=5)["files_processed"] == 2
+
+
+def test_glob_patterns_and_name_collisions(exports, tmp_path):
+    write_csv(exports / "nested" / "ny.csv", 10)
+    paths = batch.find_files([str(exports / "**" / "*.csv")])
+    assert len(paths) == 3
+    names = batch.report_names(paths)
+    assert len(set(names.values())) == 3 and names[str(exports / "nested" / "la.csv")] == "la"
+
+
+def test_failures_are_reported_not_raised(exports, tmp_path):
+    (exports / "empty.csv").write_bytes(b"")
+    summary = batch.run_batch([str(exports)], str(tmp_path / "reports"), workers=1)
+    assert summary["files_processed"] == 2
+    assert [failure["path"] for failure in summary["failures"]] == [str(exports / "empty.csv")]
+    assert batch.main([str(exports), "--out", str(tmp_path / "cli"), "--workers", "1"]) == 1
+
+
+def test_process_pool_matches_in_process(exports, tmp_path):
+    batch.run_batch([str(exports)], str(tmp_path / "serial"), workers=1)
+    summary = batch.run_batch([str(exports)], str(tmp_path / "pool"), workers=2)
+    assert summary["workers"] == 2 and summary["files_processed"] == 2
+    for name in ("ny", "la"):
+        serial = json.loads((tmp_path / "serial" / f"{name}.json").read_text())
+        pooled = json.loads((tmp_path / "pool" / f"{name}.json").read_text())
+        assert serial == pooled
+
+
+def test_insights_share_one_concurrency_limit(exports, tmp_path, monkeypatch):
+    monkeypatch.setattr(agent_engine, "insight_cache", DiskCache(str(tmp_path), "insights"))
+    calls = {"active": 0, "peak": 0}
+
+    async def fake_run_agent_process(agent, context_data):
+        import asyncio
+        calls["active"] += 1
+        calls["peak"] = max(calls["peak"], calls["active"])
+        await asyncio.sleep(0.02)
+        calls["active"] -= 1
+        return f"{agent.name} insight"
+
+    monkeypatch.setattr(agent_engine, "run_agent_process", fake_run_agent_process)
+    out = tmp_path / "reports"
+    summary = batch.run_batch(
+        [str(exports)], str(out), workers=1, insight_types=["Trends", "Actions"], insight_concurrency=3,
+    )
+    assert summary["stage_seconds"]["insights"] > 0
+    assert calls["peak"] == 3
+    report = json.loads((out / "ny.json").read_text())
+    assert report["insights"] == {"Trends": "Trend Analyst insight", "Actions": "Strategist insight"}
+    assert "## Actions" in (out / "ny.md").read_text()
+    assert os.path.exists(out / batch.MANIFEST_NAME)
@@ -0,0 +1,84 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import data_processor
+from src.data_processor import generate_summary_statistics, process_csv
+from src.sketches import HyperLogLog, SpaceSaving
+
+from tests.unit.test_streaming import assert_close
+
+
+def id_heavy_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    sku = rng.zipf(1.6, size=rows) % 5_000
+    return pd.DataFrame({
+        "Order_ID": [f"ORD-{i:07d}" for i in rng.permutation(rows)],
+        "SKU": [f"SKU-{v}" for v in sku],
+        "Branch": rng.choice(["NY", "LA", "SF"], size=rows),
+    })
+
+
+def test_small_columns_get_exact_counts_and_distinct():
+    df = pd.DataFrame({"city": ["NY", "LA", "NY", None, "SF"], "x": [1, 2, 3, 4, 5]})
+    stats = generate_summary_statistics(df)
+    assert stats["non_numeric_columns"]["city"] == {"NY": 2, "LA": 1, "SF": 1}
+    assert stats["categorical_profile"]["city"] == {
+        "approx_distinct": 3, "distinct_is_exact": True, "top_k_error_bound": 0,
+    }
+    assert "x" not in stats["categorical_profile"]
+
+
+def test_large_high_cardinality_columns_use_sketches(monkeypatch):
+    monkeypatch.setattr(data_processor, "EXACT_COUNTS_MAX_ROWS", 10_000)
+    df = id_heavy_frame(60_000)
+    stats = generate_summary_statistics(df)
+
+    ids = stats["categorical_profile"]["Order_ID"]
+    assert not ids["distinct_is_exact"]
+    assert ids["approx_distinct"] == pytest.approx(60_000, rel=0.03)
+
+    # Low-cardinality columns still get exact counts
+    assert stats["non_numeric_columns"]["Branch"] == df["Branch"].value_counts().head(5).to_dict()
+    assert stats["categorical_profile"]["Branch"]["distinct_is_exact"]
+
+    # Heavy hitters of the skewed column are found with counts inside the reported bound
+    sku = stats["categorical_profile"]["SKU"]
+    exact = df["SKU"].value_counts()
+    top = stats["non_numeric_columns"]["SKU"]
+    assert list(top)[:3] == list(exact.index[:3])
+    for key, count in top.items():
+        assert exact[key] <= count <= exact[key] + sku["top_k_error_bound"]
+
+
+def test_streaming_profile_matches_batch_and_merges():
+    df = id_heavy_frame(5_000)
+    data = df.to_csv(index=False).encode()
+    batch = process_csv(io.BytesIO(data))
+    stream = process_csv(io.BytesIO(data), chunksize=700)
+    assert_close(stream["categorical_profile"]["Branch"], batch["categorical_profile"]["Branch"])
+    assert stream["non_numeric_columns"]["Branch"] == batch["non_numeric_columns"]["Branch"]
+    # 5,000 IDs overflow the 1,024-key summary, so the distinct count comes from HyperLogLog
+    ids = stream["categorical_profile"]["Order_ID"]
+    assert not ids["distinct_is_exact"]
+    assert ids["approx_distinct"] == pytest.approx(5_000, rel=0.03)
+
+
+def test_sketches_merge_like_a_single_pass():
+    values = pd.Series([f"k{v}" for v in np.random.default_rng(3).zipf(1.5, size=20_000)])
+    left, right, whole = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    left.update(values[:7_000])
+    right.update(values[7_000:])
+    whole.update(values)
+    left.merge(right)
+    assert left.estimate() == whole.estimate()
+
+    top_left, top_right = SpaceSaving(capacity=64), SpaceSaving(capacity=64)
+    top_left.update(values[:7_000])
+    top_right.update(values[7_000:])
+    top_left.merge(top_right)
+    exact = values.value_counts()
+    for key, count in top_left.top(5).items():
+        assert exact[key] <= count <= exact[key] + top_left.error_bound
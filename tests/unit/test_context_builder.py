@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.context_builder import build_context, estimate_tokens
+from src.data_processor import generate_summary_statistics
+
+
+def wide_stats(columns: int = 500, rows: int = 200) -> dict:
+    rng = np.random.default_rng(0)
+    data = {f"metric_{i:03d}": rng.normal(100, 1 + i % 7, size=rows) for i in range(columns)}
+    data["metric_042"][:3] = 10_000.0  # the one column with real outliers
+    data["Branch"] = rng.choice(["NY", "LA"], size=rows)
+    return generate_summary_statistics(pd.DataFrame(data))
+
+
+def test_wide_dataset_fits_budget_and_reports_tokens():
+    stats = wide_stats()
+    text, report = build_context(stats, "Anomalies", token_budget=1500)
+    assert report["tokens_after"] <= 1500 < report["tokens_before"]
+    assert report["tokens_after"] == estimate_tokens(text)
+    assert report["columns_kept"] + len(report["columns_dropped"]) == 501
+    context = json.loads(text)
+    assert context["omitted_columns"] == len(report["columns_dropped"])
+
+
+def test_scattered_nulls_in_a_wide_export_stay_within_every_budget():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(100, 10, size=(500, 500)), columns=[f"metric_{i:03d}" for i in range(500)])
+    stats = generate_summary_statistics(df.mask(rng.random(df.shape) < 0.05))
+    assert len([count for count in stats["overall_summary"]["missing_values_summary"].values() if count]) == 500
+
+    for insight_type in ("Trends", "Anomalies", "Actions", "Report"):
+        text, report = build_context(stats, insight_type)
+        assert report["tokens_after"] <= report["token_budget"], insight_type
+        assert report["columns_kept"] > 0
+        overall = json.loads(text)["overall"]
+        # Missing counts only for the packed columns, plus a total for the others
+        assert set(overall["missing"]) == set(json.loads(text)["num"])
+        assert overall["missing_omitted_columns"]["columns"] == 500 - report["columns_kept"]
+        assert sum(overall["missing"].values()) + overall["missing_omitted_columns"]["values"] == \
+            sum(stats["overall_summary"]["missing_values_summary"].values())
+
+
+def test_anomaly_agent_sees_outlier_columns_first():
+    text, _ = build_context(wide_stats(), "Anomalies", token_budget=600)
+    context = json.loads(text)
+    assert next(iter(context["num"])) == "metric_042"
+    assert context["num"]["metric_042"]["z_outliers"] == 3
+    assert context["legend"]["z_outliers"] == "anomaly_detection_zscore_outliers_count"
+
+
+def test_truncation_is_deterministic():
+    stats = wide_stats()
+    assert build_context(stats, "Actions", token_budget=800) == build_context(stats, "Actions", token_budget=800)
+
+
+def test_legacy_pruning_is_kept_and_input_untouched():
+    stats = generate_summary_statistics(pd.DataFrame({"sales": [10] * 40 + [1000], "Branch": ["NY"] * 41}))
+    snapshot = json.dumps(stats, sort_keys=True)
+    trends = json.loads(build_context(stats, "Trends")[0])
+    anomalies = json.loads(build_context(stats, "Anomalies")[0])
+    assert "data_types_distribution" not in trends["overall"]
+    assert "z_examples" not in trends["num"]["sales"]
+    assert anomalies["num"]["sales"]["z_examples"] == [1000]
+    assert trends["cat"] == {"Branch": {"NY": 41}}
+    assert json.dumps(stats, sort_keys=True) == snapshot
+
+
+def test_floats_are_rounded_and_missing_is_compacted():
+    stats = generate_summary_statistics(pd.DataFrame({"a": [1 / 3, 2 / 3, np.nan], "b": [1.0, 2.0, 3.0]}))
+    context = json.loads(build_context(stats, "Trends")[0])
+    assert context["num"]["a"]["mean"] == 0.5
+    assert context["num"]["b"]["std"] == 1.0
+    assert context["overall"]["missing"] == {"a": 1}
+
+
+def test_categorical_profile_travels_with_its_column():
+    stats = generate_summary_statistics(pd.DataFrame({"Branch": ["NY", "LA", "NY"], "units": [1, 2, 3]}))
+    context = json.loads(build_context(stats, "Actions")[0])
+    assert context["cat"] == {"Branch": {"NY": 2, "LA": 1}}
+    assert context["cat_profile"] == {"Branch": {"distinct": 2, "distinct_exact": True, "top_err": 0}}
+    assert context["legend"]["distinct"] == "approx_distinct"
+
+    text, report = build_context(stats, "Actions", token_budget=1)
+    assert json.loads(text)["cat_profile"] == {}
+    assert "Branch" in report["columns_dropped"]
@@ -2,7 +2,7 @@ import pytest
 import pandas as pd
 import io
 import numpy as np
-from ai_report_generator.src.data_processor import process_csv, generate_summary_statistics
+from src.data_processor import process_csv, generate_summary_statistics
 
 # --- Tests for generate_summary_statistics ---
 
@@ -25,7 +25,7 @@ def test_generate_summary_statistics_with_nans():
     assert stats['overall_summary']['missing_values_summary']['col1'] == 1
     assert stats['overall_summary']['missing_values_summary']['col2'] == 1
     assert stats['numeric_columns']['col1']['mean'] == pytest.approx(3.0, 0.01) # mean ignores NaN
-    assert stats['numeric_columns']['col2']['median'] == 40.0 # median ignores NaN
+    assert stats['numeric_columns']['col2']['median'] == 35.0 # median ignores NaN
 
 def test_generate_summary_statistics_non_numeric():
     data = {'category': ['A', 'B', 'A', 'C', 'B'], 'value': [1, 2, 3, 4, 5]}
@@ -36,7 +36,7 @@ def test_generate_summary_statistics_non_numeric():
     assert stats['non_numeric_columns']['category']['A'] == 2
 
 def test_generate_summary_statistics_anomalies():
-    data = {'sales': [10, 12, 11, 100, 13, 11]} # 100 is an outlier
+    data = {'sales': [10, 12, 11, 13, 11] * 4 + [100]} # 100 is an outlier
     df = pd.DataFrame(data)
     stats = generate_summary_statistics(df)
 
@@ -80,10 +80,8 @@ def test_process_csv_only_headers():
 def test_process_csv_invalid_csv_format():
     csv_content = "col1;col2\n1;10\n2;20" # Semicolon separated, default read_csv expects comma
     file_buffer = io.BytesIO(csv_content.encode('utf-8'))
-    # Depending on pandas version and content, this might raise ParserError or return malformed df
-    # For this test, we expect some form of error or unexpected behavior,
-    # or ensure it doesn't crash but results in appropriate stats.
-    # A more specific test would mock pd.read_csv to raise a specific error.
-    with pytest.raises((Exception, pd.errors.ParserError)): # Expecting a parsing error
-        process_csv(file_buffer)
+    stats = process_csv(file_buffer)
 
+    # Parsed as one text column rather than two numeric ones
+    assert stats['overall_summary']['column_count'] == 1
+    assert stats['numeric_columns'] == {}
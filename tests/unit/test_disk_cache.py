@@ -0,0 +1,78 @@
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from src.disk_cache import DiskCache, stable_hash
+
+
+def test_stable_hash_ignores_key_order():
+    assert stable_hash({"a": 1, "b": 2}, "Trends") == stable_hash({"b": 2, "a": 1}, "Trends")
+    assert stable_hash({"a": 1}, "Trends") != stable_hash({"a": 1}, "Actions")
+
+
+def test_get_set_and_counters(tmp_path):
+    cache = DiskCache(str(tmp_path), "test")
+    assert cache.get("k") is None
+    cache.set("k", "insight text")
+    assert cache.get("k") == "insight text"
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1, "bytes": len('"insight text"')}
+
+
+def test_every_operation_closes_its_connection(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), "test")
+    opened = []
+    connect = cache._connect
+    monkeypatch.setattr(cache, "_connect", lambda: opened.append(connect()) or opened[-1])
+    cache.set("k", "v")
+    cache.get("k")
+    cache.get("missing")
+    cache.stats()
+    cache.clear()
+    assert len(opened) == 5
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_ttl_expiry(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), "test", ttl_seconds=60)
+    clock = [1_000.0]
+    monkeypatch.setattr("src.disk_cache.time.time", lambda: clock[0])
+    cache.set("k", "v")
+    clock[0] += 61
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_by_entries_and_bytes(tmp_path, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("src.disk_cache.time.time", lambda: clock[0])
+    cache = DiskCache(str(tmp_path), "test", max_entries=2, ttl_seconds=None)
+    for key in ("a", "b"):
+        clock[0] += 1
+        cache.set(key, key)
+    clock[0] += 1
+    cache.get("a")  # "b" is now least recently used
+    clock[0] += 1
+    cache.set("c", "c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" and cache.get("c") == "c"
+
+    small = DiskCache(str(tmp_path), "small", max_bytes=10, ttl_seconds=None)
+    small.set("x", "12345")
+    clock[0] += 1
+    small.set("y", "67890")
+    assert small.get("x") is None
+    assert small.stats()["evictions"] == 1
+
+
+def _write_from_child(directory):
+    DiskCache(directory, "shared").set("from-child", {"insight": "hello"})
+
+
+def test_cache_is_shared_across_processes(tmp_path):
+    process = multiprocessing.get_context("spawn").Process(target=_write_from_child, args=(str(tmp_path),))
+    process.start()
+    process.join(30)
+    assert DiskCache(str(tmp_path), "shared").get("from-child") == {"insight": "hello"}
@@ -0,0 +1,97 @@
+import io
+
+import pytest
+from openpyxl import Workbook
+
+from src import data_processor, excel_reader, frame_cache
+from src.disk_cache import DiskCache
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(monkeypatch, tmp_path):
+    monkeypatch.setattr(frame_cache, "FRAME_CACHE_DIR", str(tmp_path / "frames"))
+    monkeypatch.setattr(data_processor, "stats_cache", DiskCache(str(tmp_path), "stats"))
+
+
+def make_workbook(sheets: dict) -> io.BytesIO:
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for name, rows in sheets.items():
+        sheet = workbook.create_sheet(name)
+        for row in rows:
+            sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+HEADER = ["Date", "Branch", "Revenue", "Item Code"]
+JAN = [HEADER, ["2025-01-01", "NY", 500, 1001], ["2025-01-02", "LA", 450, "A-7"]]
+FEB = [HEADER, ["2025-02-01", "NY", 700, 1002], [None, None, None, None], ["2025-02-02", "SF", None, 1003]]
+NOTES = [["Comment"], ["checked by finance"]]
+
+
+def test_process_excel_stacks_matching_sheets_in_parallel():
+    stats = data_processor.process_excel(make_workbook({"Jan": JAN, "Feb": FEB, "Notes": NOTES}))
+    overall = stats["overall_summary"]
+    assert overall["row_count"] == 4
+    assert overall["sheets"] == ["Jan", "Feb"]
+    assert overall["skipped_sheets"] == ["Notes"]
+    assert overall["missing_values_summary"]["Revenue"] == 1
+    assert stats["numeric_columns"]["Revenue"]["max"] == 700.0
+    # Mixed number/text identifiers are profiled as text
+    assert stats["non_numeric_columns"]["Item Code"] == {"1001": 1, "A-7": 1, "1002": 1, "1003": 1}
+
+
+def test_process_excel_single_sheet_selection():
+    stats = data_processor.process_excel(make_workbook({"Jan": JAN, "Feb": FEB}), sheet_name="Feb")
+    assert stats["overall_summary"]["row_count"] == 2
+    assert "sheets" not in stats["overall_summary"]
+
+
+def test_parsed_frame_is_cached_as_parquet(monkeypatch):
+    workbook = make_workbook({"Jan": JAN, "Feb": FEB})
+    first = data_processor.process_excel(workbook)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("workbook should not be parsed again")
+
+    monkeypatch.setattr(data_processor, "read_workbook", fail)
+    assert data_processor.process_excel(workbook) == first
+
+
+def test_process_excel_cached_memoizes_stats(monkeypatch):
+    workbook = make_workbook({"Jan": JAN})
+    calls = []
+    real_read = excel_reader.read_workbook
+    monkeypatch.setattr(data_processor, "read_workbook", lambda *a, **k: calls.append(1) or real_read(*a, **k))
+    first = data_processor.process_excel_cached(workbook)
+    assert data_processor.process_excel_cached(workbook) == first
+    assert calls == [1]
+
+
+def test_shipped_workbook_matches_pandas_read_excel():
+    import pandas as pd
+
+    with open("Retail and wherehouse Sale.xlsx", "rb") as f:
+        data = f.read()
+    stats = data_processor.process_excel(io.BytesIO(data))
+    reference = data_processor.generate_summary_statistics(pd.read_excel(io.BytesIO(data)))
+    assert stats["overall_summary"]["row_count"] == reference["overall_summary"]["row_count"] == 30000
+    assert stats["numeric_columns"] == reference["numeric_columns"]
+
+
+def test_date_cells_are_keyed_by_iso_text_through_cache_and_context():
+    from datetime import datetime
+
+    from src.context_builder import build_context
+
+    rows = [HEADER[:3]] + [[datetime(2025, 1, 1 + i % 3), "NY", 100 + i] for i in range(6)]
+    workbook = make_workbook({"Sales": rows})
+    stats = data_processor.process_excel_cached(workbook)
+    assert stats["non_numeric_columns"]["Date"] == {
+        "2025-01-01T00:00:00": 2, "2025-01-02T00:00:00": 2, "2025-01-03T00:00:00": 2,
+    }
+    assert data_processor.process_excel_cached(workbook) == stats
+    assert "2025-01-01T00:00:00" in build_context(stats, "Trends")[0]
@@ -0,0 +1,160 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import incremental, telemetry
+from src.data_processor import process_csv
+from src.streaming import summarize_csv_stream
+
+CHUNK = 500
+
+
+@pytest.fixture(autouse=True)
+def state_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(incremental, "PROFILE_STATE_DIR", str(tmp_path / "profiles"))
+    return tmp_path / "profiles"
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    recorder = telemetry.Recorder()
+    monkeypatch.setattr(telemetry, "recorder", recorder)
+    monkeypatch.setattr(telemetry, "ENABLED", True)
+    return recorder
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    revenue = rng.normal(500, 50, size=rows).round(2)
+    revenue[rng.random(rows) < 0.03] = np.nan
+    revenue[rng.integers(0, rows, size=4)] = 5000.0
+    return pd.DataFrame({
+        "Date": pd.date_range("2025-01-01", periods=rows, freq="h").astype(str),
+        "Branch": rng.choice(["New York", "Chicago", "Austin"], size=rows),
+        "Revenue": revenue,
+        "Units_Sold": rng.integers(0, 100, size=rows),
+    })
+
+
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def profile(data: bytes) -> dict:
+    return incremental.summarize_csv_incremental(io.BytesIO(data), chunksize=CHUNK)
+
+
+def last_run(recorder) -> dict:
+    return [span for span in recorder.recent() if span["stage"] == "incremental_profile"][-1]
+
+
+def assert_close(actual, expected, path="stats"):
+    if isinstance(expected, dict):
+        assert list(actual) == list(expected), path
+        for key in expected:
+            assert_close(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected, rel=1e-9, abs=1e-9), path
+    else:
+        assert actual == expected, path
+
+
+def assert_matches_full_profile(actual: dict, expected: dict) -> None:
+    assert actual["overall_summary"] == expected["overall_summary"]
+    assert actual["non_numeric_columns"] == expected["non_numeric_columns"]
+    assert actual["categorical_profile"] == expected["categorical_profile"]
+    assert_close(actual["segments"], expected["segments"])
+    assert_close(actual["time_series"], expected["time_series"])
+    for col, stats in expected["numeric_columns"].items():
+        resumed = actual["numeric_columns"][col]
+        for key in ("mean", "std_dev", "min", "max"):
+            assert resumed[key] == pytest.approx(stats[key], rel=1e-9)
+        # Moments are exact, so the z-score fences and everything they flag are too
+        for key in ("count", "examples", "rows"):
+            field = f"anomaly_detection_zscore_outliers_{key}"
+            assert resumed.get(field) == stats.get(field), f"{col}.{field}"
+        # Quantiles come from a differently compacted sketch: equal within its rank error
+        spread = stats["75_percentile"] - stats["25_percentile"]
+        for key in ("median", "25_percentile", "75_percentile"):
+            assert resumed[key] == pytest.approx(stats[key], abs=0.05 * spread)
+
+
+def test_appended_rows_are_profiled_from_the_stored_prefix(recorder):
+    df = make_frame(3000)
+    prefix, full = csv_bytes(df.iloc[:2000]), csv_bytes(df)
+    assert full.startswith(prefix)
+
+    profile(prefix)
+    actual = profile(full)
+
+    run = last_run(recorder)
+    assert run["resumed_bytes"] == len(prefix) and run["rows"] == 1000
+    # Units_Sold (uniform) never gets near its fences, so only Revenue needs outliers
+    assert run["resumed_columns"] == 1 and run["rescanned_columns"] == 0
+    assert_matches_full_profile(actual, summarize_csv_stream(io.BytesIO(full), chunksize=CHUNK))
+
+
+def test_repeated_daily_appends_keep_matching(recorder):
+    df = make_frame(4000, seed=3)
+    for rows in (1000, 2000, 3000, 4000):
+        actual = profile(csv_bytes(df.iloc[:rows]))
+    assert last_run(recorder)["rows"] == 1000
+    assert_matches_full_profile(actual, summarize_csv_stream(io.BytesIO(csv_bytes(df)), chunksize=CHUNK))
+
+
+def test_changed_rows_are_not_resumed(recorder):
+    df = make_frame(2000)
+    profile(csv_bytes(df.iloc[:1500]))
+    edited = df.copy()
+    edited.loc[10, "Units_Sold"] = 99_999
+
+    data = csv_bytes(edited)
+    assert profile(data) == summarize_csv_stream(io.BytesIO(data), chunksize=CHUNK)
+    assert last_run(recorder)["resumed_bytes"] == 0
+
+
+def test_last_row_must_be_complete(recorder):
+    profile(b"a,b\n1,2\n3,4")
+    # "3,4" was not the whole row: the stored file is a byte prefix but not a row prefix
+    data = b"a,b\n1,2\n3,45\n6,7\n"
+    assert profile(data) == summarize_csv_stream(io.BytesIO(data), chunksize=CHUNK)
+    assert last_run(recorder)["resumed_bytes"] == 0
+
+    profile(b"x,y\n1,2\n3,4")
+    profile(b"x,y\n1,2\n3,4\n5,6\n")
+    assert last_run(recorder)["resumed_bytes"] == len(b"x,y\n1,2\n3,4")
+
+
+def test_fences_moving_inward_rescan_the_column(recorder):
+    rng = np.random.default_rng(7)
+    wide = pd.DataFrame({"value": rng.normal(0, 100, size=1000).round(3)})
+    narrow = pd.DataFrame({"value": rng.normal(0, 1, size=20_000).round(3)})
+    profile(csv_bytes(wide))
+    data = csv_bytes(pd.concat([wide, narrow]))
+    actual = profile(data)
+
+    run = last_run(recorder)
+    assert run["resumed_bytes"] > 0 and run["rescanned_columns"] == 1
+    expected = summarize_csv_stream(io.BytesIO(data), chunksize=CHUNK)
+    zscore = "anomaly_detection_zscore_outliers_count"
+    assert actual["numeric_columns"]["value"][zscore] == expected["numeric_columns"]["value"][zscore] > 0
+
+
+@pytest.mark.parametrize("tail, id_type", [(b"abc,30\n", "str"), (b"n/a,30\n", "float64")])
+def test_tail_can_change_a_column_type(recorder, tail, id_type):
+    prefix = b"id,amount\n1,10\n2,20\n"
+    profile(prefix)
+    actual = profile(prefix + tail)
+    assert last_run(recorder)["resumed_bytes"] > 0
+    assert actual == summarize_csv_stream(io.BytesIO(prefix + tail), chunksize=CHUNK)
+    # Text makes it a categorical column; a null (n/a) turns the integers into floats
+    assert actual["overall_summary"]["data_types_distribution"] == {"int64": 1, id_type: 1}
+
+
+def test_process_csv_incremental_option(state_dir):
+    data = csv_bytes(make_frame(300))
+    stats = process_csv(io.BytesIO(data), chunksize=100, incremental=True)
+    assert stats["overall_summary"]["row_count"] == 300
+    assert len(list(state_dir.glob("*.pkl"))) == 1
@@ -0,0 +1,67 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processor import generate_summary_statistics, process_csv
+from src.ingest import compact_dtypes, read_csv_frame
+
+from tests.unit.test_stats_parity import assert_same
+
+
+def sales_csv(rows: int = 2_000, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    revenue = rng.normal(500, 50, size=rows).round(2)
+    revenue[rng.random(rows) < 0.05] = np.nan
+    revenue[:2] = 9_999.5
+    df = pd.DataFrame({
+        "Date": pd.date_range("2025-01-01", periods=rows, freq="D").strftime("%Y-%m-%d"),
+        "Timestamp": pd.date_range("2025-01-01", periods=rows, freq="min").strftime("%Y-%m-%d %H:%M:%S"),
+        "Branch": rng.choice(["New York", "Chicago", "Austin", "NA"], size=rows),
+        "Order_ID": [f"ORD-{i:06d}" for i in range(rows)],
+        "Revenue": revenue,
+        "Units_Sold": rng.integers(0, 120, size=rows),
+        "Big_Count": rng.integers(0, 10**12, size=rows),
+        "Flag": rng.choice([True, False], size=rows),
+    })
+    return df.to_csv(index=False).encode("utf-8")
+
+
+@pytest.mark.parametrize("backend", ["pandas", "pyarrow", "polars"])
+def test_backends_produce_the_default_summary(backend):
+    if backend == "polars":
+        pytest.importorskip("polars")
+    data = sales_csv()
+    expected = process_csv(io.BytesIO(data))
+    assert_same(process_csv(io.BytesIO(data), backend=backend), expected)
+
+
+@pytest.mark.parametrize("backend", ["pandas", "pyarrow"])
+def test_compaction_shrinks_memory_and_reports_it(backend):
+    df = read_csv_frame(io.BytesIO(sales_csv()), backend=backend)
+    report = df.attrs["ingest"]
+    assert report["backend"] == backend
+    assert report["memory_bytes"] < report["memory_bytes_parsed"]
+    assert isinstance(df["Branch"].dtype, pd.CategoricalDtype)
+    assert df["Units_Sold"].dtype == np.int8
+    assert pd.api.types.is_datetime64_any_dtype(df["Date"])
+    assert pd.api.types.is_datetime64_any_dtype(df["Timestamp"])
+    # High-cardinality IDs stay text; floats that need 64 bits stay float64
+    assert not isinstance(df["Order_ID"].dtype, pd.CategoricalDtype)
+    assert df["Revenue"].dtype == np.float64
+
+
+def test_compaction_keeps_non_roundtripping_dates_as_text():
+    df = pd.DataFrame({"when": ["2025-1-5", "2025-01-06"], "x": [1.5, 2.5]})
+    compact = compact_dtypes(df)
+    assert compact.attrs["date_formats"] == {}
+    assert compact["x"].dtype == np.float32
+    assert_same(generate_summary_statistics(compact), generate_summary_statistics(df))
+
+
+def test_unknown_backend_and_empty_input():
+    with pytest.raises(ValueError):
+        read_csv_frame(io.BytesIO(b"a\n1"), backend="duckdb")
+    with pytest.raises(pd.errors.EmptyDataError):
+        process_csv(io.BytesIO(b""), backend="pyarrow")
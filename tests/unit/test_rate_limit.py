@@ -0,0 +1,110 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import openai
+import pytest
+from agents.usage import Usage
+
+from src import agent_engine
+from src.disk_cache import DiskCache
+from src.rate_limit import RateLimiter, TokenBucket, backoff_delay
+
+STATS = {"numeric_columns": {"sales": {"mean": 2.0}}}
+
+
+def rate_limit_error(retry_after: str | None = None) -> openai.RateLimitError:
+    # Built without an HTTP response object; only the headers are read
+    error = openai.RateLimitError.__new__(openai.RateLimitError)
+    Exception.__init__(error, "429 Resource exhausted")
+    error.response = SimpleNamespace(headers={"retry-after": retry_after} if retry_after else {})
+    return error
+
+
+@pytest.fixture
+def engine(monkeypatch, tmp_path):
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=10_000_000)
+    monkeypatch.setattr(agent_engine, "rate_limiter", limiter)
+    monkeypatch.setattr(agent_engine, "insight_cache", DiskCache(str(tmp_path), "insights"))
+    monkeypatch.setattr(agent_engine, "RETRY_BASE_SECONDS", 0.01)
+    calls = []
+
+    def install(outcomes):
+        async def run(**kwargs):
+            calls.append(time.monotonic())
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return SimpleNamespace(final_output=outcome, context_wrapper=SimpleNamespace(usage=Usage()))
+
+        sdk = SimpleNamespace(Runner=SimpleNamespace(run=run), agent=lambda agent: agent, run_config=None)
+        monkeypatch.setattr(agent_engine, "_load_sdk", lambda: sdk)
+        return calls
+
+    return SimpleNamespace(limiter=limiter, install=install)
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(per_minute=60)
+    assert [bucket.reserve() for _ in range(60)] == [0.0] * 60
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+    # Oversized requests are clamped to the bucket size instead of waiting forever
+    assert TokenBucket(per_minute=100).reserve(1_000) == 0.0
+
+
+def test_limiter_throttles_on_tokens_per_minute():
+    limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=60_000)
+
+    async def burst():
+        return await asyncio.gather(*(limiter.acquire(tokens) for tokens in (30_000, 30_000, 50)))
+
+    waits = asyncio.run(burst())
+    assert waits[:2] == [0.0, 0.0] and waits[2] == pytest.approx(0.05, abs=0.02)
+    stats = limiter.stats()
+    assert stats["requests"] == 3 and stats["throttled"] == 1
+
+
+def test_pause_holds_back_every_caller():
+    limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=60_000)
+    limiter.pause(0.05)
+    assert asyncio.run(limiter.acquire(1)) == pytest.approx(0.05, abs=0.02)
+
+
+def test_backoff_is_jittered_and_honours_retry_after():
+    delays = [backoff_delay(3, base=1.0, cap=60.0) for _ in range(200)]
+    assert 0 <= min(delays) < max(delays) <= 8.0
+    assert backoff_delay(0, base=1.0, retry_after=5.0) == 5.0
+
+
+def test_rate_limited_calls_are_retried(engine):
+    calls = engine.install([rate_limit_error("0.02"), rate_limit_error(), "Revenue is up."])
+    assert agent_engine.get_ai_insight(STATS, "Trends") == "Revenue is up."
+    assert len(calls) == 3
+    assert calls[1] - calls[0] >= 0.02
+    stats = engine.limiter.stats()
+    assert stats["rate_limited"] == 2 and stats["retries"] == 2 and "failed" not in stats
+
+
+def test_exhausted_retries_raise_quota_error(engine, monkeypatch):
+    monkeypatch.setattr(agent_engine, "MAX_RETRIES", 1)
+    engine.install([rate_limit_error("0.01"), rate_limit_error("0.01")])
+    with pytest.raises(agent_engine.QuotaExceededError) as raised:
+        agent_engine.get_ai_insight(STATS, "Anomalies")
+    assert raised.value.retry_after == 0.01
+    assert agent_engine.describe_error(raised.value)["error"] == "QuotaExceededError"
+    assert engine.limiter.stats()["failed"] == 1
+
+
+def test_long_retry_after_gives_up_immediately(engine):
+    calls = engine.install([rate_limit_error("3600")])
+    with pytest.raises(agent_engine.QuotaExceededError):
+        agent_engine.get_ai_insight(STATS, "Actions")
+    assert len(calls) == 1
+
+
+def test_other_errors_are_typed_and_not_retried(engine):
+    calls = engine.install([ValueError("bad schema")])
+    with pytest.raises(agent_engine.AgentEngineError, match="bad schema"):
+        agent_engine.get_ai_insight(STATS, "Trends")
+    assert len(calls) == 1
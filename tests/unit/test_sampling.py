@@ -0,0 +1,83 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processor import process_csv, process_csv_sample
+from src.sampling import sample_csv
+
+
+def make_csv(rows: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    revenue = rng.normal(500, 50, size=rows).round(2)
+    revenue[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "Date": pd.date_range("2024-01-01", periods=rows, freq="min").astype(str),
+        "Branch": rng.choice(["New York", "Chicago", "Austin"], size=rows),
+        # Drifts over the file, so a head-only sample would be biased
+        "Units": np.arange(rows) % 1000 + np.arange(rows) // 1000,
+        "Revenue": revenue,
+    }).to_csv(index=False).encode("utf-8")
+
+
+@pytest.fixture(scope="module")
+def data():
+    return make_csv(200_000)
+
+
+@pytest.fixture(scope="module")
+def exact(data):
+    return process_csv(io.BytesIO(data))
+
+
+@pytest.fixture(scope="module")
+def estimate(data):
+    return process_csv_sample(io.BytesIO(data), rows=10_000)
+
+
+def test_small_files_are_not_sampled():
+    assert sample_csv(io.BytesIO(make_csv(1_000)), rows=10_000) is None
+    assert process_csv_sample(io.BytesIO(make_csv(1_000)), rows=10_000) is None
+
+
+def test_sample_is_stratified_and_deterministic(data):
+    df, report = sample_csv(io.BytesIO(data), rows=10_000)
+    again, _ = sample_csv(io.BytesIO(data), rows=10_000)
+    pd.testing.assert_frame_equal(df, again)
+    assert 9_000 <= report["sample_rows"] == len(df) <= 11_000
+    # Rows come from the whole file, not just its head
+    assert df["Date"].min() < "2024-01-02" and df["Date"].max() > "2024-05-01"
+
+
+def test_estimates_cover_the_exact_stats(estimate, exact):
+    overall = estimate["overall_summary"]
+    assert overall["estimated"] is True and "estimated" not in exact["overall_summary"]
+    low, high = overall["sample"]["row_count_ci95"]
+    assert low <= exact["overall_summary"]["row_count"] <= high
+    assert overall["missing_values_summary"]["Revenue"] == pytest.approx(
+        exact["overall_summary"]["missing_values_summary"]["Revenue"], rel=0.2)
+
+    for col in ("Units", "Revenue"):
+        low, high = estimate["numeric_columns"][col]["mean_ci95"]
+        assert low <= exact["numeric_columns"][col]["mean"] <= high
+    for branch, count in exact["non_numeric_columns"]["Branch"].items():
+        assert estimate["non_numeric_columns"]["Branch"][branch] == pytest.approx(count, rel=0.1)
+
+
+def test_sample_positions_are_not_reported_as_rows(estimate):
+    for col_stats in estimate["numeric_columns"].values():
+        assert not any(key.endswith("_outliers_rows") for key in col_stats)
+    assert all(not profile["distinct_is_exact"] for profile in estimate["categorical_profile"].values())
+
+
+def test_quoted_newlines_fall_back_to_the_head():
+    rows = 20_000
+    data = pd.DataFrame({
+        "note": [f"line one\nline two {i}" for i in range(rows)],
+        "value": np.arange(rows),
+    }).to_csv(index=False).encode("utf-8")
+    df, report = sample_csv(io.BytesIO(data), rows=1_000)
+    assert report["method"] == "head" and list(df["value"]) == list(range(1_000))
+    # Biased towards the head's row length (shorter here), but in the right range
+    assert report["estimated_row_count"] == pytest.approx(rows, rel=0.15)
@@ -0,0 +1,74 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.context_builder import build_context
+from src.data_processor import generate_summary_statistics, process_csv
+
+
+def branch_frame(rows: int = 400, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    product = rng.choice([f"P{i:02d}" for i in range(12)], size=rows)
+    revenue = rng.normal(100, 5, size=rows)
+    revenue[product == "P07"] -= 80  # the underperformer
+    revenue[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "Order_ID": [f"O{i:05d}" for i in range(rows)],
+        "Branch": rng.choice(["New York", "Chicago", "Austin"], size=rows),
+        "Product": product,
+        "Revenue": revenue,
+        "Units_Sold": rng.integers(1, 10, size=rows),
+    })
+
+
+def test_segments_match_a_groupby_and_skip_id_columns():
+    df = branch_frame()
+    segments = generate_summary_statistics(df)["segments"]
+    assert list(segments) == ["Branch", "Product"]
+
+    branch = segments["Branch"]
+    assert branch["segment_count"] == 3
+    expected = df.groupby("Branch")["Revenue"].agg(["sum", "mean", "count"])
+    for name, entry in branch["measures"]["Revenue"]["top"].items():
+        assert entry["sum"] == pytest.approx(expected.loc[name, "sum"])
+        assert entry["mean"] == pytest.approx(expected.loc[name, "mean"])
+        assert entry["count"] == expected.loc[name, "count"]
+    shares = [entry["share_pct"] for entry in branch["measures"]["Revenue"]["top"].values()]
+    assert sum(shares) == pytest.approx(100)
+
+
+def test_only_top_and_bottom_k_segments_are_kept():
+    product = generate_summary_statistics(branch_frame())["segments"]["Product"]["measures"]["Revenue"]
+    assert len(product["top"]) == len(product["bottom"]) == 3
+    assert next(iter(product["bottom"])) == "P07"
+    sums = [entry["sum"] for entry in product["top"].values()]
+    assert sums == sorted(sums, reverse=True)
+
+
+def test_streaming_segments_match_batch():
+    data = branch_frame(1_000).to_csv(index=False).encode()
+    batch = process_csv(io.BytesIO(data))["segments"]
+    stream = process_csv(io.BytesIO(data), chunksize=64)["segments"]
+    assert stream.keys() == batch.keys()
+    for dim in batch:
+        assert stream[dim]["segment_count"] == batch[dim]["segment_count"]
+        for measure, ranking in batch[dim]["measures"].items():
+            for end, entries in ranking.items():
+                assert list(stream[dim]["measures"][measure][end]) == list(entries)
+                for name, entry in entries.items():
+                    assert stream[dim]["measures"][measure][end][name] == pytest.approx(entry)
+
+
+def test_only_the_strategist_gets_segments_within_budget():
+    stats = generate_summary_statistics(branch_frame())
+    actions = json.loads(build_context(stats, "Actions")[0])
+    assert set(actions["seg"]) == {"Branch", "Product"}
+    assert actions["legend"]["seg"] == "segments"
+    assert "seg" not in json.loads(build_context(stats, "Trends")[0])
+
+    text, report = build_context(stats, "Actions", token_budget=400)
+    assert report["tokens_after"] <= 400
+    assert report["segments_kept"] + len(report["segments_dropped"]) == 2
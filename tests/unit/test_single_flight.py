@@ -0,0 +1,247 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import agent_engine
+from src.disk_cache import DiskCache
+from src.single_flight import SingleFlight
+
+STATS = {"numeric_columns": {"sales": {"mean": 2.0, "std_dev": 1.0}}}
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    monkeypatch.setattr(agent_engine, "insight_cache", DiskCache(str(tmp_path), "insights"))
+    monkeypatch.setattr(agent_engine, "insight_flights", SingleFlight())
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = {"agents": [], "release": threading.Event(), "error": None}
+
+    async def slow_run(agent, context_data):
+        calls["agents"].append(agent.name)
+        while not calls["release"].is_set():
+            await asyncio.sleep(0.01)
+        if calls["error"]:
+            raise calls["error"]
+        return f"{agent.name} insight"
+
+    monkeypatch.setattr(agent_engine, "run_agent_process", slow_run)
+    return calls
+
+
+def release_when_joined(flights: SingleFlight, upstream: dict, callers: int) -> None:
+    # Let the upstream call finish only once every caller has joined it
+    def wait():
+        while flights.stats().get("coalesced", 0) < callers - 1:
+            threading.Event().wait(0.005)
+        upstream["release"].set()
+
+    threading.Thread(target=wait, daemon=True).start()
+
+
+def test_concurrent_identical_requests_make_one_upstream_call(upstream):
+    release_when_joined(agent_engine.insight_flights, upstream, 10)
+
+    async def many():
+        return await asyncio.gather(*(
+            agent_engine.get_ai_insights(STATS, ["Trends"], use_cache=False) for _ in range(10)
+        ))
+
+    results = agent_engine.run_sync(many())
+    assert [result["Trends"] for result in results] == ["Trend Analyst insight"] * 10
+    assert upstream["agents"] == ["Trend Analyst"]
+    assert agent_engine.insight_flights.stats() == {"calls": 1, "coalesced": 9, "in_flight": 0}
+
+
+def test_sessions_on_other_threads_and_loops_share_the_call(upstream):
+    release_when_joined(agent_engine.insight_flights, upstream, 6)
+    with ThreadPoolExecutor(6) as pool:
+        # Three Streamlit-style sessions on the engine loop, three on private loops
+        futures = [pool.submit(agent_engine.get_ai_insight, STATS, "Actions") for _ in range(3)]
+        futures += [
+            pool.submit(asyncio.run, agent_engine.get_ai_insights(STATS, ["Actions"])) for _ in range(3)
+        ]
+        results = [future.result(timeout=10) for future in futures]
+    assert results[:3] == ["Strategist insight"] * 3
+    assert [result["Actions"] for result in results[3:]] == ["Strategist insight"] * 3
+    assert upstream["agents"] == ["Strategist"]
+
+
+def test_different_agents_are_not_coalesced(upstream):
+    upstream["release"].set()
+    results = agent_engine.run_sync(agent_engine.get_ai_insights(STATS, ["Trends", "Anomalies"]))
+    assert set(results) == {"Trends", "Anomalies"}
+    assert sorted(upstream["agents"]) == ["Anomaly Hunter", "Trend Analyst"]
+
+
+def test_failures_reach_every_caller_and_are_not_remembered(upstream):
+    upstream["error"] = agent_engine.QuotaExceededError("quota", retry_after=3)
+    release_when_joined(agent_engine.insight_flights, upstream, 4)
+
+    async def many():
+        return await asyncio.gather(*(agent_engine.get_ai_insights(STATS, ["Trends"]) for _ in range(4)))
+
+    results = agent_engine.run_sync(many())
+    assert all(isinstance(result["Trends"], agent_engine.QuotaExceededError) for result in results)
+    assert len(upstream["agents"]) == 1
+
+    upstream["error"] = None
+    assert agent_engine.get_ai_insight(STATS, "Trends") == "Trend Analyst insight"
+    assert len(upstream["agents"]) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flights = SingleFlight()
+    started, finished = asyncio.Event(), []
+
+    async def call():
+        started.set()
+        await asyncio.sleep(0.05)
+        finished.append(True)
+        return "answer"
+
+    async def scenario():
+        leader = asyncio.create_task(flights.do("key", call))
+        await started.wait()
+        follower = asyncio.create_task(flights.do("key", call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "answer"
+    assert finished == [True]
+
+
+def test_call_is_cancelled_once_every_caller_has_gone():
+    flights = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def call():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def scenario():
+        callers = [asyncio.create_task(flights.do("key", call)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        # The key is free again: a new caller starts a fresh call
+        return await flights.do("key", lambda: asyncio.sleep(0, result="fresh"))
+
+    assert asyncio.run(scenario()) == "fresh"
+    assert flights.in_flight() == 0
+
+
+@pytest.fixture
+def upstream_stream(monkeypatch):
+    calls = {"agents": [], "release": threading.Event(), "error": None}
+
+    async def slow_stream(agent, context_data):
+        calls["agents"].append(agent.name)
+        yield "Revenue "
+        while not calls["release"].is_set():
+            await asyncio.sleep(0.01)
+        yield "is "
+        if calls["error"]:
+            raise calls["error"]
+        yield "growing."
+
+    monkeypatch.setattr(agent_engine, "stream_agent_process", slow_stream)
+    return calls
+
+
+def test_concurrent_streaming_sessions_make_one_upstream_call(upstream_stream):
+    release_when_joined(agent_engine.insight_flights, upstream_stream, 8)
+    # Streamlit sessions: each iterates iter_ai_insight on its own thread
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(lambda: list(agent_engine.iter_ai_insight(STATS, "Trends"))) for _ in range(8)]
+        results = [future.result(timeout=10) for future in futures]
+    # Late joiners get the deltas produced before they joined replayed
+    assert results == [["Revenue ", "is ", "growing."]] * 8
+    assert upstream_stream["agents"] == ["Trend Analyst"]
+    assert agent_engine.insight_flights.stats() == {"calls": 1, "coalesced": 7, "in_flight": 0}
+    # Written to the cache once, by the shared stream
+    assert list(agent_engine.iter_ai_insight(STATS, "Trends")) == ["Revenue is growing."]
+
+
+def test_streamed_failures_reach_every_session(upstream_stream):
+    upstream_stream["error"] = agent_engine.QuotaExceededError("quota", retry_after=3)
+    release_when_joined(agent_engine.insight_flights, upstream_stream, 3)
+
+    def session():
+        deltas = []
+        with pytest.raises(agent_engine.QuotaExceededError):
+            for delta in agent_engine.iter_ai_insight(STATS, "Anomalies"):
+                deltas.append(delta)
+        return deltas
+
+    with ThreadPoolExecutor(3) as pool:
+        results = [future.result(timeout=10) for future in [pool.submit(session) for _ in range(3)]]
+    assert results == [["Revenue ", "is "]] * 3
+    assert len(upstream_stream["agents"]) == 1
+
+
+def test_leaving_stream_keeps_it_going_for_the_others():
+    flights = SingleFlight()
+    stopped = []
+
+    async def call():
+        try:
+            for i in range(5):
+                await asyncio.sleep(0.01)
+                yield i
+        finally:
+            stopped.append(True)
+
+    async def consume(limit=None):
+        items = []
+        async for item in flights.stream("key", call):
+            items.append(item)
+            if len(items) == limit:
+                break
+        return items
+
+    async def scenario():
+        leader = asyncio.create_task(consume(limit=1))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(consume())
+        return await leader, await follower
+
+    assert asyncio.run(scenario()) == ([0], [0, 1, 2, 3, 4])
+    assert stopped == [True] and flights.in_flight() == 0
+
+
+def test_stream_is_cancelled_once_every_caller_has_gone():
+    flights = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def call():
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield "tick"
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def consume_one():
+        async for item in flights.stream("key", call):
+            return item
+
+    async def scenario():
+        assert await asyncio.gather(consume_one(), consume_one()) == ["tick", "tick"]
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+    asyncio.run(scenario())
+    assert flights.in_flight() == 0 and flights.stats()["calls"] == 1
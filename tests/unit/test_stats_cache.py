@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+from src import data_processor
+from src.disk_cache import DiskCache
+
+
+@pytest.fixture(autouse=True)
+def isolated_stats_cache(monkeypatch, tmp_path):
+    cache = DiskCache(str(tmp_path), "stats")
+    monkeypatch.setattr(data_processor, "stats_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def counted_process_csv(monkeypatch):
+    calls = []
+    real_process_csv = data_processor.process_csv
+
+    def wrapper(file_buffer, chunksize=None, **kwargs):
+        calls.append(chunksize)
+        return real_process_csv(file_buffer, chunksize=chunksize, **kwargs)
+
+    monkeypatch.setattr(data_processor, "process_csv", wrapper)
+    return calls
+
+
+def test_content_hash_is_incremental_and_rewinds():
+    data = b"Date,Revenue\n" + b"2025-12-01,500\n" * 100_000
+    buffer = io.BytesIO(data)
+    digest = data_processor.content_hash(buffer)
+    assert buffer.tell() == 0
+    assert digest == data_processor.hash_blocks([data[:7], data[7:1000], data[1000:]])
+    assert digest != data_processor.content_hash(io.BytesIO(data.replace(b"500", b"501")))
+
+
+def test_same_bytes_reuse_stats_regardless_of_name(counted_process_csv, isolated_stats_cache):
+    csv = b"col1,col2\n1,10\n2,20\n3,30"
+    first = data_processor.process_csv_cached(io.BytesIO(csv))
+    second = data_processor.process_csv_cached(io.BytesIO(csv))
+    assert first == second
+    assert counted_process_csv == [None]
+    assert isolated_stats_cache.stats()["hits"] == 1
+
+
+def test_same_size_different_bytes_are_not_confused(counted_process_csv):
+    first = data_processor.process_csv_cached(io.BytesIO(b"col1\n1\n2\n3"))
+    second = data_processor.process_csv_cached(io.BytesIO(b"col1\n7\n8\n9"))
+    assert first["numeric_columns"]["col1"]["mean"] == 2.0
+    assert second["numeric_columns"]["col1"]["mean"] == 8.0
+    assert len(counted_process_csv) == 2
+
+
+def test_chunksize_is_part_of_the_key(counted_process_csv):
+    csv = b"col1\n1\n2\n3"
+    data_processor.process_csv_cached(io.BytesIO(csv))
+    data_processor.process_csv_cached(io.BytesIO(csv), chunksize=2)
+    assert counted_process_csv == [None, 2]
+
+
+def test_errors_are_not_memoized(counted_process_csv, isolated_stats_cache):
+    with pytest.raises(Exception):
+        data_processor.process_csv_cached(io.BytesIO(b""))
+    assert isolated_stats_cache.stats()["entries"] == 0
@@ -0,0 +1,132 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processor import generate_summary_statistics
+
+
+def reference_summary_statistics(df: pd.DataFrame) -> dict:
+    """Column-by-column implementation the fused kernel replaced (kept verbatim for parity)."""
+    summary_stats = {
+        "overall_summary": {
+            "row_count": len(df),
+            "column_count": len(df.columns),
+            "missing_values_summary": df.isnull().sum().to_dict(),
+            "data_types_distribution": df.dtypes.astype(str).value_counts().to_dict(),
+        },
+        "numeric_columns": {}
+    }
+
+    for col in df.select_dtypes(include=np.number).columns:
+        description = df[col].describe().to_dict()
+        col_stats = {
+            "mean": description.get("mean"),
+            "median": df[col].median(),
+            "std_dev": description.get("std"),
+            "min": description.get("min"),
+            "max": description.get("max"),
+            "25_percentile": description.get("25%"),
+            "75_percentile": description.get("75%"),
+        }
+
+        if not pd.isna(col_stats["min"]) and not pd.isna(col_stats["max"]):
+            col_stats["trend_indicator_min_max_delta"] = col_stats["max"] - col_stats["min"]
+            if col_stats["min"] != 0:
+                col_stats["trend_indicator_min_max_percentage"] = (col_stats["max"] - col_stats["min"]) / col_stats["min"] * 100
+
+        std_dev = df[col].std()
+        mean_val = df[col].mean()
+        if std_dev > 0:
+            z_scores = (df[col] - mean_val) / std_dev
+            outliers = df[col][z_scores.abs() > 3].dropna().tolist()
+            col_stats["anomaly_detection_zscore_outliers_count"] = len(outliers)
+            col_stats["anomaly_detection_zscore_outliers_examples"] = outliers[:5]
+
+        summary_stats["numeric_columns"][col] = col_stats
+
+    summary_stats["non_numeric_columns"] = {}
+    for col in df.select_dtypes(exclude=np.number).columns:
+        summary_stats["non_numeric_columns"][col] = df[col].value_counts().head(5).to_dict()
+
+    return summary_stats
+
+
+def assert_same(actual, expected, path="stats"):
+    """Exact structural equality, treating NaN == NaN."""
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict), path
+        assert list(actual.keys()) == list(expected.keys()), path
+        for key in expected:
+            assert_same(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected), path
+        for i, (a, e) in enumerate(zip(actual, expected)):
+            assert_same(a, e, f"{path}[{i}]")
+    elif isinstance(expected, float) and math.isnan(expected):
+        assert isinstance(actual, float) and math.isnan(actual), path
+    else:
+        assert actual == expected, f"{path}: {actual!r} != {expected!r}"
+
+
+LATER_SECTIONS = ("categorical_profile", "time_series", "segments", "anomaly_detection_mahalanobis")
+LEGACY_ANOMALY_FIELDS = ("anomaly_detection_zscore_outliers_count", "anomaly_detection_zscore_outliers_examples")
+
+
+def legacy_sections(stats: dict) -> dict:
+    """The fields the reference implementation produces (later additions are tested separately)."""
+    legacy = {key: value for key, value in stats.items() if key not in LATER_SECTIONS}
+    legacy["numeric_columns"] = {
+        col: {
+            key: value for key, value in col_stats.items()
+            if not key.startswith("anomaly_detection_") or key in LEGACY_ANOMALY_FIELDS
+        }
+        for col, col_stats in stats["numeric_columns"].items()
+    }
+    return legacy
+
+
+def make_frame(seed: int, rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    floats = rng.normal(loc=50, scale=10, size=rows)
+    floats[rng.random(rows) < 0.1] = np.nan
+    spiky = rng.normal(size=rows)
+    spiky[rng.integers(0, rows, size=max(rows // 50, 1))] *= 40
+    return pd.DataFrame({
+        "revenue": floats,
+        "units": rng.integers(-5, 500, size=rows),
+        "spiky": spiky,
+        "constant": np.full(rows, 7.0),
+        "zero_min": np.abs(rng.normal(size=rows)).round(1) * (np.arange(rows) % 3),
+        "all_nan": np.full(rows, np.nan),
+        "branch": rng.choice(["NY", "LA", "SF", "CHI"], size=rows),
+    })
+
+
+@pytest.mark.parametrize("seed,rows", [(0, 1), (1, 2), (2, 7), (3, 100), (4, 5_000), (5, 100_001)])
+def test_fused_kernel_matches_reference(seed, rows):
+    df = make_frame(seed, rows)
+    assert_same(legacy_sections(generate_summary_statistics(df)), reference_summary_statistics(df))
+
+
+def test_fused_kernel_matches_reference_on_empty_frame():
+    df = pd.DataFrame({"col1": pd.Series([], dtype="float64"), "col2": pd.Series([], dtype="int64")})
+    assert_same(legacy_sections(generate_summary_statistics(df)), reference_summary_statistics(df))
+
+
+def test_fused_kernel_keeps_integer_outlier_examples():
+    df = pd.DataFrame({"sales": [10] * 40 + [1000, 11, 12]})
+    stats = generate_summary_statistics(df)
+    examples = stats["numeric_columns"]["sales"]["anomaly_detection_zscore_outliers_examples"]
+    assert examples == [1000]
+    assert isinstance(examples[0], int)
+    assert_same(legacy_sections(stats), reference_summary_statistics(df))
+
+
+def test_fused_kernel_does_not_mutate_homogeneous_frame():
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(rng.normal(size=(500, 3)), columns=["a", "b", "c"])
+    before = df.copy()
+    assert_same(legacy_sections(generate_summary_statistics(df)), reference_summary_statistics(df))
+    pd.testing.assert_frame_equal(df, before)
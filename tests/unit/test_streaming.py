@@ -0,0 +1,108 @@
+import io
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_processor import generate_summary_statistics, process_csv
+from src.sketches import QuantileSketch, SpaceSaving
+from src.streaming import NumericAccumulator
+
+
+def to_csv_buffer(df: pd.DataFrame) -> io.BytesIO:
+    return io.BytesIO(df.to_csv(index=False).encode("utf-8"))
+
+
+def assert_close(actual, expected, path="stats", rel=1e-9):
+    if isinstance(expected, dict):
+        assert list(actual.keys()) == list(expected.keys()), path
+        for key in expected:
+            assert_close(actual[key], expected[key], f"{path}.{key}", rel)
+    elif isinstance(expected, list):
+        assert actual == pytest.approx(expected, rel=rel), path
+    elif isinstance(expected, float) and math.isnan(expected):
+        assert math.isnan(actual), path
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected, rel=rel, abs=1e-9), path
+    else:
+        assert actual == expected, f"{path}: {actual!r} != {expected!r}"
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    revenue = rng.normal(500, 50, size=rows).round(2)
+    revenue[rng.random(rows) < 0.05] = np.nan
+    revenue[rng.integers(0, rows, size=3)] = 5000.0
+    units = rng.integers(0, 100, size=rows)
+    units[7] = 10_000
+    return pd.DataFrame({
+        "Date": pd.date_range("2025-01-01", periods=rows, freq="h").astype(str),
+        "Branch": rng.choice(["New York", "Chicago", "Austin"], size=rows),
+        "Revenue": revenue,
+        "Units_Sold": units,
+    })
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 50, 10_000])
+def test_streaming_matches_full_read(chunksize):
+    df = make_frame(200)
+    expected = generate_summary_statistics(pd.read_csv(to_csv_buffer(df)))
+    # The row-level Mahalanobis detector needs every column of a row at once: batch only
+    expected.pop("anomaly_detection_mahalanobis", None)
+    actual = process_csv(to_csv_buffer(df), chunksize=chunksize)
+    assert_close(actual, expected)
+
+
+def test_streaming_reconciles_mixed_chunk_dtypes():
+    csv = "a,b,c\n1,x,1\n2,,2\nabc,,3.5\n,,4\n"
+    expected = process_csv(io.BytesIO(csv.encode()))
+    actual = process_csv(io.BytesIO(csv.encode()), chunksize=2)
+    assert_close(actual, expected)
+    assert actual["non_numeric_columns"]["a"] == {"1": 1, "2": 1, "abc": 1}
+
+
+def test_streaming_headers_only():
+    expected = process_csv(io.BytesIO(b"col1,col2"))
+    actual = process_csv(io.BytesIO(b"col1,col2"), chunksize=10)
+    assert_close(actual, expected)
+
+
+def test_streaming_empty_file_raises():
+    with pytest.raises(pd.errors.EmptyDataError):
+        process_csv(io.BytesIO(b""), chunksize=10)
+
+
+def test_quantile_sketch_is_bounded_and_accurate():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(size=500_000)
+    sketch = QuantileSketch(k=256)
+    for part in np.array_split(values, 50):
+        sketch.update(part)
+    assert sum(len(level) for level in sketch.levels) < 3 * 256 + 64
+    ranks = [np.searchsorted(np.sort(values), est) / len(values) for est in sketch.quantiles([0.25, 0.5, 0.75])]
+    assert ranks == pytest.approx([0.25, 0.5, 0.75], abs=0.02)
+
+
+def test_numeric_accumulators_merge_like_a_single_pass():
+    rng = np.random.default_rng(2)
+    values = rng.normal(10, 3, size=10_000)
+    left, right, whole = NumericAccumulator(), NumericAccumulator(), NumericAccumulator()
+    left.update(values[:3_000])
+    right.update(values[3_000:])
+    whole.update(values)
+    left.merge(right)
+    assert left.count == whole.count
+    assert left.mean == pytest.approx(values.mean())
+    assert left.std == pytest.approx(values.std(ddof=1))
+    assert (left.min, left.max) == (values.min(), values.max())
+
+
+def test_space_saving_keeps_heavy_hitters_within_bound():
+    counter = SpaceSaving(capacity=10)
+    counter.update_counts({"hot": 500, "warm": 200})
+    counter.update_counts({f"id{i}": 1 for i in range(1_000)})
+    top = counter.top(2)
+    assert list(top) == ["hot", "warm"]
+    assert 500 <= top["hot"] <= 500 + counter.error_bound
+    assert not counter.is_exact
@@ -0,0 +1,131 @@
+import json
+import random
+
+import pytest
+from starlette.testclient import TestClient
+
+from src import agent_engine, telemetry
+from src.disk_cache import DiskCache
+from src.rate_limit import RateLimiter
+from src.stub_server import BackgroundServer, StubModel, create_app, parse_latency
+
+STATS = {"numeric_columns": {"sales": {"mean": 2.0, "std_dev": 1.0}}}
+REQUEST = {"model": "stub-model", "messages": [{"role": "user", "content": "x" * 400}]}
+
+
+def test_parse_latency():
+    rng = random.Random(0)
+    assert parse_latency("fixed:0.25")() == 0.25
+    assert all(0.2 <= parse_latency("uniform:0.2,0.4", rng)() <= 0.4 for _ in range(100))
+    samples = sorted(parse_latency("lognormal:0.5,0.3", rng)() for _ in range(1001))
+    assert samples[500] == pytest.approx(0.5, rel=0.1)
+    # Negative draws are clamped
+    assert all(parse_latency("normal:0,1", rng)() >= 0 for _ in range(100))
+    for spec in ("gamma:1,2", "uniform:0.2", "fixed:fast"):
+        with pytest.raises(ValueError):
+            parse_latency(spec)
+
+
+def test_plain_and_streamed_completions():
+    stub = StubModel(latency="fixed:0", completion_tokens=5)
+    with TestClient(create_app(stub)) as client:
+        body = client.post("/v1/chat/completions", json=REQUEST).json()
+        assert body["choices"][0]["message"]["content"] == "Revenue grew steadily while costs"
+        assert body["usage"] == {
+            "prompt_tokens": 100, "completion_tokens": 5, "total_tokens": 105,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+
+        response = client.post("/v1/chat/completions", json={
+            **REQUEST, "stream": True, "stream_options": {"include_usage": True},
+        })
+        events = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+        assert events[-1] == "[DONE]"
+        chunks = [json.loads(event) for event in events[:-1]]
+        assert "".join(c["choices"][0]["delta"].get("content", "") for c in chunks if c["choices"]) == \
+            body["choices"][0]["message"]["content"]
+        assert chunks[-2]["choices"][0]["finish_reason"] == "stop"
+        assert chunks[-1]["usage"]["completion_tokens"] == 5
+
+        stats = client.get("/stats").json()
+        assert stats["requests"] == stats["completed"] == 2 and stats["streamed"] == 1
+        assert stats["prompt_tokens"] == 200 and stats["in_flight"] == 0
+        # Repeated, but shorter than one 256-token cache block
+        assert chunks[-1]["usage"]["prompt_tokens_details"]["cached_tokens"] == 0 == stats["cached_tokens"]
+        assert client.post("/stats/reset").json()["requests"] == 0
+
+
+def test_injected_rate_limits_carry_retry_after():
+    with TestClient(create_app(StubModel(latency="fixed:0", error_rate=1.0, retry_after=2.5))) as client:
+        response = client.post("/v1/chat/completions", json=REQUEST)
+        assert response.status_code == 429 and response.headers["retry-after"] == "2.5"
+
+    with TestClient(create_app(StubModel(latency="fixed:0", rpm=2))) as client:
+        codes = [client.post("/v1/chat/completions", json=REQUEST).status_code for _ in range(3)]
+        assert codes == [200, 200, 429]
+        assert client.get("/stats").json()["rate_limited"] == 1
+
+
+def test_engine_runs_end_to_end_against_the_stub(monkeypatch, tmp_path):
+    stub = StubModel(latency="fixed:0.01", completion_tokens=8)
+    with BackgroundServer(stub) as server:
+        # A fresh SDK (client) bound to the stub's URL; the original is restored afterwards
+        monkeypatch.setattr(agent_engine, "_sdk", None)
+        monkeypatch.setattr(agent_engine, "BASE_URL", server.base_url)
+        monkeypatch.setattr(agent_engine, "MODEL_ID", "stub-model")
+        monkeypatch.setattr(agent_engine, "rate_limiter", RateLimiter(6000, 10_000_000))
+        monkeypatch.setattr(agent_engine, "insight_cache", DiskCache(str(tmp_path), "insights"))
+
+        answer = agent_engine.get_ai_insight(STATS, "Trends")
+        deltas = list(agent_engine.iter_ai_insight(STATS, "Anomalies"))
+
+    assert answer == "".join(stub.answer()) == "".join(deltas)
+    assert stub.counters["requests"] == 2 and stub.counters["streamed"] == 1
+    # Stub answers are never cached under the default endpoint's key
+    trend_agent = agent_engine.AGENTS["Trends"]
+    context = {"stats": STATS}
+    stub_key = agent_engine.insight_cache_key(trend_agent, context)
+    monkeypatch.setattr(agent_engine, "BASE_URL", agent_engine.DEFAULT_BASE_URL)
+    assert agent_engine.insight_cache_key(trend_agent, context) != stub_key
+
+
+def test_structured_output_and_prefix_cache():
+    stub = StubModel(latency="fixed:0", completion_tokens=3, prefix_cache_tokens=256)
+    schema = {"type": "object", "properties": {"trends": {"type": "string"}, "actions": {"type": "string"}}}
+    shared = "s" * 4 * 600  # 600 tokens: two whole cache blocks
+    with TestClient(create_app(stub)) as client:
+        def ask(prompt: str) -> dict:
+            return client.post("/v1/chat/completions", json={
+                "model": "stub-model",
+                "messages": [{"role": "system", "content": prompt}],
+                "response_format": {"type": "json_schema", "json_schema": {"name": "final_output", "schema": schema}},
+            }).json()
+
+        first = ask(shared + "trends brief")
+        assert json.loads(first["choices"][0]["message"]["content"]) == {
+            "trends": "Revenue grew steadily", "actions": "Revenue grew steadily",
+        }
+        assert first["usage"]["prompt_tokens_details"]["cached_tokens"] == 0
+        assert ask(shared + "actions brief")["usage"]["prompt_tokens_details"]["cached_tokens"] == 512
+        assert ask("x" + shared)["usage"]["prompt_tokens_details"]["cached_tokens"] == 0
+        assert client.get("/stats").json()["cached_tokens"] == 512
+
+
+def test_combined_report_against_the_stub(monkeypatch, tmp_path):
+    stub = StubModel(latency="fixed:0.01", completion_tokens=8)
+    with BackgroundServer(stub) as server:
+        monkeypatch.setattr(agent_engine, "_sdk", None)
+        monkeypatch.setattr(agent_engine, "BASE_URL", server.base_url)
+        monkeypatch.setattr(agent_engine, "rate_limiter", RateLimiter(6000, 10_000_000))
+        monkeypatch.setattr(agent_engine, "insight_cache", DiskCache(str(tmp_path), "insights"))
+        monkeypatch.setattr(telemetry, "ENABLED", True)
+
+        for _ in range(2):
+            report = agent_engine.run_sync(agent_engine.get_ai_report(STATS, use_cache=False))
+
+    assert report == dict.fromkeys(agent_engine.REPORT_FIELDS, "".join(stub.answer()))
+    assert stub.counters["requests"] == 2
+    spans = [span for span in telemetry.recorder.recent() if span.get("agent") == "Report Writer"][-2:]
+    # Measured usage; the repeated prompt is served from the (simulated) prefix cache
+    assert spans[0]["input_tokens"] == spans[1]["input_tokens"] > 0
+    assert spans[0]["cached_tokens"] == 0 < spans[1]["cached_tokens"]
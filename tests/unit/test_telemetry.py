@@ -0,0 +1,103 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from starlette.testclient import TestClient
+
+from src import agent_engine, api, data_processor, telemetry
+from src.disk_cache import DiskCache
+
+CSV = pd.DataFrame({
+    "Branch": ["NY", "LA", "NY", "SF"] * 25,
+    "Revenue": np.arange(100, dtype=float),
+}).to_csv(index=False).encode("utf-8")
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    recorder = telemetry.Recorder()
+    monkeypatch.setattr(telemetry, "recorder", recorder)
+    monkeypatch.setattr(telemetry, "ENABLED", True)
+    return recorder
+
+
+def test_disabled_spans_are_shared_noops(monkeypatch):
+    monkeypatch.setattr(telemetry, "ENABLED", False)
+    monkeypatch.setattr(telemetry, "recorder", telemetry.Recorder())
+    with telemetry.span("parse_csv", bytes=10) as stage:
+        stage.set(rows=1)
+    assert telemetry.span("stats") is stage
+    assert telemetry.recorder.stages() == {}
+
+
+def test_spans_record_time_attributes_nesting_and_errors(recorder):
+    with telemetry.span("outer", bytes=100) as outer:
+        with telemetry.span("inner") as inner:
+            inner.set(rows=5)
+        outer.set(rows=7)
+    with pytest.raises(ValueError):
+        with telemetry.span("inner", rows=1):
+            raise ValueError("boom")
+
+    stages = recorder.stages()
+    assert stages["outer"]["count"] == 1 and stages["outer"]["bytes_total"] == 100
+    assert stages["inner"]["count"] == 2 and stages["inner"]["rows_total"] == 6
+    assert stages["inner"]["errors"] == 1
+    assert stages["outer"]["seconds_sum"] >= stages["outer"]["seconds_max"] >= 0
+    first_inner = recorder.recent()[0]
+    assert first_inner["stage"] == "inner" and first_inner["parent"] == "outer"
+    assert recorder.recent()[-1]["error"] == "ValueError"
+
+
+def test_prometheus_export(recorder):
+    with telemetry.span('parse "csv"', rows=10):
+        pass
+    text = recorder.prometheus()
+    assert "# TYPE report_stage_seconds summary" in text
+    assert 'report_stage_seconds_count{stage="parse \\"csv\\""} 1' in text
+    assert 'report_stage_rows_total{stage="parse \\"csv\\""} 10' in text
+    assert 'report_stage_errors_total{stage="parse \\"csv\\""} 0' in text
+    # Counters with no samples are left out entirely
+    assert "prompt_chars" not in text
+
+
+def test_json_log_lines(monkeypatch, tmp_path):
+    log = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(telemetry, "recorder", telemetry.Recorder(log_path=str(log)))
+    monkeypatch.setattr(telemetry, "ENABLED", True)
+    for rows in (1, 2):
+        with telemetry.span("stats", rows=rows):
+            pass
+    lines = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [line["rows"] for line in lines] == [1, 2]
+    assert {"ts", "stage", "seconds", "peak_rss_delta_bytes"} <= set(lines[0])
+
+
+def test_pipeline_stages_are_instrumented(recorder, monkeypatch, tmp_path):
+    monkeypatch.setattr(agent_engine, "STUB_MODEL", True)
+    monkeypatch.setattr(agent_engine, "STUB_LATENCY_SECONDS", 0)
+    monkeypatch.setattr(agent_engine, "insight_cache", DiskCache(str(tmp_path), "insights"))
+
+    stats = data_processor.process_csv(io.BytesIO(CSV))
+    data_processor.content_hash(io.BytesIO(CSV))
+    agent_engine.get_ai_insight(stats, "Trends")
+
+    stages = recorder.stages()
+    assert stages["parse_csv"]["rows_total"] == 100 and stages["parse_csv"]["bytes_total"] == len(CSV)
+    assert stages["stats"]["columns_total"] == 2
+    assert stages["hash"]["bytes_total"] == len(CSV)
+    assert stages["build_context"]["prompt_chars_total"] == stages["llm"]["prompt_chars_total"] > 0
+
+
+def test_api_exposes_stage_metrics(recorder, monkeypatch, tmp_path):
+    monkeypatch.setattr(data_processor, "stats_cache", DiskCache(str(tmp_path), "stats"))
+    with TestClient(api.create_app()) as client:
+        assert client.post("/reports?filename=sales.csv", content=CSV).status_code == 200
+        stages = client.get("/metrics").json()["stages"]
+        assert {"upload", "hash", "stats_cache_lookup", "parse_csv", "stats", "serialize_json"} <= set(stages)
+
+        response = client.get("/metrics/prometheus")
+        assert response.headers["content-type"].startswith("text/plain")
+        assert f'report_stage_bytes_total{{stage="upload"}} {len(CSV)}' in response.text
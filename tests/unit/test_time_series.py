@@ -0,0 +1,96 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.context_builder import build_context
+from src.data_processor import generate_summary_statistics, process_csv
+from src.time_series import choose_frequency, trend_statistics
+
+
+def daily_sales(days: int = 60, rows_per_day: int = 4, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = np.repeat(pd.date_range("2025-01-01", periods=days, freq="D"), rows_per_day)
+    day = np.repeat(np.arange(days), rows_per_day)
+    return pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Branch": rng.choice(["NY", "LA"], size=len(dates)),
+        "Revenue": 1_000 + 10.0 * day + rng.normal(0, 1, size=len(dates)),
+        "Returns": 50 - 0.5 * day,
+        "Noise": rng.normal(100, 1, size=len(dates)),
+    })
+
+
+def test_daily_trends_are_detected_and_fitted():
+    stats = generate_summary_statistics(daily_sales())
+    ts = stats["time_series"]
+    assert (ts["time_column"], ts["frequency"], ts["periods"]) == ("Date", "D", 60)
+    assert (ts["start"], ts["end"]) == ("2025-01-01", "2025-03-01")
+    assert ts["rolling_window"] == 7
+
+    revenue, returns, noise = (ts["columns"][col] for col in ("Revenue", "Returns", "Noise"))
+    assert revenue["slope_per_period"] == pytest.approx(10.0, rel=0.01)
+    assert revenue["r_squared"] > 0.99
+    assert revenue["direction"] == "Growth"
+    assert returns["slope_per_period"] == pytest.approx(-0.5)
+    assert returns["direction"] == "Decline"
+    assert returns["last_period_growth_pct"] == pytest.approx((20.5 - 21.0) / 21.0 * 100)
+    assert noise["direction"] == "Stable"
+
+
+def test_batched_fit_matches_per_column_polyfit_with_gaps():
+    rng = np.random.default_rng(1)
+    means = rng.normal(size=(30, 4)).cumsum(axis=0)
+    means[rng.random(means.shape) < 0.2] = np.nan
+    stats = trend_statistics(means, window=5)
+    x = np.arange(30)
+    for col in range(4):
+        valid = ~np.isnan(means[:, col])
+        slope = np.polyfit(x[valid], means[valid, col], 1)[0]
+        r = np.corrcoef(x[valid], means[valid, col])[0, 1]
+        assert stats["slope"][col] == pytest.approx(slope)
+        assert stats["r_squared"][col] == pytest.approx(r * r)
+        last, previous = means[valid, col][-1], means[valid, col][-2]
+        assert stats["last_growth_pct"][col] == pytest.approx((last - previous) / abs(previous) * 100)
+
+
+def test_zero_mean_series_get_no_direction():
+    # Net figures swinging around zero: no relative change to call Growth or Decline
+    means = np.array([[-2.0, 0.0, 5.0], [0.0, 0.0, np.nan], [2.0, 0.0, np.nan]])
+    stats = trend_statistics(means, window=2)
+    assert stats["direction"] == [None, "Stable", None]
+    assert stats["slope"][0] == pytest.approx(2.0)
+
+
+def test_frequency_follows_spacing_and_span():
+    assert choose_frequency(pd.date_range("2025-01-01", periods=48, freq="h")) == "h"
+    assert choose_frequency(pd.date_range("2025-01-01", periods=1_000, freq="h")) == "D"
+    assert choose_frequency(pd.date_range("2020-01-01", periods=36, freq="MS")) == "MS"
+    assert choose_frequency(pd.date_range("2000-01-01", periods=2_000, freq="D")) == "W"
+    assert choose_frequency(pd.date_range("2000-01-01", periods=3_000, freq="D")) == "MS"
+
+
+def test_streaming_time_series_matches_batch():
+    data = daily_sales(days=90, rows_per_day=3).to_csv(index=False).encode()
+    batch = process_csv(io.BytesIO(data))["time_series"]
+    stream = process_csv(io.BytesIO(data), chunksize=17)["time_series"]
+    assert stream.keys() == batch.keys()
+    for col, metrics in batch["columns"].items():
+        for key, value in metrics.items():
+            assert stream["columns"][col][key] == (value if isinstance(value, str) else pytest.approx(value))
+
+
+def test_no_time_column_means_no_section():
+    stats = generate_summary_statistics(pd.DataFrame({"a": [1, 2, 3], "b": ["x", "y", "z"]}))
+    assert "time_series" not in stats
+
+
+def test_trend_agent_gets_the_time_series_and_the_auditor_does_not():
+    stats = generate_summary_statistics(daily_sales())
+    trends = json.loads(build_context(stats, "Trends")[0])
+    assert trends["ts"]["frequency"] == "D"
+    assert trends["ts"]["columns"]["Revenue"]["direction"] == "Growth"
+    assert trends["legend"]["slope"] == "slope_per_period"
+    assert "ts" not in json.loads(build_context(stats, "Anomalies")[0])
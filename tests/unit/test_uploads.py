@@ -0,0 +1,92 @@
+import asyncio
+import gc
+import io
+import os
+
+import pytest
+from starlette.testclient import TestClient
+
+from src import api, data_processor, uploads
+from src.disk_cache import DiskCache
+
+CSV = b"Branch,Revenue\n" + b"".join(b"NY,%d\n" % i for i in range(2000))
+
+
+@pytest.fixture(autouse=True)
+def tmp_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(uploads, "UPLOAD_TMP_DIR", str(tmp_path))
+    return tmp_path
+
+
+async def chunked(data: bytes, size: int = 1000):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_small_uploads_are_used_in_place():
+    buffer = io.BytesIO(CSV)
+    with uploads.open_upload(buffer, threshold=len(CSV)) as upload:
+        assert upload.buffer is buffer and not upload.spilled
+
+
+def test_large_uploads_are_memory_mapped_and_removed(tmp_dir):
+    with uploads.open_upload(io.BytesIO(CSV), threshold=100) as upload:
+        assert upload.spilled and upload.size == len(CSV)
+        assert os.path.dirname(upload.path) == str(tmp_dir)
+        stats = data_processor.process_csv(upload.buffer)
+        assert data_processor.content_hash(upload.buffer) == data_processor.content_hash(io.BytesIO(CSV))
+    assert stats == data_processor.process_csv(io.BytesIO(CSV))
+    assert list(tmp_dir.iterdir()) == []
+
+
+def test_streamed_profile_reads_the_memory_map():
+    with uploads.open_upload(io.BytesIO(CSV), threshold=100) as upload:
+        streamed = data_processor.process_csv(upload.buffer, chunksize=300)
+    assert streamed == data_processor.process_csv(io.BytesIO(CSV), chunksize=300)
+
+
+def test_unclosed_spills_are_removed_when_collected(tmp_dir):
+    upload = uploads.open_upload(io.BytesIO(CSV), threshold=100)
+    assert upload.spilled
+    del upload
+    gc.collect()
+    assert list(tmp_dir.iterdir()) == []
+
+
+def test_receive_spills_past_the_threshold(tmp_dir):
+    small = asyncio.run(uploads.receive(chunked(CSV), max_bytes=len(CSV), threshold=len(CSV)))
+    assert not small.spilled and small.buffer.getvalue() == CSV
+
+    with asyncio.run(uploads.receive(chunked(CSV), max_bytes=len(CSV), threshold=2500)) as large:
+        assert large.spilled and large.buffer[:] == CSV
+    with pytest.raises(uploads.UploadTooLargeError):
+        asyncio.run(uploads.receive(chunked(CSV), max_bytes=len(CSV) - 1, threshold=2500))
+    assert list(tmp_dir.iterdir()) == []
+
+
+def test_empty_spill_is_an_empty_buffer(tmp_dir):
+    upload = uploads.spill(io.BytesIO())
+    assert upload.size == 0 and not upload.spilled and upload.buffer.read() == b""
+    assert list(tmp_dir.iterdir()) == []
+
+
+def test_stale_spills_are_swept(tmp_dir):
+    stale, fresh, other = tmp_dir / "upload-old", tmp_dir / "upload-new", tmp_dir / "other"
+    for path in (stale, fresh, other):
+        path.write_bytes(b"x")
+    os.utime(stale, (0, 0))
+    assert uploads.remove_stale_spills() == 1
+    assert sorted(path.name for path in tmp_dir.iterdir()) == ["other", "upload-new"]
+
+
+def test_api_spills_large_bodies(monkeypatch, tmp_path, tmp_dir):
+    monkeypatch.setattr(uploads, "SPILL_THRESHOLD_BYTES", 100)
+    monkeypatch.setattr(data_processor, "stats_cache", DiskCache(str(tmp_path / "cache"), "stats"))
+    with TestClient(api.create_app()) as client:
+        response = client.post("/reports?filename=sales.csv", content=CSV)
+        assert response.status_code == 200
+        assert response.json()["stats"]["overall_summary"]["row_count"] == 2000
+
+        monkeypatch.setattr(api, "MAX_UPLOAD_BYTES", 100)
+        assert client.post("/reports?filename=sales.csv", content=CSV).status_code == 413
+    assert [path.name for path in tmp_dir.iterdir()] == ["cache"]